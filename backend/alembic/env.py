@@ -32,6 +32,9 @@ from app.models.sellers import Sellers
 from app.models.sales import Sales
 from app.models.earnings import Earnings
 from app.models.investment import Investment
+from app.models.device import DeviceKey
+from app.models.product_image import ProductImage
+from app.models.stock_movement import StockMovement
 
 # Set the sqlalchemy.url from our settings
 settings = Settings()
@@ -0,0 +1,41 @@
+"""add stock_movements table
+
+Revision ID: a4c6e8f0b2d3
+Revises: f2b4d6e8a0c1
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c6e8f0b2d3'
+down_revision: Union[str, None] = 'f2b4d6e8a0c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stock_movements',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('previous_stock', sa.Integer(), nullable=False),
+        sa.Column('new_stock', sa.Integer(), nullable=False),
+        sa.Column('change', sa.Integer(), nullable=False),
+        sa.Column('reason', sa.String(length=200), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stock_movements_product_id_created_at', 'stock_movements',
+                    ['product_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_movements_product_id_created_at', table_name='stock_movements')
+    op.drop_table('stock_movements')
@@ -0,0 +1,41 @@
+"""add device keys table
+
+Revision ID: a7c3e9d2f1b4
+Revises: e1f2a3b4c5d6
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9d2f1b4'
+down_revision: Union[str, None] = 'e1f2a3b4c5d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('device_keys',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('key_prefix', sa.String(length=16), nullable=False),
+    sa.Column('key_hash', sa.String(length=64), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), nullable=False),
+    sa.Column('last_used_at', sa.TIMESTAMP(), nullable=True),
+    sa.Column('revoked_at', sa.TIMESTAMP(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_device_keys_id'), 'device_keys', ['id'], unique=False)
+    op.create_index(op.f('ix_device_keys_key_prefix'), 'device_keys', ['key_prefix'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_device_keys_key_prefix'), table_name='device_keys')
+    op.drop_index(op.f('ix_device_keys_id'), table_name='device_keys')
+    op.drop_table('device_keys')
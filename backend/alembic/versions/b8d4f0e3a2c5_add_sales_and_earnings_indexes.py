@@ -0,0 +1,33 @@
+"""add sales and earnings indexes
+
+Revision ID: b8d4f0e3a2c5
+Revises: a7c3e9d2f1b4
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d4f0e3a2c5'
+down_revision: Union[str, None] = 'a7c3e9d2f1b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_sales_created_at_id', 'sales', ['created_at', 'id'], unique=False)
+    op.create_index('ix_sales_status_created_at_id', 'sales', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_sales_seller_id_created_at_id', 'sales', ['seller_id', 'created_at', 'id'], unique=False)
+    op.create_index(op.f('ix_earnings_sale_id'), 'earnings', ['sale_id'], unique=False)
+    op.create_index(op.f('ix_earnings_created_at'), 'earnings', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_earnings_created_at'), table_name='earnings')
+    op.drop_index(op.f('ix_earnings_sale_id'), table_name='earnings')
+    op.drop_index('ix_sales_seller_id_created_at_id', table_name='sales')
+    op.drop_index('ix_sales_status_created_at_id', table_name='sales')
+    op.drop_index('ix_sales_created_at_id', table_name='sales')
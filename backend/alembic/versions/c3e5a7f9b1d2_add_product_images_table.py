@@ -0,0 +1,34 @@
+"""add product_images table
+
+Revision ID: c3e5a7f9b1d2
+Revises: b8d4f0e3a2c5
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e5a7f9b1d2'
+down_revision: Union[str, None] = 'b8d4f0e3a2c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'product_images',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('extension', sa.String(length=8), nullable=False),
+        sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=False),
+        sa.Column('released_at', sa.TIMESTAMP(), nullable=True),
+        sa.PrimaryKeyConstraint('content_hash')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('product_images')
@@ -0,0 +1,47 @@
+"""add product and user search indexes
+
+Revision ID: d5f7b9c1e3a4
+Revises: c3e5a7f9b1d2
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f7b9c1e3a4'
+down_revision: Union[str, None] = 'c3e5a7f9b1d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('products', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('spanish', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('spanish', coalesce(description, '')), 'B')",
+            persisted=True
+        ),
+        nullable=True
+    ))
+    op.create_index('ix_products_search_vector', 'products', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_products_name_trgm', 'products', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_users_username_trgm', 'users', ['username'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'})
+    op.create_index('ix_users_email_trgm', 'users', ['email'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_email_trgm', table_name='users')
+    op.drop_index('ix_users_username_trgm', table_name='users')
+    op.drop_index('ix_products_name_trgm', table_name='products')
+    op.drop_index('ix_products_search_vector', table_name='products')
+    op.drop_column('products', 'search_vector')
@@ -0,0 +1,32 @@
+"""add partial indexes for product listing
+
+Revision ID: e7a9c1d3f5b6
+Revises: d5f7b9c1e3a4
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a9c1d3f5b6'
+down_revision: Union[str, None] = 'd5f7b9c1e3a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_products_active_name_id', 'products', ['name', 'id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    op.create_index('ix_products_active_price_id', 'products', ['price', 'id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    op.create_index('ix_products_active_stock_id', 'products', ['stock', 'id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_active_stock_id', table_name='products')
+    op.drop_index('ix_products_active_price_id', table_name='products')
+    op.drop_index('ix_products_active_name_id', table_name='products')
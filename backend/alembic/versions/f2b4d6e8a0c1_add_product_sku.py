@@ -0,0 +1,27 @@
+"""add product sku
+
+Revision ID: f2b4d6e8a0c1
+Revises: e7a9c1d3f5b6
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b4d6e8a0c1'
+down_revision: Union[str, None] = 'e7a9c1d3f5b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('sku', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_products_sku'), 'products', ['sku'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_products_sku'), table_name='products')
+    op.drop_column('products', 'sku')
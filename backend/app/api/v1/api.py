@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, users, products, sales, earnings, sellers
+from app.api.v1.endpoints import auth, users, products, sales, earnings, sellers, devices, profiles, slow_queries
 
 api_router = APIRouter()
 
@@ -8,4 +8,7 @@ api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(products.router, prefix="/products", tags=["products"])
 api_router.include_router(sales.router, prefix="/sales", tags=["sales"])
 api_router.include_router(earnings.router, prefix="/earnings", tags=["earnings"])
-api_router.include_router(sellers.router, prefix="/sellers", tags=["sellers"])
\ No newline at end of file
+api_router.include_router(sellers.router, prefix="/sellers", tags=["sellers"])
+api_router.include_router(devices.router, prefix="/devices", tags=["devices"])
+api_router.include_router(profiles.router, prefix="/profiles", tags=["profiles"])
+api_router.include_router(slow_queries.router, prefix="/slow-queries", tags=["slow-queries"])
@@ -0,0 +1,115 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+from datetime import datetime
+from app.db.database import get_db
+from app.models.device import DeviceKey as DeviceKeyModel
+from app.models.user import User as UserModel
+from app.schemas.device import DeviceKey, DeviceKeyCreate, DeviceKeyCreated
+from app.core.device_keys import device_key_cache, generate_device_key
+from app.core.dependencies import require_interactive_admin
+
+router = APIRouter()
+
+
+@router.post(
+    "/",
+    response_model=DeviceKeyCreated,
+    status_code=status.HTTP_201_CREATED,
+    summary="Registrar terminal POS",
+    description="Crea una API key de larga duración para una terminal. La llave solo se muestra en esta respuesta."
+)
+def create_device_key(
+    device_in: DeviceKeyCreate,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(require_interactive_admin)
+):
+    """
+    Registra una terminal y genera su API key:
+    
+    - **name**: Nombre de la terminal
+    - **user_id**: Usuario en cuyo nombre opera la terminal (sus permisos aplican)
+    
+    La terminal se autentica enviando el header `X-API-Key: <api_key>`.
+    Solo administradores pueden registrar terminales.
+    """
+    user = db.query(UserModel).filter(UserModel.id == device_in.user_id).first()
+    if not user or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Usuario con ID {device_in.user_id} no encontrado o inactivo"
+        )
+    
+    raw_key, prefix, key_hash = generate_device_key()
+    device = DeviceKeyModel(
+        name=device_in.name,
+        key_prefix=prefix,
+        key_hash=key_hash,
+        user_id=user.id,
+        is_active=True,
+        created_at=datetime.now()
+    )
+    
+    try:
+        db.add(device)
+        db.commit()
+        db.refresh(device)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al registrar la terminal: {str(e)}"
+        )
+    
+    return DeviceKeyCreated(
+        **DeviceKey.model_validate(device).model_dump(),
+        api_key=raw_key
+    )
+
+
+@router.get(
+    "/",
+    response_model=List[DeviceKey],
+    summary="Listar terminales POS"
+)
+def read_device_keys(
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(require_interactive_admin)
+):
+    """Lista las terminales registradas (sin sus llaves). Solo admin."""
+    return db.query(DeviceKeyModel).order_by(DeviceKeyModel.id).all()
+
+
+@router.delete(
+    "/{device_id}",
+    response_model=DeviceKey,
+    summary="Revocar terminal POS",
+    description="Revoca la API key de una terminal. Todos los workers la descartan de su cache vía Redis."
+)
+def revoke_device_key(
+    device_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(require_interactive_admin)
+):
+    """Revoca la API key de una terminal. Solo admin."""
+    device = db.query(DeviceKeyModel).filter(DeviceKeyModel.id == device_id).first()
+    if not device:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Terminal con ID {device_id} no encontrada"
+        )
+    
+    try:
+        device.is_active = False
+        device.revoked_at = datetime.now()
+        db.commit()
+        db.refresh(device)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al revocar la terminal: {str(e)}"
+        )
+    
+    device_key_cache.revoke(device.key_prefix)
+    return device
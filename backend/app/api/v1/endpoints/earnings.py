@@ -211,30 +211,31 @@ def get_earnings_by_product(
     Parámetros:
     - **order_by**: profit (más rentables), quantity (más vendidos), margin (mayor margen)
     """
-    # Agrupar earnings por producto
+    # Agrupar earnings por producto (nombre incluido con JOIN, sin consultas por fila)
     results = db.query(
         EarningsModel.product_id,
+        ProductModel.name.label('product_name'),
         func.sum(EarningsModel.quantity).label('quantity_sold'),
         func.sum(EarningsModel.total_cost).label('total_invested'),
         func.sum(EarningsModel.total_revenue).label('total_generated'),
         func.sum(EarningsModel.profit).label('profit'),
         func.avg(EarningsModel.profit_margin).label('profit_margin')
-    ).group_by(EarningsModel.product_id).all()
+    ).join(
+        ProductModel, ProductModel.id == EarningsModel.product_id
+    ).group_by(EarningsModel.product_id, ProductModel.name).all()
     
-    # Construir respuesta con nombres de productos
+    # Construir respuesta
     earnings_list = []
     for result in results:
-        product = db.query(ProductModel).filter(ProductModel.id == result.product_id).first()
-        if product:
-            earnings_list.append(EarningsByProduct(
-                product_id=result.product_id,
-                product_name=product.name,
-                quantity_sold=int(result.quantity_sold) if result.quantity_sold else 0,
-                total_invested=float(result.total_invested) if result.total_invested else 0.0,
-                total_generated=float(result.total_generated) if result.total_generated else 0.0,
-                profit=float(result.profit) if result.profit else 0.0,
-                profit_margin=float(result.profit_margin) if result.profit_margin else 0.0
-            ))
+        earnings_list.append(EarningsByProduct(
+            product_id=result.product_id,
+            product_name=result.product_name,
+            quantity_sold=int(result.quantity_sold) if result.quantity_sold else 0,
+            total_invested=float(result.total_invested) if result.total_invested else 0.0,
+            total_generated=float(result.total_generated) if result.total_generated else 0.0,
+            profit=float(result.profit) if result.profit else 0.0,
+            profit_margin=float(result.profit_margin) if result.profit_margin else 0.0
+        ))
     
     # Ordenar según el parámetro
     if order_by == "profit":
@@ -367,47 +368,34 @@ def get_earnings_by_seller(
     
     Ordenado por ganancia de mayor a menor.
     """
-    # Obtener ventas completadas con earnings
-    sales = db.query(SalesModel).filter(
+    # Agregar ventas completadas y sus earnings por vendedor en una sola consulta
+    results = db.query(
+        SalesModel.seller_id,
+        SellersModel.name.label('seller_name'),
+        func.count(EarningsModel.id).label('total_sales'),
+        func.coalesce(func.sum(EarningsModel.total_revenue), 0.0).label('total_revenue'),
+        func.coalesce(func.sum(EarningsModel.total_cost), 0.0).label('total_cost'),
+        func.coalesce(func.sum(EarningsModel.profit), 0.0).label('profit')
+    ).join(
+        SellersModel, SellersModel.id == SalesModel.seller_id
+    ).outerjoin(
+        EarningsModel, EarningsModel.sale_id == SalesModel.id
+    ).filter(
         SalesModel.status == SaleStatus.COMPLETED.value
-    ).all()
-    
-    # Agrupar por vendedor
-    sellers_data = {}
-    
-    for sale in sales:
-        seller_id = sale.seller_id
-        
-        if seller_id not in sellers_data:
-            sellers_data[seller_id] = {
-                'total_sales': 0,
-                'total_revenue': 0.0,
-                'total_cost': 0.0,
-                'profit': 0.0
-            }
-        
-        # Buscar earnings de esta venta
-        earning = db.query(EarningsModel).filter(EarningsModel.sale_id == sale.id).first()
-        if earning:
-            sellers_data[seller_id]['total_sales'] += 1
-            sellers_data[seller_id]['total_revenue'] += earning.total_revenue
-            sellers_data[seller_id]['total_cost'] += earning.total_cost
-            sellers_data[seller_id]['profit'] += earning.profit
+    ).group_by(SalesModel.seller_id, SellersModel.name).all()
     
     # Construir respuesta con nombres de vendedores
     result = []
-    for seller_id, data in sellers_data.items():
-        seller = db.query(SellersModel).filter(SellersModel.id == seller_id).first()
-        if seller:
-            result.append(EarningsBySeller(
-                seller_id=seller_id,
-                seller_name=seller.name,
-                total_sales=data['total_sales'],
-                total_revenue=data['total_revenue'],
-                total_cost=data['total_cost'],
-                profit=data['profit'],
-                commission=None  # Se puede calcular basado en un porcentaje
-            ))
+    for row in results:
+        result.append(EarningsBySeller(
+            seller_id=row.seller_id,
+            seller_name=row.seller_name,
+            total_sales=row.total_sales,
+            total_revenue=float(row.total_revenue),
+            total_cost=float(row.total_cost),
+            profit=float(row.profit),
+            commission=None  # Se puede calcular basado en un porcentaje
+        ))
     
     # Ordenar por ganancia (mayor a menor)
     result.sort(key=lambda x: x.profit, reverse=True)
@@ -1,24 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Integer, String, column, func, insert, or_, update, values
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from typing import List, Literal, Optional, Tuple
 from datetime import datetime, timezone
 import os
-import time
-import shutil
+import hashlib
+from collections import Counter
+import logging
+import tempfile
 from pathlib import Path
+from starlette.concurrency import run_in_threadpool
 from app.db.database import get_db
+from app.db.search import TEXT_SEARCH_CONFIG, has_trigram, like_pattern, prefix_tsquery
 from app.models.product import Product as ProductModel
-from app.schemas.product import Product, ProductCreate, ProductUpdate
-from app.core.dependencies import get_current_active_user, require_admin, validate_pending_sale_in_product
+from app.models.stock_movement import StockMovement
+from app.schemas.product import (
+    Product, ProductCreate, ProductUpdate,
+    ProductCodeAssignment, ProductCodeAssignmentResult, ProductCodeMatch, ProductImportReport,
+    StockAdjustmentBatch, StockLevel, MAX_STOCK
+)
+from app.core.config import settings
+from app.core.dependencies import get_current_active_user, get_optional_user, require_admin, validate_pending_sale_in_product
+from app.core import image_store, pagination, product_csv
+from app.core.product_codes import product_code_index
+from app.core.images import generate_variants, variant_filenames, variants_exist
 from app.models.user import User as UserModel
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Configuración de uploads
 UPLOADS_DIR = "uploads/products"
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB para alta calidad
+MAX_FILE_SIZE = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024  # 10 MB para alta calidad
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Máximo de productos por lote en PUT /products/codes
+MAX_CODE_ASSIGNMENTS = 5000
+# Exportación CSV: en memoria hasta este tamaño, luego a disco
+EXPORT_SPOOL_SIZE = 8 * 1024 * 1024
+
+
+def detect_image_extension(header: bytes) -> Optional[str]:
+    """Extensión según los primeros bytes del archivo (magic bytes), o None si no es JPEG, PNG ni WebP"""
+    if header.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp"
+    return None
 
 
 def validate_image_file(file: UploadFile) -> None:
@@ -40,29 +73,86 @@ def validate_image_file(file: UploadFile) -> None:
         )
 
 
-def save_upload_file(file: UploadFile, product_id: int) -> str:
+def receive_upload_file(file: UploadFile) -> Tuple[str, str, str, int]:
     """
-    Guarda el archivo de imagen en máxima calidad sin compresión.
-    Retorna el nombre del archivo guardado.
+    Copia el archivo subido a un temporal en UPLOADS_DIR, en máxima calidad y sin compresión.
+    Retorna (ruta del temporal, SHA-256 del contenido, extensión, tamaño en bytes).
+    
+    Copia por bloques, calcula el hash mientras copia y corta en cuanto se pasa
+    de MAX_FILE_SIZE; el tipo se valida por los magic bytes. Es bloqueante:
+    llamarlo desde el thread pool.
     """
     # Crear directorio si no existe
     os.makedirs(UPLOADS_DIR, exist_ok=True)
     
-    # Generar nombre único
-    timestamp = int(time.time())
-    ext = Path(file.filename).suffix.lower()
-    filename = f"product_{product_id}_{timestamp}{ext}"
-    filepath = os.path.join(UPLOADS_DIR, filename)
-    
-    # Guardar archivo en calidad original (sin compresión)
-    with open(filepath, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    fd, temp_path = tempfile.mkstemp(dir=UPLOADS_DIR, prefix=".upload-", suffix=".part")
+    try:
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "wb") as buffer:
+            chunk = file.file.read(UPLOAD_CHUNK_SIZE)
+            ext = detect_image_extension(chunk[:12])
+            if ext is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="El contenido del archivo no es una imagen JPEG, PNG o WebP"
+                )
+            
+            # Guardar archivo en calidad original (sin compresión)
+            written = 0
+            while chunk:
+                written += len(chunk)
+                if written > MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Archivo muy grande. Tamaño máximo: {MAX_FILE_SIZE / (1024*1024):.0f} MB"
+                    )
+                digest.update(chunk)
+                buffer.write(chunk)
+                chunk = file.file.read(UPLOAD_CHUNK_SIZE)
+            buffer.flush()
+            os.fsync(buffer.fileno())
+    except BaseException:
+        os.remove(temp_path)
+        raise
     
-    return filename
+    return temp_path, digest.hexdigest(), ext, written
+
+
+def place_upload_file(temp_path: str, filename: str) -> bool:
+    """
+    Mueve el temporal a su nombre definitivo con un rename atómico.
+    Si ya existe un archivo con ese contenido, descarta el temporal y retorna False.
+    """
+    target = os.path.join(UPLOADS_DIR, filename)
+    if os.path.exists(target):
+        os.remove(temp_path)
+        return False
+    os.replace(temp_path, target)
+    return True
+
+
+def replace_product_image_url(db: Session, db_product: ProductModel, image_url: str) -> Optional[str]:
+    """Suelta la imagen anterior, apunta el producto a `image_url` y hace commit. Bloqueante."""
+    released = image_store.release_url(db, db_product.image_url)
+    db_product.image_url = image_url
+    db.commit()
+    return released
+
+
+def ensure_sku_available(db: Session, sku: str, product_id: Optional[int] = None) -> None:
+    """400 si el código ya lo tiene otro producto (activo o no)"""
+    query = db.query(ProductModel.id).filter(ProductModel.sku == sku)
+    if product_id is not None:
+        query = query.filter(ProductModel.id != product_id)
+    if query.first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Ya existe un producto con el código '{sku}'"
+        )
 
 
 def delete_image_file(image_url: str) -> None:
-    """Elimina el archivo de imagen del sistema de archivos"""
+    """Elimina el archivo de imagen y sus variantes del sistema de archivos"""
     if not image_url:
         return
     
@@ -70,14 +160,16 @@ def delete_image_file(image_url: str) -> None:
     # Si es URL completa: http://localhost:8000/uploads/products/product_1.jpg
     # Si es ruta relativa: /uploads/products/product_1.jpg
     filename = image_url.split("/")[-1]
-    filepath = os.path.join(UPLOADS_DIR, filename)
     
-    # Eliminar archivo si existe
-    if os.path.exists(filepath):
+    # Eliminar original y variantes si existen (lo que no se pueda borrar lo recoge el GC de imágenes)
+    for name in [filename] + variant_filenames(filename):
+        filepath = os.path.join(UPLOADS_DIR, name)
         try:
             os.remove(filepath)
-        except Exception as e:
-            print(f"Error al eliminar imagen: {e}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("No se pudo eliminar la imagen %s: %s", filepath, e)
 
 
 @router.post(
@@ -96,6 +188,7 @@ def create_product(
     Crea un nuevo producto:
     
     - **name**: Nombre único del producto
+    - **sku**: SKU o código de barras único (opcional)
     - **description**: Descripción opcional
     - **cost_price**: Precio de costo/inversión (requerido)
     - **price**: Precio de venta (opcional, se calcula automáticamente)
@@ -125,6 +218,9 @@ def create_product(
             detail=f"Ya existe un producto con el nombre '{product.name}'"
         )
     
+    if product.sku is not None:
+        ensure_sku_available(db, product.sku)
+    
     try:
         # Calcular precio y margen de ganancia
         calculated_price = product.price
@@ -170,6 +266,7 @@ def create_product(
         # Crear el producto
         db_product = ProductModel(
             name=product.name,
+            sku=product.sku,
             description=product.description,
             cost_price=product.cost_price,
             price=calculated_price,
@@ -180,9 +277,17 @@ def create_product(
             created_at=datetime.now(timezone.utc)
         )
         
+        # Si usa una imagen ya subida, cuenta como una referencia más
+        if not image_store.retain_url(db, product.image_url):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"La imagen '{product.image_url}' no existe"
+            )
+        
         db.add(db_product)
         db.commit()
         db.refresh(db_product)
+        product_code_index.changed([db_product])
         
         return db_product
         
@@ -190,7 +295,7 @@ def create_product(
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Error al crear el producto. Verifica que el nombre sea único."
+            detail="Error al crear el producto. Verifica que el nombre y el código sean únicos."
         )
     except HTTPException:
         db.rollback()
@@ -203,17 +308,286 @@ def create_product(
         )
 
 
+# Llaves de orden del listado; cada una tiene un índice parcial (columna, id) WHERE is_active
+PRODUCT_SORT_COLUMNS = {
+    "name": ProductModel.name,
+    "price": ProductModel.price,
+    "stock": ProductModel.stock,
+}
+
+
 @router.get("/", response_model=List[Product])
-def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_products(
+    response: Response,
+    sort: Literal["name", "price", "stock"] = Query("name", description="Ordenar por nombre, precio o stock"),
+    order: Literal["asc", "desc"] = Query("asc"),
+    name: Optional[str] = Query(None, min_length=1, max_length=100, description="Filtrar por fragmento del nombre"),
+    include_out_of_stock: bool = Query(False, description="Incluir productos sin stock"),
+    include_inactive: bool = Query(False, description="Incluir productos desactivados (solo admin)"),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    limit: int = Query(100, ge=1, le=100),
+    skip: int = Query(0, ge=0, description="Obsoleto: usar cursor (no se combina con él)"),
+    db: Session = Depends(get_db),
+    current_user: Optional[UserModel] = Depends(get_optional_user)
+):
     """
-    Obtiene una lista de productos con paginación (PÚBLICO - no requiere autenticación).
-    - **skip**: Número de productos a omitir (default: 0)
-    - **limit**: Número máximo de productos a retornar (default: 100)
+    Obtiene una lista de productos (PÚBLICO - no requiere autenticación).
+    - Por defecto solo productos activos y con stock
+    - **sort** / **order**: orden por name, price o stock (empates por id)
+    - **name**: fragmento del nombre, sin distinguir mayúsculas
+    - **include_out_of_stock**: incluir los que tienen stock 0
+    - **include_inactive**: incluir los desactivados (solo admin)
+    - **cursor** / **limit**: paginación por llave. Si hay más resultados la respuesta
+      trae el header `X-Next-Cursor`; enviarlo como `cursor` para pedir la siguiente página
+      (sin `skip`: combinarlos responde 400)
     """
-    products = db.query(ProductModel).offset(skip).limit(limit).all()
+    if include_inactive:
+        if current_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        require_admin(current_user)
+
+    column = PRODUCT_SORT_COLUMNS[sort]
+    descending = order == "desc"
+    query = db.query(ProductModel)
+    if not include_inactive:
+        # `is_active = true` (no `IS TRUE`) para que el planner use los índices parciales
+        query = query.filter(ProductModel.is_active == True)  # noqa: E712
+    if not include_out_of_stock:
+        query = query.filter(ProductModel.stock > 0)
+    if name:
+        query = query.filter(ProductModel.name.ilike(like_pattern(name), escape="\\"))
+    if cursor:
+        if skip:
+            # El cursor ya marca dónde sigue la página; sumar un offset saltaría filas
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="skip no se puede combinar con cursor"
+            )
+        query = query.filter(pagination.after(
+            [column, ProductModel.id], pagination.decode_cursor(cursor, sort, order, 2), descending
+        ))
+
+    if descending:
+        query = query.order_by(column.desc(), ProductModel.id.desc())
+    else:
+        query = query.order_by(column, ProductModel.id)
+    products = query.offset(skip).limit(limit).all()
+
+    if len(products) == limit:
+        last = products[-1]
+        pagination.set_next_cursor(response, pagination.encode_cursor(sort, order, [getattr(last, sort), last.id]))
     return products
 
 
+@router.get("/search", response_model=List[Product])
+def search_products(
+    q: str = Query(..., min_length=2, max_length=100, description="Texto a buscar en nombre y descripción"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Busca productos activos por nombre y descripción, ordenados por relevancia (PÚBLICO).
+    - Texto completo en español: cada palabra se busca como prefijo y con su raíz
+      ("zapatos" encuentra "zapato", "choco" encuentra "chocolate")
+    - Con pg_trgm también tolera errores de tipeo en el nombre ("chocolte")
+    - **skip** / **limit**: paginación sobre el orden por relevancia
+    """
+    tsquery_text = prefix_tsquery(q)
+    if tsquery_text is None:
+        return []
+    tsquery = func.to_tsquery(TEXT_SEARCH_CONFIG, tsquery_text)
+    matches = ProductModel.search_vector.op("@@")(tsquery)
+    rank = func.ts_rank_cd(ProductModel.search_vector, tsquery)
+    if has_trigram(db.get_bind()):
+        # `name %> q`: alguna palabra del nombre se parece a la búsqueda (índice GIN de trigramas)
+        matches = or_(matches, ProductModel.name.op("%>")(q))
+        rank = rank + func.word_similarity(q, ProductModel.name)
+
+    products = (
+        db.query(ProductModel)
+        .filter(ProductModel.is_active.is_(True), matches)
+        .order_by(rank.desc(), ProductModel.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    return products
+
+
+@router.get("/by-code/{code}", response_model=ProductCodeMatch)
+def read_product_by_code(code: str):
+    """
+    Busca un producto activo por SKU o código de barras (PÚBLICO).
+    Pensado para el lector de la caja: se responde desde un índice en memoria
+    del worker, sin consultar la base de datos.
+    - **code**: código exacto (sensible a mayúsculas)
+    """
+    entry = product_code_index.lookup(code.strip())
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    return entry
+
+
+@router.put(
+    "/codes",
+    response_model=ProductCodeAssignmentResult,
+    summary="Asignar códigos en lote",
+    description="Asigna o quita el SKU / código de barras de varios productos en una sola transacción."
+)
+def assign_product_codes(
+    assignments: List[ProductCodeAssignment] = Body(..., min_length=1, max_length=MAX_CODE_ASSIGNMENTS),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(require_admin)
+):
+    """
+    Asigna códigos a varios productos (SOLO ADMIN):
+    - Cada elemento es `{product_id, sku}`; `sku: null` quita el código
+    - Se pueden intercambiar códigos entre productos del mismo lote
+    - Todo o nada: si un producto no existe o un código ya lo tiene otro
+      producto fuera del lote, no se cambia ninguno
+    """
+    product_ids = [a.product_id for a in assignments]
+    codes = [a.sku for a in assignments if a.sku is not None]
+    if len(set(product_ids)) != len(product_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Un producto aparece más de una vez en el lote"
+        )
+    repeated = sorted(code for code, count in Counter(codes).items() if count > 1)
+    if repeated:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Códigos repetidos en el lote: {', '.join(repeated)}"
+        )
+
+    try:
+        # Bloquear los productos del lote para que nadie los edite a la vez
+        found = {
+            row.id for row in db.query(ProductModel.id)
+            .filter(ProductModel.id.in_(product_ids))
+            .with_for_update()
+        }
+        missing = [product_id for product_id in product_ids if product_id not in found]
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Productos no encontrados: {', '.join(map(str, missing))}"
+            )
+        if codes:
+            taken = db.query(ProductModel.sku).filter(
+                ProductModel.sku.in_(codes), ProductModel.id.notin_(product_ids)
+            ).all()
+            if taken:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Códigos ya asignados a otros productos: {', '.join(sorted(row.sku for row in taken))}"
+                )
+
+        # Quitar primero los códigos del lote: así un intercambio no choca con el índice único
+        returned = (ProductModel.id, ProductModel.sku, ProductModel.name, ProductModel.price, ProductModel.is_active)
+        changed = {
+            row.id: row for row in db.execute(
+                update(ProductModel).where(ProductModel.id.in_(product_ids)).values(sku=None).returning(*returned)
+            )
+        }
+        if codes:
+            new_codes = values(column("id", Integer), column("sku", String), name="new_codes").data(
+                [(a.product_id, a.sku) for a in assignments if a.sku is not None]
+            )
+            changed.update({
+                row.id: row for row in db.execute(
+                    update(ProductModel)
+                    .where(ProductModel.id == new_codes.c.id)
+                    .values(sku=new_codes.c.sku)
+                    .returning(*returned)
+                )
+            })
+        db.commit()
+    except IntegrityError:
+        # Otro request tomó uno de los códigos entre la validación y el UPDATE
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uno de los códigos ya fue asignado a otro producto; reintentar"
+        )
+    except HTTPException:
+        db.rollback()
+        raise
+
+    product_code_index.changed(list(changed.values()))
+    return {"updated": len(changed)}
+
+
+@router.post(
+    "/import",
+    response_model=ProductImportReport,
+    summary="Importar productos desde CSV",
+    description="Inserta o actualiza productos desde un CSV con COPY y reglas de precio aplicadas en SQL."
+)
+def import_products(
+    file: UploadFile = File(..., description="CSV con encabezado (name, cost_price y price o profit_margin)"),
+    dry_run: bool = Query(False, description="Solo validar y reportar, sin guardar"),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(require_admin)
+):
+    """
+    Importa un catálogo (SOLO ADMIN):
+    - Columnas: name, cost_price (obligatorias), price y/o profit_margin, sku,
+      description, stock, is_active
+    - Cada fila actualiza el producto con ese SKU o, si no, con ese nombre; si no
+      existe se crea. Al actualizar, una celda vacía conserva el valor actual
+    - Las filas con errores se reportan con su número de línea y no se importan;
+      las demás sí
+    - Hasta MAX_UPLOAD_SIZE_MB; para archivos más grandes usar
+      `python -m app.core.product_csv import`
+    """
+    try:
+        return product_csv.import_csv(db, file.file, dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    summary="Exportar productos a CSV",
+    description="Catálogo completo (activos e inactivos) en el formato que acepta /products/import."
+)
+def export_products(
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(require_admin)
+):
+    """
+    Exporta el catálogo con COPY (SOLO ADMIN). La salida se arma en un archivo
+    temporal (en memoria hasta EXPORT_SPOOL_SIZE) y se envía por partes, así la
+    conexión a la base se libera antes de empezar a transmitir.
+    """
+    out = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+    try:
+        product_csv.export_csv(db, out)
+    except Exception:
+        out.close()
+        raise
+    size = out.tell()
+    out.seek(0)
+
+    def chunks():
+        with out:
+            while chunk := out.read(UPLOAD_CHUNK_SIZE):
+                yield chunk
+
+    return StreamingResponse(
+        chunks(),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="productos.csv"', "Content-Length": str(size)}
+    )
+
+
 @router.get("/{product_id}", response_model=Product)
 def read_product(product_id: int, db: Session = Depends(get_db)):
     """
@@ -243,6 +617,7 @@ def update_product(
     Actualiza un producto existente:
     
     - **name**: Nombre único del producto
+    - **sku**: SKU o código de barras único
     - **cost_price**: Precio de costo/inversión
     - **price**: Precio de venta
     - **profit_margin**: Margen de ganancia en %
@@ -279,6 +654,8 @@ def update_product(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Ya existe otro producto con el nombre '{product.name}'"
             )
+    if product.sku is not None and product.sku != db_product.sku:
+        ensure_sku_available(db, product.sku, product_id)
     # Verificar precio si cambia o costo
     if (product.price is not None and product.cost_price is not None):
         if product.price <= product.cost_price:
@@ -299,6 +676,9 @@ def update_product(
             detail="El precio de venta no puede ser negativo"
         )
     
+    # Lo que ve el índice de códigos; si no cambia no hace falta avisar a los workers
+    indexed_before = (db_product.sku, db_product.name, db_product.price, db_product.is_active)
+    
     try:
         # Obtener valores actuales o nuevos
         current_cost = product.cost_price if product.cost_price is not None else db_product.cost_price
@@ -344,6 +724,9 @@ def update_product(
         if product.name is not None:
             db_product.name = product.name
         
+        if product.sku is not None:
+            db_product.sku = product.sku
+        
         if product.description is not None:
             db_product.description = product.description
         
@@ -355,14 +738,27 @@ def update_product(
         if product.stock is not None:
             db_product.stock = product.stock
         
-        if product.image_url is not None:
+        released = None
+        if product.image_url is not None and product.image_url != db_product.image_url:
+            # Mover la referencia: la imagen anterior puede quedar sin productos
+            if not image_store.retain_url(db, product.image_url):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"La imagen '{product.image_url}' no existe"
+                )
+            released = image_store.release_url(db, db_product.image_url)
             db_product.image_url = product.image_url
         
         if product.is_active is not None:
             db_product.is_active = product.is_active
         
+        indexed_changed = indexed_before != (db_product.sku, db_product.name, db_product.price, db_product.is_active)
         db.commit()
+        if released:
+            image_store.collect_quietly(db, UPLOADS_DIR, [released])
         db.refresh(db_product)
+        if indexed_changed:
+            product_code_index.changed([db_product])
         
         return db_product
         
@@ -370,7 +766,7 @@ def update_product(
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Error al actualizar el producto. Verifica que el nombre sea único."
+            detail="Error al actualizar el producto. Verifica que el nombre y el código sean únicos."
         )
     except HTTPException:
         db.rollback()
@@ -397,6 +793,7 @@ def delete_product(product_id: int, db: Session = Depends(get_db),
     try:
         db_product.is_active = False  # Desactivar en lugar de eliminar
         db.commit()
+        product_code_index.removed([product_id])
         return {"detail": f"Producto con ID {product_id} eliminado exitosamente"}
     except Exception as e:
         db.rollback()
@@ -405,6 +802,94 @@ def delete_product(product_id: int, db: Session = Depends(get_db),
             detail=f"Error interno del servidor al eliminar el producto: {str(e)}"
         )
 
+@router.patch(
+    "/stock",
+    response_model=List[StockLevel],
+    summary="Ajustar stock en lote",
+    description="Aplica un conteo de inventario o ajustes relativos a varios productos en una sola transacción."
+)
+def update_products_stock(
+    batch: StockAdjustmentBatch,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(require_admin)
+):
+    """
+    Ajusta el stock de varios productos (SOLO ADMIN):
+    - Cada ajuste es `{product_id, stock}` (conteo físico) o `{product_id, delta}`
+    - Todo o nada: si un producto no existe o un delta deja stock negativo o
+      por encima del máximo, no se aplica ninguno
+    - Cada cambio queda en `stock_movements` con el usuario y el motivo
+    - Responde el stock anterior y el nuevo de cada producto, en el orden recibido
+    """
+    product_ids = [a.product_id for a in batch.adjustments]
+    if len(set(product_ids)) != len(product_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Un producto aparece más de una vez en el lote"
+        )
+
+    try:
+        # Bloquear en orden de id: dos lotes simultáneos no pueden bloquearse mutuamente
+        current = dict(
+            db.query(ProductModel.id, ProductModel.stock)
+            .filter(ProductModel.id.in_(product_ids))
+            .order_by(ProductModel.id)
+            .with_for_update()
+            .all()
+        )
+        missing = [product_id for product_id in product_ids if product_id not in current]
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Productos no encontrados: {', '.join(map(str, missing))}"
+            )
+
+        levels = []
+        for adjustment in batch.adjustments:
+            previous = current[adjustment.product_id] or 0
+            new = adjustment.stock if adjustment.stock is not None else previous + adjustment.delta
+            levels.append(StockLevel(product_id=adjustment.product_id, previous_stock=previous, stock=new))
+        negative = [level.product_id for level in levels if level.stock < 0]
+        if negative:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El ajuste deja stock negativo en los productos: {', '.join(map(str, negative))}"
+            )
+        too_large = [level.product_id for level in levels if level.stock > MAX_STOCK]
+        if too_large:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El ajuste deja stock mayor a {MAX_STOCK} en los productos: {', '.join(map(str, too_large))}"
+            )
+
+        changed = [level for level in levels if level.stock != level.previous_stock]
+        if changed:
+            # Los valores se calcularon sobre las filas bloqueadas: un solo UPDATE para todo el lote
+            new_stock = values(column("id", Integer), column("stock", Integer), name="new_stock").data(
+                [(level.product_id, level.stock) for level in changed]
+            )
+            db.execute(
+                update(ProductModel)
+                .where(ProductModel.id == new_stock.c.id)
+                .values(stock=new_stock.c.stock)
+            )
+            now = datetime.now(timezone.utc)
+            db.execute(insert(StockMovement), [
+                {
+                    "product_id": level.product_id, "user_id": current_user.id,
+                    "previous_stock": level.previous_stock, "new_stock": level.stock,
+                    "change": level.stock - level.previous_stock, "reason": batch.reason, "created_at": now,
+                }
+                for level in changed
+            ])
+        db.commit()
+    except HTTPException:
+        db.rollback()
+        raise
+
+    return levels
+
+
 @router.patch("/{product_id}/stock",
               response_model=Product,
               status_code=status.HTTP_202_ACCEPTED,
@@ -412,7 +897,7 @@ def delete_product(product_id: int, db: Session = Depends(get_db),
               description="Actualiza la cantidad en inventario (stock) de un producto específico.")
 def update_product_stock(
     product_id: int,
-    stock: int = Query(..., ge=0, description="Nueva cantidad en inventario (stock)"),
+    stock: int = Query(..., ge=0, le=MAX_STOCK, description="Nueva cantidad en inventario (stock)"),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_active_user)
 ):
@@ -421,12 +906,14 @@ def update_product_stock(
     
     - **product_id**: ID del producto a actualizar
     - **stock**: Nueva cantidad en inventario (debe ser >= 0)
+    
+    El cambio queda en `stock_movements`. Para varios productos usar `PATCH /products/stock`.
     """
     # Verificar permisos de admin
     require_admin(current_user)
     
-    # Buscar el producto
-    db_product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
+    # Buscar el producto (bloqueado: el historial registra el stock anterior exacto)
+    db_product = db.query(ProductModel).filter(ProductModel.id == product_id).with_for_update().first()
     if db_product is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -434,6 +921,12 @@ def update_product_stock(
         )
     
     try:
+        previous = db_product.stock or 0
+        if stock != previous:
+            db.add(StockMovement(
+                product_id=product_id, user_id=current_user.id, previous_stock=previous, new_stock=stock,
+                change=stock - previous, created_at=datetime.now(timezone.utc)
+            ))
         db_product.stock = stock
         db.commit()
         db.refresh(db_product)
@@ -451,7 +944,7 @@ def update_product_stock(
     response_model=Product,
     status_code=status.HTTP_200_OK,
     summary="Subir imagen del producto",
-    description="Sube una imagen en máxima calidad para un producto. Formatos: jpg, jpeg, png, webp. Tamaño máximo: 10 MB."
+    description="Sube una imagen para un producto y genera sus variantes redimensionadas en WebP y JPEG. Formatos: jpg, jpeg, png, webp. Tamaño máximo: 10 MB."
 )
 async def upload_product_image(
     product_id: int,
@@ -460,16 +953,22 @@ async def upload_product_image(
     current_user: UserModel = Depends(get_current_active_user)
 ):
     """
-    Sube una imagen para un producto en MÁXIMA CALIDAD (sin compresión).
+    Sube una imagen para un producto.
     
     - **product_id**: ID del producto
     - **file**: Archivo de imagen (jpg, jpeg, png, webp)
     
     **Características:**
-    - Se guarda en calidad original sin compresión
-    - Tamaño máximo: 10 MB
-    - Si el producto ya tiene imagen, se reemplaza la anterior
-    - La imagen se sirve en: `/uploads/products/product_{id}_{timestamp}.ext`
+    - El original se guarda sin compresión
+    - Se generan las variantes `thumb` (160 px), `card` (480 px) y `detail` (1200 px)
+      en WebP y JPEG, en un pool de procesos; la respuesta las incluye en `image_variants`
+    - Tamaño máximo: 10 MB (se corta la subida en cuanto se excede)
+    - El tipo se verifica por el contenido (magic bytes), no solo por la extensión
+    - El archivo se guarda bajo el SHA-256 de su contenido: subir una imagen que ya
+      existe (para este u otro producto) reusa el archivo y sus variantes
+    - Si el producto ya tiene imagen, se reemplaza; la anterior se borra (con sus
+      variantes) solo si ningún otro producto la usa
+    - La imagen se sirve en `/uploads/products/{sha256}.ext` con `Cache-Control: immutable`
     
     **Ejemplo de uso con curl:**
     ```bash
@@ -481,54 +980,73 @@ async def upload_product_image(
     # Verificar permisos de admin
     require_admin(current_user)
     
-    # Verificar que el producto existe
-    db_product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
+    # Toda consulta a la base va al thread pool: `acquire` puede esperar el bloqueo
+    # de otra subida del mismo contenido, y esa espera no puede frenar el event loop
+    # (la otra subida necesita el loop para llegar a su commit)
+    db_product = await run_in_threadpool(
+        lambda: db.query(ProductModel).filter(ProductModel.id == product_id).first()
+    )
     if not db_product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Producto con ID {product_id} no encontrado"
         )
     
-    # Validar archivo
+    # Validar archivo (extensión y content-type; el contenido se valida al guardarlo)
     validate_image_file(file)
     
-    # Verificar tamaño del archivo
-    file.file.seek(0, 2)  # Ir al final del archivo
-    file_size = file.file.tell()  # Obtener posición (tamaño)
-    file.file.seek(0)  # Volver al inicio
-    
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"Archivo muy grande. Tamaño máximo: {MAX_FILE_SIZE / (1024*1024):.0f} MB"
-        )
-    
+    temp_path = None
+    placed = False
     try:
-        # Eliminar imagen anterior si existe
-        if db_product.image_url:
-            delete_image_file(db_product.image_url)
-        
-        # Guardar nueva imagen en máxima calidad
-        filename = save_upload_file(file, product_id)
-        
-        # Actualizar URL en la base de datos
-        # La URL será relativa: /uploads/products/product_1_1234567890.jpg
+        # Copiar a un temporal en máxima calidad, por bloques y fuera del event loop
+        # (el tamaño se controla y el hash se calcula mientras se copia)
+        temp_path, content_hash, ext, size = await run_in_threadpool(receive_upload_file, file)
+        filename = image_store.stored_filename(content_hash, ext)
         image_url = f"/uploads/products/{filename}"
-        db_product.image_url = image_url
         
-        db.commit()
-        db.refresh(db_product)
+        # Primero la referencia: con la fila bloqueada nadie borra estos archivos
+        await run_in_threadpool(image_store.acquire, db, content_hash, ext, size)
+        placed = await run_in_threadpool(place_upload_file, temp_path, filename)
+        temp_path = None
         
-        return db_product
+        # Un contenido ya subido reusa sus variantes; si Pillow no puede abrirla, no es una imagen
+        if placed or not await run_in_threadpool(variants_exist, filename, UPLOADS_DIR):
+            try:
+                await generate_variants(os.path.join(UPLOADS_DIR, filename), UPLOADS_DIR)
+            except Exception:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="El archivo no es una imagen válida"
+                )
+        
+        # Soltar la imagen anterior y actualizar la URL en la base de datos
+        # La URL será relativa: /uploads/products/{sha256}.jpg
+        previous_url = db_product.image_url
+        released = await run_in_threadpool(replace_product_image_url, db, db_product, image_url)
         
-    except HTTPException:
-        raise
     except Exception as e:
-        db.rollback()
+        # Los archivos recién creados se borran antes de soltar el bloqueo de la fila
+        if placed:
+            await run_in_threadpool(delete_image_file, image_url)
+        await run_in_threadpool(db.rollback)
+        if isinstance(e, HTTPException):
+            raise
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al subir la imagen: {str(e)}"
         )
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    # Eliminar la imagen anterior si ningún producto la usa (las de nombre anterior eran de este producto)
+    if released:
+        await run_in_threadpool(image_store.collect_quietly, db, UPLOADS_DIR, [released])
+    elif previous_url and previous_url != image_url and image_store.content_hash_of(previous_url) is None:
+        await run_in_threadpool(delete_image_file, previous_url)
+    
+    await run_in_threadpool(db.refresh, db_product)
+    return db_product
 
 
 @router.delete(
@@ -548,7 +1066,8 @@ def delete_product_image(
     
     - **product_id**: ID del producto
     
-    Elimina tanto el archivo físico como la referencia en la base de datos.
+    Elimina la referencia en la base de datos y el archivo físico si ningún
+    otro producto usa la misma imagen.
     """
     # Verificar permisos de admin
     require_admin(current_user)
@@ -568,13 +1087,19 @@ def delete_product_image(
         )
     
     try:
-        # Eliminar archivo físico
-        delete_image_file(db_product.image_url)
-        
         # Eliminar referencia en la base de datos
+        image_url = db_product.image_url
+        released = image_store.release_url(db, image_url)
         db_product.image_url = None
         
         db.commit()
+        
+        # Eliminar archivos físicos si ningún otro producto usa la imagen
+        if released:
+            image_store.collect_quietly(db, UPLOADS_DIR, [released])
+        elif image_store.content_hash_of(image_url) is None:
+            delete_image_file(image_url)
+        
         db.refresh(db_product)
         
         return db_product
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from typing import List
+from app.core.dependencies import require_admin
+from app.core.profiling import list_profiles, profile_path
+from app.models.user import User as UserModel
+from app.schemas.profile import ProfileInfo
+
+router = APIRouter()
+
+MEDIA_TYPES = {
+    "svg": "image/svg+xml",
+    "folded": "text/plain; charset=utf-8",
+    "json": "application/json",
+}
+
+
+@router.get(
+    "/",
+    response_model=List[ProfileInfo],
+    summary="Listar perfiles de requests",
+    description="Perfiles generados con el header `X-Profile: 1`, del más reciente al más viejo."
+)
+def read_profiles(current_user: UserModel = Depends(require_admin)):
+    """
+    Lista los perfiles guardados en este worker. Solo admin.
+    
+    Para generar uno, repetir el request lento agregando el header `X-Profile: 1`
+    (o `?_profile=1`); la respuesta trae `X-Profile-URL` con el enlace de descarga.
+    """
+    return list_profiles()
+
+
+@router.get(
+    "/{profile_id}",
+    summary="Descargar perfil",
+    description="Descarga el flame graph SVG (por defecto) o las pilas en formato folded."
+)
+def read_profile(
+    profile_id: str,
+    format: str = Query("svg", pattern="^(svg|folded|json)$", description="svg, folded o json"),
+    current_user: UserModel = Depends(require_admin)
+):
+    """
+    Descarga un perfil. Solo admin.
+    
+    - **svg**: flame graph, se abre directo en el navegador
+    - **folded**: pilas colapsadas (flamegraph.pl, speedscope)
+    - **json**: metadatos del request perfilado
+    """
+    path = profile_path(profile_id, format)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Perfil {profile_id} no encontrado (puede haber rotado o estar en otro worker)"
+        )
+    return FileResponse(path, media_type=MEDIA_TYPES[format], filename=f"profile_{profile_id}.{format}")
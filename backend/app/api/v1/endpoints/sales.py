@@ -105,8 +105,8 @@ def create_sale(
     
     **Cálculo automático:**
     - subtotal = product.price * quantity
-    - total_price = subtotal - (subtotal * discount / 100)
-    - amount_remaining = total_price - amount_paid
+    - total_price = subtotal - (subtotal * discount / 100), redondeado a centavos
+    - amount_remaining = total_price - amount_paid, redondeado a centavos
     - status = COMPLETED si amount_remaining = 0, PARTIAL si 0 < amount_remaining < total_price, PENDING si amount_remaining = total_price
     
     **Stock:** Se reduce automáticamente al crear la venta
@@ -151,17 +151,18 @@ def create_sale(
     
     try:
         # Calcular subtotal (precio * cantidad)
-        subtotal = product.price * sale.quantity
+        subtotal = round(product.price * sale.quantity, 2)
         
-        # Calcular total después de aplicar descuento
+        # Calcular total después de aplicar descuento, en centavos: es el total
+        # que muestra la caja y el que se cobra
         discount_amount = subtotal * (sale.discount / 100)
-        total_price = subtotal - discount_amount
+        total_price = round(subtotal - discount_amount, 2)
         
-        # Calcular monto restante
-        amount_remaining = total_price - sale.amount_paid
+        # Calcular monto restante (en centavos, nunca un residuo de float)
+        amount_remaining = round(total_price - sale.amount_paid, 2)
         
         # Validar que el monto pagado no sea mayor al total
-        if sale.amount_paid > total_price:
+        if amount_remaining < 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"El monto pagado ({sale.amount_paid}) no puede ser mayor al total ({total_price:.2f})"
@@ -199,7 +200,11 @@ def create_sale(
             _create_earnings_record(new_sale, product, db)
             db.commit()
         
-        return new_sale
+        # Recargar con producto y vendedor en la misma query (evita 2 cargas lazy al serializar)
+        return db.query(SalesModel).options(
+            joinedload(SalesModel.product),
+            joinedload(SalesModel.seller)
+        ).filter(SalesModel.id == new_sale.id).first()
         
     except IntegrityError as e:
         db.rollback()
@@ -240,6 +245,8 @@ def read_sales(
     - **end_date**: Fecha de fin para el rango
     - **skip/limit**: Paginación
     
+    Las ventas se ordenan de la más reciente a la más antigua.
+    
     Solo usuarios autenticados pueden acceder.
     """
     # Construir query base con eager loading de product y seller
@@ -261,6 +268,9 @@ def read_sales(
     if end_date:
         query = query.filter(SalesModel.created_at <= end_date)
     
+    # Más recientes primero (recorre los índices (..., created_at, id) hacia atrás)
+    query = query.order_by(SalesModel.created_at.desc(), SalesModel.id.desc())
+    
     # Aplicar paginación
     sales = query.offset(skip).limit(limit).all()
     
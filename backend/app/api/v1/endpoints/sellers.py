@@ -193,12 +193,14 @@ def get_sales_by_seller(
     db: Session = Depends(get_db)
 ):
     """
-    Obtener todas las ventas asociadas a un vendedor específico.
-    Requiere autenticación.
+    Obtener todas las ventas asociadas a un vendedor específico, de la más
+    reciente a la más antigua. Requiere autenticación.
     """
     sales = db.query(SalesModel).options(
         joinedload(SalesModel.product),
         joinedload(SalesModel.seller)
-    ).filter(SalesModel.seller_id == seller_id).offset(skip).limit(limit).all()
+    ).filter(SalesModel.seller_id == seller_id).order_by(
+        SalesModel.created_at.desc(), SalesModel.id.desc()
+    ).offset(skip).limit(limit).all()
     
     return sales
\ No newline at end of file
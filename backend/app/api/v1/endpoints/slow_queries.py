@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List
+from app.core.dependencies import require_admin
+from app.core.slow_queries import slow_query_log
+from app.models.user import User as UserModel
+from app.schemas.slow_query import SlowQuery, SlowQueryDetail
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    response_model=List[SlowQuery],
+    summary="Listar queries lentas",
+    description="Sentencias sobre SLOW_QUERY_THRESHOLD_MS agrupadas por ruta y fingerprint, por tiempo total."
+)
+def read_slow_queries(
+    limit: int = Query(50, ge=1, le=500, description="Número máximo de sentencias"),
+    current_user: UserModel = Depends(require_admin)
+):
+    """
+    Lista las sentencias lentas de todos los workers. Solo admin.
+
+    El orden es por tiempo total acumulado: primero lo que más carga le pone
+    a la base de datos, no la ejecución aislada más lenta.
+    """
+    try:
+        return slow_query_log.top(limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"No se pudo consultar el log de queries lentas: {str(e)}"
+        )
+
+
+@router.get(
+    "/{query_id}",
+    response_model=SlowQueryDetail,
+    summary="Detalle de una query lenta",
+    description="Incluye los planes EXPLAIN capturados para sus primeras ocurrencias."
+)
+def read_slow_query(query_id: str, current_user: UserModel = Depends(require_admin)):
+    """
+    Obtiene una sentencia lenta con sus planes. Solo admin.
+    """
+    try:
+        entry = slow_query_log.get(query_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"No se pudo consultar el log de queries lentas: {str(e)}"
+        )
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Query lenta {query_id} no encontrada (puede haber expirado)"
+        )
+    return entry
+
+
+@router.delete(
+    "/",
+    summary="Vaciar el log de queries lentas",
+    description="Borra las sentencias y planes registrados, por ejemplo después de agregar un índice."
+)
+def clear_slow_queries(current_user: UserModel = Depends(require_admin)):
+    """
+    Vacía el log. Solo admin.
+
+    Las siguientes ocurrencias vuelven a capturar sus planes.
+    """
+    try:
+        deleted = slow_query_log.clear()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"No se pudo consultar el log de queries lentas: {str(e)}"
+        )
+    return {"message": "Log de queries lentas vaciado", "deleted": deleted}
@@ -1,14 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from datetime import datetime, timezone
 from app.db.database import get_db
+from app.db.search import has_trigram, like_pattern
 from app.models.user import User as UserModel
-from app.schemas.user import User, UserCreate, UserUpdate
+from app.schemas.user import User, UserCreate, UserUpdate, UserSession
 from app.core.security import get_password_hash
-from app.core.dependencies import get_current_active_user, require_admin
+from app.core.dependencies import get_current_active_user, get_current_interactive_user, require_admin
+from app.core.session import session_store
+from app.core.device_keys import device_key_cache
 from pydantic import BaseModel, Field
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -23,6 +30,27 @@ class PasswordUpdate(BaseModel):
     new_password: str = Field(..., min_length=8)
 
 
+def _revoke_user_sessions(user_id: int) -> int:
+    """
+    Elimina todas las sesiones Redis de un usuario usando el índice por usuario.
+    Un fallo de Redis no revierte la desactivación: get_current_active_user_with_session
+    sigue rechazando usuarios inactivos.
+    """
+    try:
+        return session_store.delete_user_sessions(user_id)
+    except Exception as e:
+        logger.warning("No se pudieron revocar las sesiones del usuario %s: %s", user_id, e)
+        return 0
+
+
+def _refresh_user_devices(user_id: int) -> None:
+    """
+    Descarta en todos los workers las llaves de terminal en cache del usuario,
+    para que reflejen de inmediato su perfil, rol o desactivación.
+    """
+    device_key_cache.user_changed(user_id)
+
+
 @router.get(
     "/me",
     response_model=User,
@@ -34,6 +62,17 @@ def read_user_me(current_user: UserModel = Depends(get_current_active_user)):
     return current_user
 
 
+@router.delete(
+    "/me/sessions",
+    summary="Cerrar sesión en todos los dispositivos",
+    description="Elimina todas las sesiones activas del usuario autenticado"
+)
+def delete_own_sessions(current_user: UserModel = Depends(get_current_interactive_user)):
+    """Cierra todas las sesiones del usuario autenticado."""
+    revoked = _revoke_user_sessions(current_user.id)
+    return {"message": "Sesiones cerradas correctamente", "revoked": revoked}
+
+
 @router.get(
     "/",
     response_model=List[User],
@@ -45,7 +84,7 @@ def read_users(
     limit: int = 100,
     search: Optional[str] = Query(None, description="Buscar por username o email"),
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(get_current_interactive_user)
 ):
     """Lista todos los usuarios con paginación y búsqueda opcional. Solo admin."""
     require_admin(current_user)
@@ -53,11 +92,20 @@ def read_users(
     query = db.query(UserModel)
     
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (UserModel.username.ilike(search_term)) | 
-            (UserModel.email.ilike(search_term))
-        )
+        # ILIKE '%texto%' usa los índices de trigramas; con pg_trgm también
+        # encuentra usernames con errores de tipeo y ordena por similitud
+        search_term = like_pattern(search)
+        matches = UserModel.username.ilike(search_term, escape="\\") | UserModel.email.ilike(search_term, escape="\\")
+        if has_trigram(db.get_bind()):
+            query = query.filter(matches | UserModel.username.op("%>")(search)).order_by(
+                func.greatest(
+                    func.word_similarity(search, UserModel.username),
+                    func.word_similarity(search, UserModel.email)
+                ).desc(),
+                UserModel.id
+            )
+        else:
+            query = query.filter(matches).order_by(UserModel.id)
     
     users = query.offset(skip).limit(limit).all()
     return users
@@ -72,7 +120,7 @@ def read_users(
 def read_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(get_current_interactive_user)
 ):
     """Obtiene un usuario por su ID. Requiere estar autenticado."""
     user = db.query(UserModel).filter(UserModel.id == user_id).first()
@@ -94,7 +142,7 @@ def update_user(
     user_id: int,
     user_update: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(get_current_interactive_user)
 ):
     """
     Actualiza un usuario existente:
@@ -158,13 +206,20 @@ def update_user(
         if user_update.full_name is not None:
             user.full_name = user_update.full_name
         
+        deactivated = False
         if user_update.is_active is not None and user_update.is_active != user.is_active:
             user.is_active = user_update.is_active
+            deactivated = not user_update.is_active
             
         if user_update.role is not None and user_update.role != user.role:
             user.role = user_update.role
         db.commit()
         db.refresh(user)
+        _refresh_user_devices(user.id)
+        
+        # Al desactivar un usuario se cierran todas sus sesiones
+        if deactivated:
+            _revoke_user_sessions(user.id)
         
         return user
         
@@ -191,7 +246,7 @@ def update_user(
 def update_own_user(
     user_update: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(get_current_interactive_user)
 ):
     """
     Actualiza el perfil del usuario autenticado:
@@ -262,6 +317,7 @@ def update_own_user(
         # is_active y role no pueden ser actualizados por el usuario mismo
         db.commit()
         db.refresh(user)
+        _refresh_user_devices(user.id)
         return user
         
     except IntegrityError:
@@ -278,7 +334,7 @@ def update_own_user(
         )
         
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: int, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_active_user)):
+def delete_user(user_id: int, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_interactive_user)):
     require_admin(current_user)
     
     user = db.query(UserModel).filter(UserModel.id == user_id).first()
@@ -298,13 +354,62 @@ def delete_user(user_id: int, db: Session = Depends(get_db), current_user: UserM
     try:
         user.is_active = False
         db.commit()
-        return user_id
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error interno del servidor al eliminar el usuario"
         )
+    
+    # Cerrar todas las sesiones y terminales del usuario desactivado
+    _revoke_user_sessions(user_id)
+    _refresh_user_devices(user_id)
+    return user_id
+
+
+@router.get(
+    "/{user_id}/sessions",
+    response_model=List[UserSession],
+    summary="Listar sesiones de un usuario",
+    description="Lista las sesiones activas de un usuario (solo admin)."
+)
+def read_user_sessions(
+    user_id: int,
+    current_user: UserModel = Depends(get_current_interactive_user)
+):
+    """Lista las sesiones activas de un usuario usando su índice en Redis. Solo admin."""
+    require_admin(current_user)
+    
+    try:
+        return session_store.list_user_sessions(user_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"No se pudo consultar el almacén de sesiones: {str(e)}"
+        )
+
+
+@router.delete(
+    "/{user_id}/sessions",
+    summary="Revocar sesiones de un usuario",
+    description="Cierra todas las sesiones activas de un usuario (solo admin)."
+)
+def delete_user_sessions(
+    user_id: int,
+    current_user: UserModel = Depends(get_current_interactive_user)
+):
+    """Revoca todas las sesiones de un usuario. Solo admin."""
+    require_admin(current_user)
+    
+    try:
+        revoked = session_store.delete_user_sessions(user_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"No se pudo consultar el almacén de sesiones: {str(e)}"
+        )
+    
+    return {"message": "Sesiones revocadas correctamente", "revoked": revoked}
 
 
 @router.put("/{user_id}/role", response_model=User)
@@ -312,7 +417,7 @@ def update_user_role(
     user_id: int,
     role_data: RoleUpdate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(get_current_interactive_user)
 ):
     """
     Actualizar rol de usuario (solo admin).
@@ -337,6 +442,7 @@ def update_user_role(
     user.role = role_data.role
     db.commit()
     db.refresh(user)
+    _refresh_user_devices(user.id)
     
     return user
 
@@ -346,7 +452,7 @@ def update_user_password(
     user_id: int,
     password_data: PasswordUpdate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(get_current_interactive_user)
 ):
     """
     Actualizar contraseña de usuario (solo admin).
@@ -17,6 +17,10 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
     
+    # Pool de conexiones (por worker)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    
     # Security - Sin valores por defecto inseguros
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
@@ -28,6 +32,73 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_PASSWORD: str = ""
     SESSION_EXPIRE_SECONDS: int = 86400  # 24 horas
+    REDIS_MAX_CONNECTIONS: int = 50
+    
+    # Pre-calentar pools de DB y Redis en el arranque del worker
+    PREWARM_CONNECTIONS: bool = True
+    
+    # API keys de terminales POS
+    DEVICE_KEY_CACHE_SECONDS: int = 300  # Tiempo máximo en cache local por worker
+    
+    # Índice de códigos de producto por worker (GET /products/by-code/{code})
+    PRODUCT_CODE_REFRESH_SECONDS: int = 300  # Recarga completa si no hay suscripción a Redis
+    
+    # Readiness (/health/ready)
+    HEALTH_DB_TIMEOUT_MS: int = 500
+    HEALTH_REDIS_TIMEOUT_MS: int = 250
+    HEALTH_CACHE_SECONDS: float = 1.5  # Reutilizar el último resultado entre probes
+    HEALTH_POOL_CHECKOUT_WAIT_MS: int = 200  # Espera por una conexión del pool que cuenta como saturado
+    HEALTH_POOL_WAIT_WINDOW_SECONDS: float = 10.0  # Ventana de la mayor espera reportada
+    
+    # Thread pool de AnyIO (endpoints síncronos) y monitor de saturación
+    THREADPOOL_SIZE: int = 40  # Hilos por worker; el default de AnyIO es 40
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_MS: int = 250  # Cada cuánto se mide el lag y el thread pool
+    LOOP_LAG_WARN_MS: float = 100.0  # Lag del event loop que cuenta como saturación
+    SATURATION_WARN_SECONDS: float = 5.0  # Saturación sostenida antes de loguear (y entre logs)
+    
+    # Instrumentación por request (Server-Timing y log de requests costosos)
+    # Server-Timing expone a cualquier cliente cuántas queries y cuánto tiempo de DB
+    # cuesta cada ruta: solo para desarrollo (docker-compose.yml lo activa)
+    SERVER_TIMING_ENABLED: bool = False
+    REQUEST_QUERY_BUDGET: int = 20  # Máximo de sentencias SQL por request antes de loguear
+    REQUEST_LATENCY_BUDGET_MS: int = 500  # Latencia máxima antes de loguear
+    
+    # Perfilado bajo demanda (header X-Profile: 1 de un admin)
+    PROFILING_ENABLED: bool = True
+    PROFILING_DIR: str = "/tmp/punto-venta-profiles"
+    PROFILING_MAX_PROFILES: int = 50  # Se borran los más viejos
+    PROFILING_INTERVAL_MS: float = 2.0  # Intervalo de muestreo
+    
+    # Subidas: tamaño máximo de imagen (el cuerpo del request se corta al pasarlo)
+    MAX_UPLOAD_SIZE_MB: int = 10
+    
+    # Servir /uploads: "app" (el worker envía los bytes; zero-copy si el servidor ASGI
+    # soporta pathsend) o "x-accel" (el worker solo resuelve la ruta y nginx envía el archivo)
+    UPLOADS_SERVE_MODE: str = "app"
+    UPLOADS_ACCEL_PREFIX: str = "/_uploads/"  # location `internal` de nginx con alias a uploads/
+    
+    # Variantes de imágenes de productos (miniatura, tarjeta y detalle en WebP/JPEG)
+    IMAGE_PROCESS_WORKERS: int = 2  # Procesos para redimensionar, por worker
+    IMAGE_WEBP_QUALITY: int = 80
+    IMAGE_JPEG_QUALITY: int = 82
+    
+    # Redimensionado bajo demanda (/uploads/products/{archivo}?w=&q=&fmt=)
+    IMAGE_RESIZE_WIDTHS: List[int] = [160, 240, 320, 480, 640, 800, 960, 1200, 1600]  # Únicos anchos aceptados
+    IMAGE_RESIZE_QUALITIES: List[int] = [50, 65, 80, 90]  # Calidades aceptadas además de las de arriba
+    IMAGE_RESIZE_CACHE_DIR: str = "uploads/.resized"  # Oculto: solo se sirve a través de ?w=
+    IMAGE_RESIZE_CACHE_MAX_MB: int = 512  # Se borran los menos usados al pasarlo
+    
+    # GC de imágenes huérfanas (python -m app.core.image_gc)
+    IMAGE_GC_GRACE_HOURS: int = 24  # Archivos más nuevos no se tocan (subidas en curso)
+    
+    # Log de queries lentas (agregado en Redis, ver /api/v1/slow-queries)
+    SLOW_QUERY_LOG_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0  # Duración mínima para registrar una sentencia
+    SLOW_QUERY_EXPLAIN_SAMPLES: int = 3  # EXPLAIN capturados por sentencia y ruta
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS: int = 5000  # statement_timeout del EXPLAIN ANALYZE
+    SLOW_QUERY_EXPLAIN_LOCK_TIMEOUT_MS: int = 100  # lock_timeout del EXPLAIN: nunca espera a un request
+    SLOW_QUERY_RETENTION_HOURS: int = 168  # Sin nuevas ocurrencias, la entrada expira
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:5173", "http://localhost:3000"]
@@ -46,6 +117,12 @@ class Settings(BaseSettings):
             raise ValueError('POSTGRES_PASSWORD debe tener al menos 8 caracteres')
         return v
     
+    @field_validator('UPLOADS_SERVE_MODE')
+    def validate_uploads_serve_mode(cls, v):
+        if v not in ('app', 'x-accel'):
+            raise ValueError('UPLOADS_SERVE_MODE debe ser "app" o "x-accel"')
+        return v
+    
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -1,8 +1,8 @@
-from fastapi import Depends, HTTPException, status, Cookie
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, HTTPException, status, Cookie, Security
+from fastapi.security import OAuth2PasswordBearer, APIKeyHeader
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Union
 from app.core.config import settings
 from app.db.database import get_db
 from app.models.user import User
@@ -10,10 +10,17 @@ from app.schemas.user import TokenData
 from app.models.sales import Sales
 from app.schemas.sales import SaleStatus
 from app.core.session import session_store
+from app.core.device_keys import device_key_cache, DevicePrincipal
 
 # OAuth2 scheme para extraer el token del header Authorization
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+# Variante opcional: permite que una terminal se autentique solo con X-API-Key
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
+
+# API key de terminal POS en el header X-API-Key
+device_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+
 
 def get_current_user(
     token: str = Depends(oauth2_scheme),
@@ -90,8 +97,51 @@ def get_current_user_from_session(
     return user
 
 
+def get_current_principal(
+    api_key: Optional[str] = Security(device_key_header),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Union[User, DevicePrincipal]:
+    """
+    Dependency que acepta una API key de terminal (X-API-Key) o un JWT.
+    La API key se verifica con HMAC contra un cache en proceso, sin bcrypt
+    ni consulta a la base de datos mientras esté en cache.
+    """
+    if api_key:
+        principal = device_key_cache.verify(api_key, db)
+        if principal is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="API key de terminal inválida o revocada",
+                headers={"WWW-Authenticate": "ApiKey"},
+            )
+        return principal
+    
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return get_current_user(token=token, db=db)
+
+
+def get_optional_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Optional[User]:
+    """
+    Dependency para endpoints públicos que muestran más a usuarios autenticados.
+    Sin token retorna None (sin consultar la base); un token inválido es 401.
+    """
+    if not token:
+        return None
+    return get_current_user(token=token, db=db)
+
+
 def get_current_active_user(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ) -> User:
     """
     Dependency para obtener el usuario actual y verificar que esté activo.
@@ -131,6 +181,31 @@ def require_admin(
         )
     return current_user
 
+
+def get_current_interactive_user(
+    current_user: User = Depends(get_current_active_user)
+) -> User:
+    """
+    Como get_current_active_user, pero rechaza las API keys de terminal: una
+    llave filtrada no debe poder crear más llaves ni cambiar usuarios o contraseñas.
+    """
+    if isinstance(current_user, DevicePrincipal):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Esta acción requiere iniciar sesión; no está permitida con API key de terminal"
+        )
+    return current_user
+
+
+def require_interactive_admin(
+    current_user: User = Depends(get_current_interactive_user)
+) -> User:
+    """
+    Dependency para acciones de administrador que no pueden hacerse desde una terminal.
+    """
+    return require_admin(current_user)
+
+
 def validate_pending_sale_in_product(
     product_id: int,
     db: Session = Depends(get_db)
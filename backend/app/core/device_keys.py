@@ -0,0 +1,264 @@
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import update
+from sqlalchemy.orm import Session, joinedload
+from app.core.config import settings
+from app.core.session import session_store
+from app.models.device import DeviceKey
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "pvk"
+REVOKED_KEY = "device_key:revoked:{prefix}"
+REVOKED_CHANNEL = "device_keys:revoked"
+USER_MESSAGE_PREFIX = "user:"  # En el canal: descartar todas las llaves de ese usuario
+
+
+@dataclass(frozen=True)
+class DevicePrincipal:
+    """
+    Principal autenticado con API key de terminal.
+
+    Expone los mismos atributos que el modelo User que usan los endpoints
+    (id, username, role, is_active...) para poder usarse en su lugar.
+    """
+    id: int
+    username: str
+    email: str
+    full_name: Optional[str]
+    role: str
+    is_active: bool
+    created_at: datetime
+    device_id: int
+    device_name: str
+
+
+@dataclass
+class _CacheEntry:
+    key_hash: str
+    principal: DevicePrincipal
+    expires_at: float
+
+
+def hash_device_key(raw_key: str) -> str:
+    """HMAC-SHA256 de la llave con SECRET_KEY (rápido, sin bcrypt)"""
+    return hmac.new(
+        settings.SECRET_KEY.encode(),
+        raw_key.encode(),
+        hashlib.sha256
+    ).hexdigest()
+
+
+def generate_device_key() -> Tuple[str, str, str]:
+    """
+    Genera una nueva llave de terminal.
+    Retorna (llave_completa, prefijo, hash). La llave completa solo se muestra una vez.
+    """
+    prefix = secrets.token_hex(6)
+    raw_key = f"{KEY_PREFIX}_{prefix}_{secrets.token_urlsafe(32)}"
+    return raw_key, prefix, hash_device_key(raw_key)
+
+
+def parse_key_prefix(raw_key: str) -> Optional[str]:
+    """Extrae el prefijo público de una llave con formato pvk_<prefijo>_<secreto>"""
+    parts = raw_key.split("_", 2)
+    if len(parts) != 3 or parts[0] != KEY_PREFIX or not parts[1] or not parts[2]:
+        return None
+    return parts[1]
+
+
+class DeviceKeyCache:
+    """
+    Cache en proceso de llaves de terminal verificadas.
+
+    Un acierto en cache cuesta un HMAC y una comparación en tiempo constante.
+    Las revocaciones (de una llave, o de todas las de un usuario que cambió o
+    se desactivó) se publican en Redis: cada worker escucha el canal y
+    descarta las entradas de inmediato; el TTL acota el retraso si Redis falla.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, _CacheEntry] = {}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listener_retry_at = 0.0
+
+    def verify(self, raw_key: str, db: Session) -> Optional[DevicePrincipal]:
+        """
+        Verifica una llave y retorna el principal asociado, o None si no es válida.
+        """
+        prefix = parse_key_prefix(raw_key)
+        if prefix is None:
+            return None
+
+        self._ensure_listener()
+        key_hash = hash_device_key(raw_key)
+
+        entry = self._entries.get(prefix)
+        if entry and entry.expires_at > time.monotonic():
+            if hmac.compare_digest(entry.key_hash, key_hash):
+                return entry.principal
+            return None
+
+        # Cache miss: validar contra la base de datos y Redis
+        principal = self._load(prefix, key_hash, db)
+        if principal is None:
+            self.evict(prefix)
+        return principal
+
+    def _load(self, prefix: str, key_hash: str, db: Session) -> Optional[DevicePrincipal]:
+        if self._is_revoked(prefix):
+            return None
+
+        device = (
+            db.query(DeviceKey)
+            .options(joinedload(DeviceKey.user))
+            .filter(DeviceKey.key_prefix == prefix)
+            .first()
+        )
+        if device is None or not device.is_active:
+            return None
+        if not hmac.compare_digest(device.key_hash, key_hash):
+            return None
+
+        # Un usuario desactivado no opera con ninguna de sus terminales
+        user = device.user
+        if user is None or not user.is_active:
+            return None
+
+        principal = DevicePrincipal(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            is_active=bool(user.is_active),
+            created_at=user.created_at,
+            device_id=device.id,
+            device_name=device.name
+        )
+
+        # Registrar último uso (solo en cache miss, no en cada request)
+        self._touch(db, device.id)
+
+        with self._lock:
+            self._entries[prefix] = _CacheEntry(
+                key_hash=device.key_hash,
+                principal=principal,
+                expires_at=time.monotonic() + settings.DEVICE_KEY_CACHE_SECONDS
+            )
+        return principal
+
+    @staticmethod
+    def _touch(db: Session, device_id: int) -> None:
+        """
+        Actualiza last_used_at en una transacción propia: la sesión del request
+        no se confirma desde la dependencia de autenticación.
+        """
+        try:
+            with db.get_bind().begin() as conn:
+                conn.execute(
+                    update(DeviceKey).where(DeviceKey.id == device_id).values(last_used_at=datetime.now())
+                )
+        except Exception as e:
+            logger.warning("No se pudo registrar el uso de la terminal %s: %s", device_id, e)
+
+    def evict(self, prefix: str) -> None:
+        """Elimina una llave del cache local"""
+        with self._lock:
+            self._entries.pop(prefix, None)
+
+    def evict_user(self, user_id: int) -> None:
+        """Elimina del cache local todas las llaves de un usuario"""
+        with self._lock:
+            for prefix in [p for p, entry in self._entries.items() if entry.principal.id == user_id]:
+                del self._entries[prefix]
+
+    def user_changed(self, user_id: int) -> None:
+        """
+        Después de editar o desactivar un usuario: todos los workers descartan
+        sus llaves y el siguiente request lo vuelve a leer de la base.
+        """
+        self.evict_user(user_id)
+        try:
+            session_store.redis_client.publish(REVOKED_CHANNEL, f"{USER_MESSAGE_PREFIX}{user_id}")
+        except Exception as e:
+            logger.warning("No se pudo publicar el cambio del usuario %s a las terminales: %s", user_id, e)
+
+    def revoke(self, prefix: str) -> None:
+        """
+        Marca la llave como revocada en Redis y avisa a todos los workers.
+        """
+        self.evict(prefix)
+        try:
+            redis_client = session_store.redis_client
+            redis_client.set(REVOKED_KEY.format(prefix=prefix), 1)
+            redis_client.publish(REVOKED_CHANNEL, prefix)
+        except Exception as e:
+            logger.warning("No se pudo publicar la revocación de la llave %s: %s", prefix, e)
+
+    def start(self) -> None:
+        """Suscribirse al canal de revocaciones desde el arranque del worker"""
+        self._ensure_listener()
+
+    def stop(self) -> None:
+        """Detener el listener y vaciar el cache (apagado del worker)"""
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+            self._entries.clear()
+
+    def _is_revoked(self, prefix: str) -> bool:
+        try:
+            return bool(session_store.redis_client.exists(REVOKED_KEY.format(prefix=prefix)))
+        except Exception:
+            # Sin Redis, la base de datos (is_active) sigue siendo la fuente de verdad
+            return False
+
+    def _ensure_listener(self) -> None:
+        if self._listener is not None or time.monotonic() < self._listener_retry_at:
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            try:
+                pubsub = session_store.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{REVOKED_CHANNEL: self._on_revoked})
+                self._listener = pubsub.run_in_thread(
+                    sleep_time=1.0, daemon=True, exception_handler=self._on_listener_error
+                )
+            except Exception as e:
+                # Reintentar más tarde; mientras tanto aplica el TTL
+                self._listener_retry_at = time.monotonic() + settings.DEVICE_KEY_CACHE_SECONDS
+                logger.warning("No se pudo suscribir a revocaciones de llaves: %s", e)
+
+    def _on_listener_error(self, error, pubsub, thread) -> None:
+        """
+        Se perdió la suscripción: detener el thread y vaciar el cache, porque
+        pudo perderse alguna revocación. El próximo verify se resuscribe.
+        """
+        thread.stop()
+        with self._lock:
+            if self._listener is thread:
+                self._listener = None
+                self._entries.clear()
+        logger.warning("Se perdió la suscripción a revocaciones de llaves: %s", error)
+
+    def _on_revoked(self, message) -> None:
+        data = str(message["data"])
+        if data.startswith(USER_MESSAGE_PREFIX):
+            self.evict_user(int(data[len(USER_MESSAGE_PREFIX):]))
+        else:
+            self.evict(data)
+
+
+# Instancia global del cache de llaves de terminal
+device_key_cache = DeviceKeyCache()
@@ -0,0 +1,190 @@
+"""
+Chequeo de readiness: mide la latencia real de PostgreSQL y Redis.
+
+Las pruebas corren en un executor propio (no en el thread pool de AnyIO que
+atiende los endpoints) y bajo timeouts cortos. El resultado se cachea unos
+instantes para que los probes de Docker/balanceadores no agreguen carga.
+
+`asyncio.wait_for` solo deja de esperar: el hilo del executor seguiría
+bloqueado en el socket. Por eso los probes usan sus propios clientes, con
+timeouts del lado del cliente (connect_timeout y pool_timeout para
+PostgreSQL, socket_timeout y socket_connect_timeout para Redis), y un pool
+saturado de la aplicación no hace esperar al probe.
+
+La saturación del pool de la aplicación se mide en los checkouts reales de
+los requests (TimedQueuePool): si alguno espera, o esperó dentro de la
+ventana reciente, más de HEALTH_POOL_CHECKOUT_WAIT_MS, la base se reporta
+como `saturated` y el readiness responde 503.
+"""
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+import redis
+from anyio import to_thread
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from app.core.config import settings
+from app.core.session import session_store
+from app.db.database import TimedQueuePool, get_engine
+
+PROBE_THREADS = 2
+
+# Hilos dedicados: si los workers de AnyIO están saturados el probe no se encola detrás
+_probe_executor = ThreadPoolExecutor(max_workers=PROBE_THREADS, thread_name_prefix="health-probe")
+_cache_lock = asyncio.Lock()
+_cached: Optional[Dict[str, Any]] = None
+_cached_at = 0.0
+
+# Clientes del probe, creados a partir del engine y el pool de Redis actuales
+_clients_lock = threading.Lock()
+_probe_engine: Optional[Engine] = None
+_probe_engine_source: Optional[Engine] = None
+_probe_redis: Optional[redis.Redis] = None
+_probe_redis_source = None
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def _database_probe_engine(engine: Engine) -> Engine:
+    """
+    Engine chico para el probe, con la misma URL que el de la aplicación.
+    Si no hay conexión libre o el servidor no responde al conectar, falla
+    dentro del timeout del chequeo en vez de bloquear el hilo.
+    """
+    global _probe_engine, _probe_engine_source
+    with _clients_lock:
+        if _probe_engine_source is not engine:
+            if _probe_engine is not None:
+                _probe_engine.dispose()
+            timeout = settings.HEALTH_DB_TIMEOUT_MS / 1000
+            _probe_engine = create_engine(
+                engine.url,
+                pool_size=PROBE_THREADS,
+                max_overflow=0,
+                pool_timeout=timeout,
+                pool_pre_ping=False,
+                # libpq solo acepta segundos enteros
+                connect_args={"connect_timeout": max(1, math.ceil(timeout))}
+            )
+            _probe_engine_source = engine
+        return _probe_engine
+
+
+def _redis_probe_client() -> redis.Redis:
+    """Cliente Redis del probe: mismo servidor, con timeouts de socket propios"""
+    global _probe_redis, _probe_redis_source
+    pool = session_store.redis_client.connection_pool
+    with _clients_lock:
+        if _probe_redis_source is not pool:
+            if _probe_redis is not None:
+                _probe_redis.connection_pool.disconnect()
+            timeout = settings.HEALTH_REDIS_TIMEOUT_MS / 1000
+            _probe_redis = redis.Redis(connection_pool=redis.ConnectionPool(
+                connection_class=pool.connection_class,
+                max_connections=PROBE_THREADS,
+                **{**pool.connection_kwargs, "socket_timeout": timeout, "socket_connect_timeout": timeout}
+            ))
+            _probe_redis_source = pool
+        return _probe_redis
+
+
+def close_probe_clients() -> None:
+    """Cierra las conexiones de los probes (apagado del worker)"""
+    global _probe_engine, _probe_engine_source, _probe_redis, _probe_redis_source
+    with _clients_lock:
+        if _probe_engine is not None:
+            _probe_engine.dispose()
+        if _probe_redis is not None:
+            _probe_redis.connection_pool.disconnect()
+        _probe_engine = _probe_engine_source = _probe_redis = _probe_redis_source = None
+
+
+def _check_database() -> Dict[str, Any]:
+    engine = get_engine()
+    with _database_probe_engine(engine).connect() as conn:
+        conn.execute(text(f"SET LOCAL statement_timeout = {int(settings.HEALTH_DB_TIMEOUT_MS)}"))
+        started = time.perf_counter()
+        conn.execute(text("SELECT 1"))
+        latency_ms = _elapsed_ms(started)
+        conn.rollback()
+
+    result = {"status": "ok", "latency_ms": latency_ms}
+    # Uso del pool de la aplicación (sin esperar turno en él)
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        result["pool"] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow()
+        }
+    if isinstance(pool, TimedQueuePool):
+        waiting, checkout_wait_ms = pool.checkout_waits.snapshot()
+        result["pool"]["waiting"] = waiting
+        result["pool"]["checkout_wait_ms"] = checkout_wait_ms
+        if checkout_wait_ms > settings.HEALTH_POOL_CHECKOUT_WAIT_MS:
+            result["status"] = "saturated"
+    return result
+
+
+def _check_redis() -> Dict[str, Any]:
+    client = _redis_probe_client()
+    started = time.perf_counter()
+    client.ping()
+    return {"status": "ok", "latency_ms": _elapsed_ms(started)}
+
+
+async def _run_probe(probe, timeout_ms: int) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(_probe_executor, probe),
+            timeout=timeout_ms / 1000
+        )
+    except asyncio.TimeoutError:
+        return {"status": "timeout", "latency_ms": _elapsed_ms(started)}
+    except Exception as e:
+        return {"status": "error", "latency_ms": _elapsed_ms(started), "error": str(e)}
+
+
+def _thread_pool_stats() -> Dict[str, Any]:
+    stats = to_thread.current_default_thread_limiter().statistics()
+    return {
+        "total": stats.total_tokens,
+        "in_use": stats.borrowed_tokens,
+        "queued": stats.tasks_waiting
+    }
+
+
+async def check_readiness() -> Dict[str, Any]:
+    """
+    Ejecuta (o reutiliza del cache) el chequeo de DB y Redis.
+    Debe llamarse desde el event loop.
+    """
+    global _cached, _cached_at
+
+    async with _cache_lock:
+        now = time.monotonic()
+        if _cached is not None and now - _cached_at < settings.HEALTH_CACHE_SECONDS:
+            return {**_cached, "cached": True, "thread_pool": _thread_pool_stats()}
+
+        database, redis_result = await asyncio.gather(
+            _run_probe(_check_database, settings.HEALTH_DB_TIMEOUT_MS),
+            _run_probe(_check_redis, settings.HEALTH_REDIS_TIMEOUT_MS)
+        )
+        ready = database["status"] == "ok" and redis_result["status"] == "ok"
+
+        _cached = {
+            "status": "ready" if ready else "unavailable",
+            "database": database,
+            "redis": redis_result
+        }
+        _cached_at = time.monotonic()
+
+    return {**_cached, "cached": False, "thread_pool": _thread_pool_stats()}
@@ -0,0 +1,198 @@
+"""
+Cache en disco de imágenes redimensionadas bajo demanda.
+
+`GET /uploads/products/{archivo}?w=480&q=80&fmt=webp` genera la imagen la
+primera vez en el pool de procesos de Pillow y la guarda en
+IMAGE_RESIZE_CACHE_DIR; los siguientes pedidos la sirven directo del disco.
+
+- Solo se aceptan los anchos de IMAGE_RESIZE_WIDTHS, las calidades de
+  IMAGE_RESIZE_QUALITIES (o la por defecto del formato) y `webp`/`jpeg`:
+  variar los parámetros no puede llenar el disco ni esquivar el cache.
+- Pedidos simultáneos de la misma imagen en un worker esperan una única
+  generación.
+- Cada hit actualiza el mtime del archivo; cuando el cache pasa de
+  IMAGE_RESIZE_CACHE_MAX_MB se borran los de mtime más viejo (LRU) hasta
+  quedar en el 90 %.
+- `image_resize_requests_total{result="hit"|"miss"}` da la tasa de aciertos.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import QueryParams
+from app.core import metrics
+from app.core.config import settings
+from app.core.images import VARIANT_EXTENSIONS, resize_image
+
+logger = logging.getLogger(__name__)
+
+RESIZE_PARAMS = ("w", "q", "fmt")
+RESIZABLE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+EVICTION_TARGET = 0.9  # Al desalojar se baja hasta este porcentaje del máximo
+
+
+@dataclass(frozen=True)
+class ResizeRequest:
+    width: int
+    quality: int
+    fmt: str
+
+
+def _default_quality(fmt: str) -> int:
+    return settings.IMAGE_WEBP_QUALITY if fmt == "webp" else settings.IMAGE_JPEG_QUALITY
+
+
+def parse_resize_request(query_string: str) -> Optional[ResizeRequest]:
+    """
+    Parámetros de redimensionado del query string, o None si no pide ninguno.
+    Lanza ValueError con el motivo si alguno no está en la lista permitida.
+    """
+    params = QueryParams(query_string)
+    if not params:
+        return None
+    unknown = sorted(set(params.keys()) - set(RESIZE_PARAMS))
+    if unknown:
+        raise ValueError(f"Parámetros no permitidos: {', '.join(unknown)}")
+    if any(len(params.getlist(name)) > 1 for name in RESIZE_PARAMS):
+        raise ValueError("Cada parámetro se puede enviar una sola vez")
+    if "w" not in params:
+        raise ValueError("El parámetro w es requerido")
+
+    fmt = params.get("fmt", "jpeg")
+    if fmt not in VARIANT_EXTENSIONS:
+        raise ValueError(f"fmt debe ser uno de: {', '.join(VARIANT_EXTENSIONS)}")
+    width = _whitelisted_int(params["w"], settings.IMAGE_RESIZE_WIDTHS, "w")
+    quality = _default_quality(fmt)
+    if "q" in params:
+        quality = _whitelisted_int(params["q"], settings.IMAGE_RESIZE_QUALITIES + [quality], "q")
+    return ResizeRequest(width=width, quality=quality, fmt=fmt)
+
+
+def _whitelisted_int(value: str, allowed, name: str) -> int:
+    if not value.isdigit() or int(value) not in allowed:
+        raise ValueError(f"{name} debe ser uno de: {', '.join(str(v) for v in sorted(set(allowed)))}")
+    return int(value)
+
+
+class ResizeCache:
+    """Imágenes redimensionadas en disco con desalojo LRU por tamaño total"""
+
+    def __init__(self):
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._size_lock = threading.Lock()
+        self._estimated_bytes: Optional[int] = None  # Incluye lo escrito por este worker desde el último recorrido
+
+    @property
+    def directory(self) -> str:
+        return settings.IMAGE_RESIZE_CACHE_DIR
+
+    def cache_filename(self, source_name: str, request: ResizeRequest) -> str:
+        return f"{Path(source_name).stem}_w{request.width}_q{request.quality}{VARIANT_EXTENSIONS[request.fmt]}"
+
+    async def get(self, source_path: str, request: ResizeRequest) -> Tuple[str, bool]:
+        """Ruta de la imagen redimensionada (generándola si falta) y si fue un hit"""
+        path = os.path.join(self.directory, self.cache_filename(os.path.basename(source_path), request))
+        if await run_in_threadpool(self._touch, path):
+            metrics.IMAGE_RESIZE_REQUESTS.labels(result="hit").inc()
+            return path, True
+
+        metrics.IMAGE_RESIZE_REQUESTS.labels(result="miss").inc()
+        pending = self._pending.get(path)
+        if pending is not None:
+            await asyncio.shield(pending)
+            return path, False
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[path] = future
+        try:
+            started = time.perf_counter()
+            os.makedirs(self.directory, exist_ok=True)
+            size = await resize_image(source_path, path, request.width, request.fmt, request.quality)
+            metrics.IMAGE_RESIZE_DURATION.observe(time.perf_counter() - started)
+            future.set_result(path)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Marcada como leída: quien espera la recibe igual
+            raise
+        finally:
+            del self._pending[path]
+
+        if self._grow(size):
+            await run_in_threadpool(self.evict)
+        return path, False
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        """Marca el archivo como recién usado; False si no está en el cache"""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _grow(self, size: int) -> bool:
+        """Suma lo escrito a la estimación; True si hay que recorrer el directorio y desalojar"""
+        with self._size_lock:
+            if self._estimated_bytes is None:
+                return True
+            self._estimated_bytes += size
+            return self._estimated_bytes > settings.IMAGE_RESIZE_CACHE_MAX_MB * 1024 * 1024
+
+    def evict(self) -> int:
+        """
+        Recorre el cache (incluye lo que escribieron otros workers) y borra los
+        archivos usados hace más tiempo hasta quedar bajo el máximo. Retorna los
+        archivos borrados.
+        """
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.is_file() and not entry.name.endswith(".part"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            pass
+
+        total = sum(size for _, size, _ in entries)
+        limit = settings.IMAGE_RESIZE_CACHE_MAX_MB * 1024 * 1024
+        removed = 0
+        if total > limit:
+            target = limit * EVICTION_TARGET
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+            metrics.IMAGE_RESIZE_EVICTIONS.inc(removed)
+            logger.info("Cache de imágenes redimensionadas: %d archivos desalojados", removed)
+
+        with self._size_lock:
+            self._estimated_bytes = total
+        return removed
+
+    def remove_for(self, source_name: str) -> int:
+        """Borra las versiones redimensionadas de un original (al borrarlo); retorna los bytes liberados"""
+        freed = 0
+        for path in Path(self.directory).glob(f"{Path(source_name).stem}_w*_q*"):
+            try:
+                freed += path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        return freed
+
+
+resize_cache = ResizeCache()
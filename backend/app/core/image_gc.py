@@ -0,0 +1,288 @@
+"""
+Recolector de imágenes huérfanas en uploads/products.
+
+Un archivo es huérfano si ningún producto lo referencia: originales de
+productos que cambiaron de imagen cuando el borrado falló, variantes sin su
+original, temporales `.part` de subidas interrumpidas, etc. El recolector:
+
+1. Lee `products.image_url` con un cursor del servidor, como nombres base
+   (sin extensión) ordenados.
+2. Lista el directorio y lo ordena por nombre base con un ordenamiento
+   externo (tandas ordenadas en archivos temporales y merge), así la memoria
+   no depende de cuántos archivos haya.
+3. Cruza ambas secuencias ordenadas (merge join). Cada original se agrupa con
+   sus variantes (`{base}_card.webp`, ...).
+4. Borra, o mueve a `--quarantine`, los grupos sin referencias cuyo archivo
+   más nuevo es más viejo que el período de gracia.
+
+Antes de borrar una imagen direccionada por contenido se toma el bloqueo de
+su fila en `product_images` (creándola si hace falta) y se vuelve a verificar
+que ningún producto la use, igual que `image_store.collect`. Una subida
+simultánea del mismo contenido espera y vuelve a escribir los archivos.
+
+Uso:
+    python -m app.core.image_gc --dry-run
+    python -m app.core.image_gc --grace-hours 48 --quarantine /var/tmp/huerfanas
+"""
+import argparse
+import heapq
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import create_engine, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.core import image_store
+from app.core.config import settings
+from app.core.image_cache import resize_cache
+from app.core.images import UPLOADS_URL_PREFIX, VARIANT_NAME
+from app.models.product import Product
+from app.models.product_image import ProductImage
+
+logger = logging.getLogger(__name__)
+
+PRODUCTS_UPLOADS_DIR = "uploads/products"
+CONTENT_HASH = re.compile(r"^[0-9a-f]{64}$")
+RUN_SIZE = 10_000  # Nombres por tanda del ordenamiento externo
+FETCH_SIZE = 1_000  # Filas por vuelta del cursor del servidor
+
+
+@dataclass
+class GcReport:
+    scanned_files: int = 0
+    referenced_files: int = 0
+    recent_files: int = 0  # Huérfanos dentro del período de gracia
+    orphan_files: int = 0
+    removed_files: int = 0  # Borrados o movidos a cuarentena
+    reclaimed_bytes: int = 0
+    released_products: int = 0  # Con --release-inactive
+    errors: int = 0
+
+
+def base_name(filename: str) -> str:
+    """Nombre base del original al que pertenece un archivo (a sí mismo si es un temporal)"""
+    if filename.startswith(".") or filename.endswith(".part"):
+        return filename
+    match = VARIANT_NAME.match(filename)
+    if match:
+        return match.group("base")
+    return os.path.splitext(filename)[0]
+
+
+def _stem_expression():
+    """Nombre base de `products.image_url` en SQL, con orden de bytes como Python"""
+    filename = func.substr(Product.image_url, len(UPLOADS_URL_PREFIX) + 1)
+    return func.regexp_replace(filename, r"\.[^./]*$", "").collate("C")
+
+
+def referenced_bases(engine: Engine) -> Iterator[str]:
+    """Nombres base referenciados por productos, ordenados y sin repetir, leídos en tandas"""
+    stem = _stem_expression()
+    query = (
+        Session(bind=engine).query(stem)
+        .filter(Product.image_url.startswith(UPLOADS_URL_PREFIX, autoescape=True))
+        .distinct()
+        .order_by(stem)
+        .execution_options(stream_results=True, yield_per=FETCH_SIZE)
+    )
+    try:
+        for (value,) in query:
+            yield value
+    finally:
+        query.session.close()
+
+
+def sorted_directory(directory: str, run_size: int = RUN_SIZE) -> Iterator[Tuple[str, str]]:
+    """
+    (nombre base, archivo) de cada archivo del directorio, ordenados, con
+    memoria acotada: tandas de `run_size` ordenadas en temporales y un merge.
+    """
+    with ExitStack() as stack:
+        runs = []
+
+        def flush(batch):
+            run = stack.enter_context(tempfile.TemporaryFile("w+", encoding="utf-8"))
+            run.writelines(f"{base}\t{name}\n" for base, name in sorted(batch))
+            run.seek(0)
+            runs.append(run)
+
+        batch: List[Tuple[str, str]] = []
+        try:
+            with os.scandir(directory) as scan:
+                for entry in scan:
+                    # Directorios (cache de redimensionadas) y nombres que no genera la app quedan fuera
+                    if not entry.is_file(follow_symlinks=False) or "\t" in entry.name or "\n" in entry.name:
+                        continue
+                    batch.append((base_name(entry.name), entry.name))
+                    if len(batch) >= run_size:
+                        flush(batch)
+                        batch = []
+        except FileNotFoundError:
+            return
+        flush(batch)
+
+        for line in heapq.merge(*runs):
+            base, name = line.rstrip("\n").split("\t")
+            yield base, name
+
+
+def _is_still_unreferenced(db: Session, base: str) -> bool:
+    stem = _stem_expression()
+    return db.query(Product.id).filter(
+        Product.image_url.startswith(UPLOADS_URL_PREFIX, autoescape=True), stem == base
+    ).first() is None
+
+
+def _dispose(path: str, quarantine_dir: Optional[str]) -> None:
+    if quarantine_dir:
+        shutil.move(path, os.path.join(quarantine_dir, os.path.basename(path)))
+    else:
+        os.remove(path)
+
+
+def _remove_group(engine: Engine, directory: str, base: str, files: List[Tuple[str, int]],
+                  quarantine_dir: Optional[str], report: GcReport) -> None:
+    """Borra (o pone en cuarentena) un original huérfano con sus variantes, verificando bajo bloqueo"""
+    with Session(bind=engine) as db:
+        content_addressed = CONTENT_HASH.match(base) is not None
+        if content_addressed:
+            # La fila bloqueada frena una subida o un PUT que la esté volviendo a usar
+            extension = os.path.splitext(files[0][0])[1]
+            db.execute(insert(ProductImage).values(
+                content_hash=base, extension=extension, size_bytes=0, ref_count=0,
+                created_at=datetime.now(timezone.utc)
+            ).on_conflict_do_nothing(index_elements=[ProductImage.content_hash]))
+            db.query(ProductImage).filter(ProductImage.content_hash == base).with_for_update().one()
+        if not base.startswith(".") and not _is_still_unreferenced(db, base):
+            db.rollback()
+            report.referenced_files += len(files)
+            return
+
+        for name, size in files:
+            try:
+                _dispose(os.path.join(directory, name), quarantine_dir)
+                report.removed_files += 1
+                report.reclaimed_bytes += size + resize_cache.remove_for(name)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                report.errors += 1
+                logger.warning("No se pudo recolectar %s: %s", name, e)
+        if content_addressed:
+            db.query(ProductImage).filter(ProductImage.content_hash == base).delete()
+        db.commit()
+
+
+def release_inactive_products(engine: Engine) -> int:
+    """Quita la imagen de los productos desactivados para que el GC pueda recogerla"""
+    with Session(bind=engine) as db:
+        products = db.query(Product).filter(
+            Product.is_active.is_(False), Product.image_url.isnot(None)
+        ).with_for_update().all()
+        for product in products:
+            image_store.release_url(db, product.image_url)
+            product.image_url = None
+        db.commit()
+        return len(products)
+
+
+def collect_orphans(
+    engine: Engine,
+    directory: str = PRODUCTS_UPLOADS_DIR,
+    grace: timedelta = timedelta(hours=settings.IMAGE_GC_GRACE_HOURS),
+    quarantine_dir: Optional[str] = None,
+    dry_run: bool = False,
+    release_inactive: bool = False,
+    run_size: int = RUN_SIZE,
+) -> GcReport:
+    """Recorre el directorio contra `products.image_url` y recoge lo huérfano; retorna el reporte"""
+    report = GcReport()
+    if release_inactive and not dry_run:
+        report.released_products = release_inactive_products(engine)
+    if quarantine_dir and not dry_run:
+        os.makedirs(quarantine_dir, exist_ok=True)
+    cutoff = time.time() - grace.total_seconds()
+
+    referenced = referenced_bases(engine)
+    current_ref = next(referenced, None)
+    try:
+        for base, entries in groupby(sorted_directory(directory, run_size), key=lambda item: item[0]):
+            files = []
+            newest = 0.0
+            for _, name in entries:
+                try:
+                    stat = os.stat(os.path.join(directory, name))
+                except FileNotFoundError:
+                    continue
+                files.append((name, stat.st_size))
+                newest = max(newest, stat.st_mtime)
+            report.scanned_files += len(files)
+
+            while current_ref is not None and current_ref < base:
+                current_ref = next(referenced, None)
+            if current_ref == base:
+                report.referenced_files += len(files)
+                continue
+            if newest > cutoff:
+                report.recent_files += len(files)
+                continue
+
+            report.orphan_files += len(files)
+            if dry_run:
+                report.reclaimed_bytes += sum(size for _, size in files)
+                continue
+            _remove_group(engine, directory, base, files, quarantine_dir, report)
+    finally:
+        referenced.close()
+
+    if not dry_run:
+        # Filas sin referencias cuyos archivos ya no estaban (o fallaron al borrarse)
+        with Session(bind=engine) as db:
+            released_before = datetime.now(timezone.utc) - grace
+            report.reclaimed_bytes += image_store.collect(db, directory, released_before=released_before)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Borra o pone en cuarentena las imágenes que ningún producto usa")
+    parser.add_argument("--directory", default=PRODUCTS_UPLOADS_DIR)
+    parser.add_argument("--grace-hours", type=float, default=settings.IMAGE_GC_GRACE_HOURS,
+                        help="No tocar archivos modificados hace menos de estas horas")
+    parser.add_argument("--quarantine", help="Mover los huérfanos a este directorio en vez de borrarlos")
+    parser.add_argument("--dry-run", action="store_true", help="Solo reportar")
+    parser.add_argument("--release-inactive", action="store_true",
+                        help="Quitar antes la imagen de los productos desactivados")
+    parser.add_argument("--database-url", help="Por defecto, DATABASE_URL de la configuración")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from app.db.database import get_engine
+        engine = get_engine()
+
+    started = time.perf_counter()
+    report = collect_orphans(
+        engine, args.directory, timedelta(hours=args.grace_hours),
+        quarantine_dir=args.quarantine, dry_run=args.dry_run, release_inactive=args.release_inactive
+    )
+    elapsed = time.perf_counter() - started
+
+    for key, value in asdict(report).items():
+        print(f"✓ {key}: {value}")
+    action = "se liberarían" if args.dry_run else ("movidos a cuarentena" if args.quarantine else "liberados")
+    print(f"\n✅ {report.reclaimed_bytes / (1024 * 1024):.1f} MB {action} en {elapsed:.1f} s")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Almacenamiento de imágenes de productos direccionado por contenido.
+
+Cada original se guarda como `{sha256}{ext}` y sus variantes como
+`{sha256}_{variante}{ext}`. Como el nombre depende solo del contenido:
+
+- subir el mismo archivo otra vez (o para otro producto) no escribe nada
+  nuevo ni vuelve a generar variantes,
+- una URL nunca cambia de contenido, así que se sirve con
+  `Cache-Control: immutable` y ni el navegador ni el proxy revalidan.
+
+La tabla `product_images` lleva la cuenta de productos que referencian cada
+imagen. Los incrementos y decrementos van en la misma transacción que cambia
+`products.image_url`; los archivos de una imagen solo se borran con su fila
+bloqueada y `ref_count = 0`, así que una subida concurrente del mismo
+contenido espera al borrado y vuelve a escribir los archivos.
+"""
+import logging
+import os
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy import case, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.image_cache import resize_cache
+from app.core.images import CONTENT_ADDRESSED_NAME, UPLOADS_URL_PREFIX, variant_filenames
+from app.models.product_image import ProductImage
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def stored_filename(content_hash: str, extension: str) -> str:
+    return f"{content_hash}{extension}"
+
+
+def content_hash_of(image_url: Optional[str]) -> Optional[str]:
+    """Hash de una URL de imagen direccionada por contenido, o None (URL externa o nombre anterior)"""
+    if not image_url or not image_url.startswith(UPLOADS_URL_PREFIX):
+        return None
+    match = CONTENT_ADDRESSED_NAME.match(image_url[len(UPLOADS_URL_PREFIX):])
+    return match.group(1) if match else None
+
+
+def is_content_addressed(filename: str) -> bool:
+    return CONTENT_ADDRESSED_NAME.match(filename) is not None
+
+
+def acquire(db: Session, content_hash: str, extension: str, size_bytes: int) -> None:
+    """
+    Suma una referencia a la imagen, creando su fila si no existe.
+
+    El upsert deja la fila bloqueada hasta el commit: mientras tanto ningún
+    `collect` puede borrar sus archivos, así que después de llamarlo es seguro
+    colocar el original y generar las variantes.
+    """
+    statement = insert(ProductImage).values(
+        content_hash=content_hash, extension=extension, size_bytes=size_bytes,
+        ref_count=1, created_at=datetime.now(timezone.utc)
+    )
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[ProductImage.content_hash],
+        set_={"ref_count": ProductImage.ref_count + 1, "released_at": None}
+    ))
+
+
+def retain_url(db: Session, image_url: Optional[str]) -> bool:
+    """
+    Suma una referencia a una imagen ya subida (un producto que pasa a usar su URL).
+    Retorna False si la URL es direccionada por contenido pero la imagen no existe.
+    URLs externas o con el nombre anterior no se cuentan.
+    """
+    content_hash = content_hash_of(image_url)
+    if content_hash is None:
+        return True
+    result = db.execute(
+        update(ProductImage)
+        .where(ProductImage.content_hash == content_hash)
+        .values(ref_count=ProductImage.ref_count + 1, released_at=None)
+    )
+    return result.rowcount == 1
+
+
+def release_url(db: Session, image_url: Optional[str]) -> Optional[str]:
+    """
+    Resta una referencia. Retorna el hash si la imagen quedó sin referencias
+    (candidata a `collect` después del commit), o None.
+    """
+    content_hash = content_hash_of(image_url)
+    if content_hash is None:
+        return None
+    remaining = db.execute(
+        update(ProductImage)
+        .where(ProductImage.content_hash == content_hash, ProductImage.ref_count > 0)
+        .values(
+            ref_count=ProductImage.ref_count - 1,
+            released_at=case((ProductImage.ref_count == 1, datetime.now(timezone.utc)), else_=None)
+        )
+        .returning(ProductImage.ref_count)
+    ).scalar()
+    return content_hash if remaining == 0 else None
+
+
+def _remove_files(directory: str, filename: str) -> int:
+    """Borra el original, sus variantes y sus versiones redimensionadas; retorna los bytes liberados"""
+    freed = 0
+    for name in [filename] + variant_filenames(filename):
+        path = os.path.join(directory, name)
+        try:
+            freed += os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        freed += resize_cache.remove_for(name)
+    return freed
+
+
+def collect(
+    db: Session,
+    directory: str,
+    content_hashes: Optional[List[str]] = None,
+    released_before: Optional[datetime] = None
+) -> int:
+    """
+    Borra archivos y filas de imágenes sin referencias; retorna los bytes liberados.
+
+    Con `content_hashes` solo revisa esas (lo que un endpoint acaba de
+    liberar); con `released_before`, solo las que quedaron sin referencias
+    antes de esa fecha. Las filas se bloquean con SKIP LOCKED: una imagen que
+    otra transacción está volviendo a referenciar se deja para después.
+    """
+    query = db.query(ProductImage).filter(ProductImage.ref_count == 0)
+    if content_hashes is not None:
+        if not content_hashes:
+            return 0
+        query = query.filter(ProductImage.content_hash.in_(content_hashes))
+    if released_before is not None:
+        query = query.filter(ProductImage.released_at < released_before)
+    freed = 0
+    try:
+        for image in query.with_for_update(skip_locked=True).all():
+            freed += _remove_files(directory, stored_filename(image.content_hash, image.extension))
+            db.delete(image)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return freed
+
+
+def collect_quietly(db: Session, directory: str, content_hashes: List[str]) -> None:
+    """`collect` después de responder un cambio de imagen: un error solo deja basura para el próximo"""
+    try:
+        collect(db, directory, content_hashes)
+    except Exception as e:
+        logger.warning("No se pudieron borrar imágenes sin referencias %s: %s", content_hashes, e)
@@ -0,0 +1,268 @@
+"""
+Variantes redimensionadas de las imágenes de productos.
+
+Al subir una imagen se conserva el original y se generan tres tamaños
+(miniatura, tarjeta y detalle), cada uno en WebP y en JPEG como respaldo
+para navegadores sin WebP. El trabajo de Pillow es CPU puro, así que corre en
+un pool de procesos propio: no ocupa el event loop ni el thread pool de AnyIO
+y no compite por el GIL con los requests.
+
+Los nombres de las variantes se derivan del archivo original, que se nombra
+por su contenido (`{sha256}{ext}` -> `{sha256}_{variante}{ext}`, por ejemplo
+`9f86d0...0f00a08.png` -> `9f86d0...0f00a08_card.webp`; ver image_store), por
+lo que las URLs se calculan a partir de `image_url` sin columnas extra.
+
+Las imágenes subidas antes (`product_{id}_{ts}.ext`) no tienen variantes
+hasta correr el backfill; mientras tanto `variant_urls` retorna None para
+ellas y el frontend usa el original:
+
+    python -m app.core.images backfill
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from app.core.config import settings
+
+UPLOADS_URL_PREFIX = "/uploads/products/"
+UPLOADS_DIR = "uploads/products"
+
+# Lado mayor máximo en píxeles; nunca se amplía una imagen más chica
+VARIANT_SIZES = {"thumb": 160, "card": 480, "detail": 1200}
+VARIANT_EXTENSIONS = {"webp": ".webp", "jpeg": ".jpg"}
+MAX_IMAGE_PIXELS = 50_000_000  # Imágenes más grandes se rechazan (bombas de descompresión)
+
+# Original o variante direccionados por contenido: hash, sufijo de variante opcional y extensión
+CONTENT_ADDRESSED_NAME = re.compile(r"^([0-9a-f]{64})(?:_(?:thumb|card|detail))?\.(?:jpg|png|webp)$")
+VARIANT_NAME = re.compile(r"^(?P<base>.+)_(?:thumb|card|detail)\.(?:webp|jpg)$")
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Originales con nombre anterior cuyas variantes ya se verificaron en disco
+_legacy_with_variants: Set[str] = set()
+
+
+def variant_filename(filename: str, variant: str, fmt: str) -> str:
+    return f"{Path(filename).stem}_{variant}{VARIANT_EXTENSIONS[fmt]}"
+
+
+def variant_filenames(filename: str) -> List[str]:
+    """Todos los archivos de variantes de un original"""
+    return [
+        variant_filename(filename, variant, fmt)
+        for variant in VARIANT_SIZES
+        for fmt in VARIANT_EXTENSIONS
+    ]
+
+
+def variant_urls(image_url: Optional[str]) -> Optional[Dict[str, dict]]:
+    """
+    URLs de las variantes de una imagen subida, o None si el producto no tiene
+    imagen o usa una URL externa.
+    """
+    if not image_url or not image_url.startswith(UPLOADS_URL_PREFIX):
+        return None
+    filename = image_url[len(UPLOADS_URL_PREFIX):]
+    if not CONTENT_ADDRESSED_NAME.match(filename) and not _legacy_variants_exist(filename):
+        return None
+    return {
+        variant: {
+            "size": size,
+            **{fmt: UPLOADS_URL_PREFIX + variant_filename(filename, variant, fmt) for fmt in VARIANT_EXTENSIONS},
+        }
+        for variant, size in VARIANT_SIZES.items()
+    }
+
+
+def variants_exist(filename: str, directory: Optional[str] = None) -> bool:
+    directory = directory or UPLOADS_DIR
+    return all(os.path.exists(os.path.join(directory, name)) for name in variant_filenames(filename))
+
+
+def _legacy_variants_exist(filename: str) -> bool:
+    """
+    Las subidas direccionadas por contenido siempre tienen variantes; las
+    anteriores solo si el backfill ya las generó (se recuerda al encontrarlas).
+    """
+    if filename in _legacy_with_variants:
+        return True
+    if variants_exist(filename):
+        _legacy_with_variants.add(filename)
+        return True
+    return False
+
+
+def _save_atomic(image, path: str, fmt: str, **options) -> None:
+    """Escribe a un temporal y renombra: nunca se sirve una variante a medio escribir"""
+    temp_path = f"{path}.part"
+    try:
+        image.save(temp_path, fmt, **options)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _open_normalized(source_path: str):
+    """Abre la imagen con la orientación EXIF aplicada, en RGB o RGBA; retorna (imagen, tiene_alfa)"""
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        return image.convert("RGBA" if has_alpha else "RGB"), has_alpha
+
+
+def _flatten(image):
+    """JPEG no tiene transparencia: fondo blanco"""
+    from PIL import Image
+
+    background = Image.new("RGB", image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def _save_format(image, path: str, fmt: str, quality: int, has_alpha: bool) -> None:
+    if fmt == "webp":
+        _save_atomic(image, path, "WEBP", quality=quality, method=4)
+    else:
+        _save_atomic(
+            _flatten(image) if has_alpha else image, path, "JPEG",
+            quality=quality, optimize=True, progressive=True
+        )
+
+
+def render_variants(source_path: str, directory: str, webp_quality: int, jpeg_quality: int) -> List[str]:
+    """
+    Genera las variantes de `source_path` en `directory` y retorna sus nombres.
+    Se ejecuta en el pool de procesos; lanza excepción si el archivo no es una imagen.
+    """
+    from PIL import Image
+
+    filename = os.path.basename(source_path)
+    image, has_alpha = _open_normalized(source_path)
+    written = []
+    for variant, size in VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for fmt, quality in (("webp", webp_quality), ("jpeg", jpeg_quality)):
+            name = variant_filename(filename, variant, fmt)
+            _save_format(resized, os.path.join(directory, name), fmt, quality, has_alpha)
+            written.append(name)
+    return written
+
+
+def render_resized(source_path: str, target_path: str, width: int, fmt: str, quality: int) -> int:
+    """
+    Escribe `source_path` con el ancho pedido (sin ampliar) en `target_path`
+    y retorna su tamaño en bytes. Se ejecuta en el pool de procesos.
+    """
+    from PIL import Image
+
+    image, has_alpha = _open_normalized(source_path)
+    if image.width > width:
+        image = image.resize((width, max(1, round(image.height * width / image.width))), Image.Resampling.LANCZOS)
+    _save_format(image, target_path, fmt, quality, has_alpha)
+    return os.path.getsize(target_path)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn: los hijos no heredan threads ni conexiones del worker
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.IMAGE_PROCESS_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _executor
+
+
+async def generate_variants(source_path: str, directory: str) -> List[str]:
+    """Genera las variantes en el pool de procesos sin bloquear el event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), render_variants, source_path, directory,
+        settings.IMAGE_WEBP_QUALITY, settings.IMAGE_JPEG_QUALITY
+    )
+
+
+async def resize_image(source_path: str, target_path: str, width: int, fmt: str, quality: int) -> int:
+    """Redimensiona en el pool de procesos sin bloquear el event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), render_resized, source_path, target_path, width, fmt, quality
+    )
+
+
+def shutdown_pool() -> None:
+    """Termina los procesos del pool (apagado del worker)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+
+# ---------------------------------------------------------------------------
+# Backfill de imágenes subidas antes de las variantes
+# ---------------------------------------------------------------------------
+
+def originals_without_variants(directory: str) -> List[str]:
+    """Originales del directorio (no variantes ni temporales) a los que les falta alguna variante"""
+    names = []
+    for name in sorted(os.listdir(directory)):
+        if name.startswith(".") or name.endswith(".part") or VARIANT_NAME.match(name):
+            continue
+        if not variants_exist(name, directory):
+            names.append(name)
+    return names
+
+
+async def backfill_variants(directory: str) -> Dict[str, int]:
+    """Genera las variantes faltantes; un archivo que no es imagen se cuenta y se salta"""
+    pending = originals_without_variants(directory)
+    semaphore = asyncio.Semaphore(settings.IMAGE_PROCESS_WORKERS)
+    report = {"pending": len(pending), "generated": 0, "errors": 0}
+
+    async def render(name: str) -> None:
+        async with semaphore:
+            try:
+                await generate_variants(os.path.join(directory, name), directory)
+                report["generated"] += 1
+            except Exception as e:
+                report["errors"] += 1
+                print(f"✗ {name}: {e}")
+
+    await asyncio.gather(*(render(name) for name in pending))
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Tareas sobre las imágenes de productos")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    backfill = subcommands.add_parser("backfill", help="Generar las variantes de las imágenes que no las tienen")
+    backfill.add_argument("--directory", default=UPLOADS_DIR)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        report = asyncio.run(backfill_variants(args.directory))
+    finally:
+        shutdown_pool()
+    for key, value in report.items():
+        print(f"✓ {key}: {value}")
+    print(f"\n✅ Variantes generadas para {report['generated']} imágenes en {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
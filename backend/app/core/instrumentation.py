@@ -0,0 +1,153 @@
+"""
+Contexto de instrumentación por request.
+
+El middleware de métricas crea un `RequestStats` por request y lo guarda en
+un ContextVar. Los hooks de SQLAlchemy y el cliente Redis instrumentado suman
+ahí el número de queries y el tiempo gastado; como Starlette copia el contexto
+al thread pool, también funciona en los endpoints síncronos.
+"""
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import redis
+from redis.client import Pipeline
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.metrics import REDIS_COMMAND_DURATION
+
+
+_SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|%s|\?")
+_SQL_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SQL_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint_sql(statement: str) -> str:
+    """
+    Normaliza una sentencia SQL para agrupar las que solo difieren en
+    parámetros: literales y placeholders pasan a `?` y las listas IN a `(...)`.
+    """
+    normalized = _SQL_LITERALS.sub("?", statement)
+    normalized = _SQL_IN_LISTS.sub("(...)", normalized)
+    return _SQL_WHITESPACE.sub(" ", normalized).strip()
+
+
+@dataclass
+class QueryStats:
+    """Ejecuciones y tiempo acumulado de una misma sentencia normalizada"""
+    count: int = 0
+    time: float = 0.0
+
+
+@dataclass
+class RequestStats:
+    """Acumuladores de un request"""
+    route: str = "unmatched"
+    db_queries: int = 0
+    db_time: float = 0.0
+    redis_calls: int = 0
+    redis_time: float = 0.0
+    statements: Dict[str, QueryStats] = field(default_factory=dict)
+
+    def top_statements(self, limit: int = 10) -> List[tuple]:
+        """Sentencias más repetidas: [(fingerprint, QueryStats), ...]"""
+        return sorted(
+            self.statements.items(),
+            key=lambda item: (item[1].count, item[1].time),
+            reverse=True
+        )[:limit]
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+# Callback (statement, parameters, elapsed, route) para cada sentencia ejecutada;
+# lo registra el log de queries lentas al arrancar el worker
+_slow_query_hook: Optional[Callable] = None
+
+
+def start_request(route: str) -> RequestStats:
+    """Inicia el contexto de un request y lo retorna"""
+    stats = RequestStats(route=route)
+    _request_stats.set(stats)
+    return stats
+
+
+def current_request() -> Optional[RequestStats]:
+    """Contexto del request actual, o None fuera de un request (CLI, seeders...)"""
+    return _request_stats.get()
+
+
+def _observe_redis(command: str, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    REDIS_COMMAND_DURATION.labels(command=command).observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.redis_calls += 1
+        stats.redis_time += elapsed
+
+
+# ---------------------------------------------------------------------------
+# SQLAlchemy
+# ---------------------------------------------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_time += elapsed
+        query = stats.statements.setdefault(fingerprint_sql(statement), QueryStats())
+        query.count += 1
+        query.time += elapsed
+    if _slow_query_hook is not None and not executemany:
+        _slow_query_hook(statement, parameters, elapsed, stats.route if stats is not None else None)
+
+
+def set_slow_query_hook(hook: Optional[Callable]) -> None:
+    """Registra (o quita, con None) el callback que recibe cada sentencia y su duración"""
+    global _slow_query_hook
+    _slow_query_hook = hook
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Registra los hooks de conteo y tiempo de queries en un engine"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------------------------------------------------------------------------
+# Redis
+# ---------------------------------------------------------------------------
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline que mide el tiempo total de cada execute()"""
+
+    def execute(self, raise_on_error: bool = True):
+        started = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            _observe_redis("PIPELINE", started)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Cliente Redis que mide la latencia de cada comando"""
+
+    def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            _observe_redis(str(args[0]).upper(), started)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
@@ -0,0 +1,69 @@
+"""
+Arranque y apagado de servicios por worker.
+
+Los pools de base de datos y Redis ya no se crean al importar los módulos;
+se construyen aquí, desde el lifespan de FastAPI, y se pre-calientan antes
+de que uvicorn marque el worker como listo.
+"""
+import logging
+import time
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.device_keys import device_key_cache
+from app.core.health import close_probe_clients
+from app.core.images import shutdown_pool as shutdown_image_pool
+from app.core.metrics import mark_process_dead
+from app.core.product_codes import product_code_index
+from app.core.session import session_store
+from app.core.slow_queries import slow_query_log
+from app.db.database import get_engine, dispose_engine
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_up_database(connections: int) -> None:
+    """Abre `connections` conexiones con SELECT 1 y las devuelve al pool"""
+    engine = get_engine()
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            opened.append(conn)
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+def startup() -> None:
+    """Crea los pools y caches del worker y, si está habilitado, los pre-calienta"""
+    started = time.perf_counter()
+    get_engine()
+    session_store.redis_client  # Crea el pool de Redis
+    
+    if settings.PREWARM_CONNECTIONS:
+        try:
+            _warm_up_database(settings.DB_POOL_SIZE)
+        except Exception as e:
+            logger.warning("No se pudo pre-calentar el pool de base de datos: %s", e)
+        try:
+            session_store.warm_up(settings.DB_POOL_SIZE)
+        except Exception as e:
+            logger.warning("No se pudo pre-calentar el pool de Redis: %s", e)
+    
+    device_key_cache.start()
+    product_code_index.start()
+    slow_query_log.start()
+    logger.info("Servicios listos en %.1f ms", (time.perf_counter() - started) * 1000)
+
+
+def shutdown() -> None:
+    """Libera conexiones y detiene listeners del worker"""
+    slow_query_log.stop()
+    shutdown_image_pool()
+    device_key_cache.stop()
+    product_code_index.stop()
+    close_probe_clients()
+    session_store.close()
+    dispose_engine()
+    mark_process_dead()
@@ -0,0 +1,134 @@
+"""
+Monitor de saturación del event loop y del thread pool de AnyIO.
+
+Casi todos los endpoints son síncronos y corren en el thread pool por defecto
+de AnyIO (THREADPOOL_SIZE hilos por worker). Cuando se agota, los requests
+esperan un hilo libre sin que se vea en ningún lado. Este monitor es una tarea
+del event loop que cada LOOP_MONITOR_INTERVAL_MS:
+
+- mide el lag del loop (cuánto tarde despierta respecto a lo programado),
+- lee hilos ocupados y tareas en espera del limitador,
+- y los exporta como métricas.
+
+Si el loop tiene lag sobre LOOP_LAG_WARN_MS o hay tareas esperando un hilo
+durante SATURATION_WARN_SECONDS seguidos, registra un warning estructurado con
+las rutas que más requests tienen en curso (como máximo uno por ese intervalo).
+"""
+import asyncio
+import itertools
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from anyio import to_thread
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """Muestrea lag del event loop y uso del thread pool de un worker"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Dict[int, Tuple[str, str, float]] = {}
+        self._ids = itertools.count()
+        self._saturated_since: Optional[float] = None
+        self._last_warning = 0.0
+
+    # -----------------------------------------------------------------------
+    # Requests en curso (los registra MetricsMiddleware, siempre desde el loop)
+    # -----------------------------------------------------------------------
+
+    def request_started(self, method: str, route: str) -> int:
+        request_id = next(self._ids)
+        self._in_flight[request_id] = (method, route, time.perf_counter())
+        return request_id
+
+    def request_finished(self, request_id: int) -> None:
+        self._in_flight.pop(request_id, None)
+
+    def top_in_flight(self, limit: int = 5) -> List[dict]:
+        """Rutas con más requests en curso, con la antigüedad del más viejo"""
+        now = time.perf_counter()
+        routes = defaultdict(lambda: {"count": 0, "oldest_ms": 0.0})
+        for method, route, started in list(self._in_flight.values()):
+            entry = routes[f"{method} {route}"]
+            entry["count"] += 1
+            entry["oldest_ms"] = max(entry["oldest_ms"], round((now - started) * 1000, 1))
+        ranked = sorted(routes.items(), key=lambda item: (item[1]["count"], item[1]["oldest_ms"]), reverse=True)
+        return [{"route": route, **entry} for route, entry in ranked[:limit]]
+
+    # -----------------------------------------------------------------------
+    # Ciclo de vida (desde el lifespan, dentro del event loop)
+    # -----------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Aplica THREADPOOL_SIZE al limitador del loop actual y arranca el muestreo"""
+        limiter = to_thread.current_default_thread_limiter()
+        limiter.total_tokens = settings.THREADPOOL_SIZE
+        metrics.THREADPOOL_SIZE.set(settings.THREADPOOL_SIZE)
+        if settings.LOOP_MONITOR_ENABLED and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="loop-monitor")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        interval = settings.LOOP_MONITOR_INTERVAL_MS / 1000
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.perf_counter() - started - interval)
+            try:
+                self.sample(lag)
+            except Exception as e:
+                logger.warning("Error en el monitor del event loop: %s", e)
+
+    def sample(self, lag: float) -> None:
+        """Registra una muestra y avisa si la saturación se sostiene"""
+        stats = to_thread.current_default_thread_limiter().statistics()
+        metrics.EVENT_LOOP_LAG.observe(lag)
+        metrics.THREADPOOL_IN_USE.set(stats.borrowed_tokens)
+        metrics.THREADPOOL_QUEUED.set(stats.tasks_waiting)
+
+        now = time.monotonic()
+        lag_ms = lag * 1000
+        if lag_ms <= settings.LOOP_LAG_WARN_MS and stats.tasks_waiting == 0:
+            self._saturated_since = None
+            return
+        if self._saturated_since is None:
+            self._saturated_since = now
+        sustained = now - self._saturated_since
+        if sustained < settings.SATURATION_WARN_SECONDS or now - self._last_warning < settings.SATURATION_WARN_SECONDS:
+            return
+
+        self._last_warning = now
+        metrics.SATURATION_WARNINGS.inc()
+        top_routes = self.top_in_flight()
+        logger.warning(
+            "Worker saturado hace %.1f s: lag del loop %.1f ms, thread pool %d/%d ocupados y %d en espera; "
+            "rutas en curso: %s",
+            sustained, lag_ms, stats.borrowed_tokens, stats.total_tokens, stats.tasks_waiting,
+            ", ".join(f"{item['route']} x{item['count']} ({item['oldest_ms']:.0f} ms)" for item in top_routes) or "ninguna",
+            extra={
+                "event": "worker_saturated",
+                "saturated_seconds": round(sustained, 1),
+                "loop_lag_ms": round(lag_ms, 1),
+                "threadpool_size": stats.total_tokens,
+                "threadpool_in_use": stats.borrowed_tokens,
+                "threadpool_waiting": stats.tasks_waiting,
+                "top_in_flight": top_routes,
+            }
+        )
+
+
+loop_monitor = LoopMonitor()
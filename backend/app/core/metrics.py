@@ -0,0 +1,127 @@
+"""
+Métricas Prometheus del backend.
+
+Con varios workers de uvicorn cada proceso tiene sus propios contadores; si
+la variable PROMETHEUS_MULTIPROC_DIR está definida, cada worker escribe sus
+valores en ese directorio y /metrics los agrega con MultiProcessCollector.
+El directorio debe vaciarse antes de arrancar los workers (ver Dockerfile).
+"""
+import os
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "Requests HTTP por ruta, método y código de estado",
+    ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de requests HTTP por ruta",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests HTTP en curso por ruta",
+    ["method", "route"],
+    multiprocess_mode="livesum"
+)
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Número de sentencias SQL ejecutadas por request",
+    ["route"],
+    buckets=QUERY_COUNT_BUCKETS
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Tiempo total en la base de datos por request",
+    ["route"],
+    buckets=LATENCY_BUCKETS
+)
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds",
+    "Latencia de comandos Redis",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Conexiones de base de datos en uso",
+    multiprocess_mode="livesum"
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Tamaño configurado del pool de base de datos",
+    multiprocess_mode="livesum"
+)
+THREADPOOL_IN_USE = Gauge(
+    "threadpool_in_use",
+    "Hilos del thread pool de AnyIO ocupados por endpoints síncronos",
+    multiprocess_mode="livesum"
+)
+THREADPOOL_QUEUED = Gauge(
+    "threadpool_queued",
+    "Tareas esperando un hilo libre del thread pool de AnyIO",
+    multiprocess_mode="livesum"
+)
+THREADPOOL_SIZE = Gauge(
+    "threadpool_size",
+    "Tamaño configurado del thread pool de AnyIO",
+    multiprocess_mode="livesum"
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Retraso del event loop respecto al intervalo de muestreo",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+SATURATION_WARNINGS = Counter(
+    "threadpool_saturation_warnings_total",
+    "Avisos de saturación sostenida del event loop o del thread pool"
+)
+
+IMAGE_RESIZE_REQUESTS = Counter(
+    "image_resize_requests_total",
+    "Imágenes pedidas con ?w= por resultado del cache en disco (hit, miss)",
+    ["result"]
+)
+IMAGE_RESIZE_DURATION = Histogram(
+    "image_resize_duration_seconds",
+    "Tiempo de generar una imagen redimensionada (miss del cache)",
+    buckets=LATENCY_BUCKETS
+)
+IMAGE_RESIZE_EVICTIONS = Counter(
+    "image_resize_cache_evictions_total",
+    "Archivos borrados del cache de imágenes redimensionadas por exceder el tamaño máximo"
+)
+
+
+def render_metrics():
+    """Retorna (contenido, content_type) con las métricas de todos los workers"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Descarta los gauges `live*` de este worker al apagarse"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,115 @@
+"""
+Middleware ASGI de métricas por ruta.
+
+Resuelve la plantilla de la ruta (ej. /api/v1/sales/{sale_id}) antes de
+llamar a la app, para que la cardinalidad de las etiquetas sea fija y el
+gauge de requests en curso ya tenga la ruta correcta.
+
+Además agrega el header `Server-Timing` (queries SQL, tiempo en DB, Redis y
+total del handler) y registra en el log los requests que exceden el presupuesto de
+queries o de latencia, con las sentencias normalizadas más repetidas.
+"""
+import logging
+import time
+from anyio import to_thread
+from sqlalchemy.pool import QueuePool
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core import metrics
+from app.core.config import settings
+from app.core.instrumentation import RequestStats, start_request
+from app.core.loop_monitor import loop_monitor
+from app.db.database import current_engine
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _route_template(app: ASGIApp, scope: Scope) -> str:
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
+def _update_pool_gauges() -> None:
+    stats = to_thread.current_default_thread_limiter().statistics()
+    metrics.THREADPOOL_IN_USE.set(stats.borrowed_tokens)
+    metrics.THREADPOOL_QUEUED.set(stats.tasks_waiting)
+
+    engine = current_engine()
+    if engine is not None and isinstance(engine.pool, QueuePool):
+        metrics.DB_POOL_CHECKED_OUT.set(engine.pool.checkedout())
+        metrics.DB_POOL_SIZE.set(engine.pool.size())
+
+
+def _server_timing(stats: RequestStats, elapsed: float) -> bytes:
+    return (
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_queries} queries", '
+        f'redis;dur={stats.redis_time * 1000:.1f};desc="{stats.redis_calls} calls", '
+        f'handler;dur={elapsed * 1000:.1f}'
+    ).encode("latin-1")
+
+
+def _log_if_over_budget(method: str, route: str, status_code: int, stats: RequestStats, elapsed: float) -> None:
+    elapsed_ms = elapsed * 1000
+    if stats.db_queries <= settings.REQUEST_QUERY_BUDGET and elapsed_ms <= settings.REQUEST_LATENCY_BUDGET_MS:
+        return
+    statements = "\n".join(
+        f"  {query.count}x {query.time * 1000:.1f}ms  {fingerprint}"
+        for fingerprint, query in stats.top_statements()
+    )
+    logger.warning(
+        "Request sobre presupuesto: %s %s -> %s en %.1f ms, %d queries (%.1f ms DB), %d llamadas Redis (%.1f ms)\n%s",
+        method, route, status_code, elapsed_ms,
+        stats.db_queries, stats.db_time * 1000,
+        stats.redis_calls, stats.redis_time * 1000,
+        statements
+    )
+
+
+class MetricsMiddleware:
+    """Registra conteo, latencia, requests en curso y uso de DB/Redis por ruta"""
+
+    def __init__(self, app: ASGIApp, root_app: ASGIApp):
+        self.app = app
+        self.root_app = root_app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_template(self.root_app, scope)
+        request_stats = start_request(route)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.SERVER_TIMING_ENABLED:
+                    timing = _server_timing(request_stats, time.perf_counter() - started)
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing)]
+            await send(message)
+
+        in_progress = metrics.HTTP_REQUESTS_IN_PROGRESS.labels(method=method, route=route)
+        in_progress.inc()
+        in_flight_id = loop_monitor.request_started(method, route)
+        _update_pool_gauges()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            loop_monitor.request_finished(in_flight_id)
+            metrics.HTTP_REQUESTS.labels(method=method, route=route, status=str(status_code)).inc()
+            metrics.HTTP_REQUEST_DURATION.labels(method=method, route=route).observe(elapsed)
+            metrics.DB_QUERIES_PER_REQUEST.labels(route=route).observe(request_stats.db_queries)
+            metrics.DB_TIME_PER_REQUEST.labels(route=route).observe(request_stats.db_time)
+            _update_pool_gauges()
+            _log_if_over_budget(method, route, status_code, request_stats, elapsed)
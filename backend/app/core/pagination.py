@@ -0,0 +1,52 @@
+"""
+Paginación por llave (keyset).
+
+En lugar de `OFFSET n` (que lee y descarta n filas, y salta o repite filas
+si cambian entre páginas), cada página pide "lo que sigue después de la
+última fila vista" según el orden del listado: `(columna, id) > (v, id)`,
+que recorre el índice `(columna, id)` desde ese punto.
+
+El cursor es opaco para el cliente: base64 de la llave de orden, el
+sentido y los valores de la última fila. Se devuelve en el header
+`X-Next-Cursor` y se envía de vuelta en `?cursor=`.
+"""
+import base64
+import binascii
+import json
+from typing import Any, List, Optional
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort: str, order: str, values: List[Any]) -> str:
+    payload = json.dumps({"s": sort, "o": order, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, order: str, size: int) -> List[Any]:
+    """Valores de la última fila vista; 400 si el cursor no es válido o es de otro orden"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = payload["v"]
+        valid = payload["s"] == sort and payload["o"] == order and isinstance(values, list) and len(values) == size
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        valid = False
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido para este orden; volver a pedir la primera página"
+        )
+    return values
+
+
+def after(columns, values: List[Any], descending: bool):
+    """Condición "después de `values`" en el orden de `columns` (comparación de filas)"""
+    row = tuple_(*columns)
+    return row < tuple_(*values) if descending else row > tuple_(*values)
+
+
+def set_next_cursor(response: Response, cursor: Optional[str]) -> None:
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
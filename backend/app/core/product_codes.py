@@ -0,0 +1,207 @@
+"""
+Índice en memoria de códigos de producto (SKU / código de barras).
+
+`GET /products/by-code/{code}` se resuelve con un dict por worker: un escaneo
+en caja no toca la base de datos. El índice se carga completo la primera vez
+(o en el arranque del worker) con los productos activos que tienen código.
+
+Cada cambio que afecta al índice (crear, editar, desactivar, asignar códigos)
+se aplica en el worker que lo hizo y se publica en Redis con los IDs
+afectados; los demás workers recargan solo esas filas. Si no hay suscripción
+a Redis, el índice se recarga completo cada PRODUCT_CODE_REFRESH_SECONDS.
+
+Solo guarda lo que la caja necesita para agregar el producto (id, código,
+nombre, precio). El stock no se cachea: cambia con cada venta y se valida al
+crearla.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from app.core.config import settings
+from app.core.session import session_store
+from app.db.database import SessionLocal
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+CHANGED_CHANNEL = "products:codes_changed"
+RELOAD_ALL = "*"  # En lugar de IDs: cambios masivos, los workers recargan todo
+MAX_IDS_PER_MESSAGE = 1000
+
+
+@dataclass(frozen=True)
+class CodeEntry:
+    id: int
+    sku: str
+    name: str
+    price: float
+
+
+class ProductCodeIndex:
+    """Mapa código → producto por worker, actualizado por notificaciones"""
+
+    def __init__(self):
+        self._by_code: Dict[str, CodeEntry] = {}
+        self._code_by_id: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._listener = None
+        self._listener_retry_at = 0.0
+        self._sender = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def lookup(self, code: str) -> Optional[CodeEntry]:
+        self._ensure_listener()
+        loaded_at = self._loaded_at
+        if loaded_at is None or (
+            self._listener is None and time.monotonic() - loaded_at > settings.PRODUCT_CODE_REFRESH_SECONDS
+        ):
+            self.reload()
+        return self._by_code.get(code)
+
+    def __len__(self) -> int:
+        return len(self._by_code)
+
+    def reload(self) -> int:
+        """Carga el índice completo; retorna la cantidad de códigos"""
+        db = SessionLocal()
+        try:
+            rows = db.query(Product.id, Product.sku, Product.name, Product.price).filter(
+                Product.sku.isnot(None), Product.is_active == True  # noqa: E712
+            ).all()
+        finally:
+            db.close()
+        by_code = {row.sku: CodeEntry(row.id, row.sku, row.name, row.price) for row in rows}
+        with self._lock:
+            self._by_code = by_code
+            self._code_by_id = {entry.id: code for code, entry in by_code.items()}
+            self._loaded_at = time.monotonic()
+        return len(by_code)
+
+    def apply(self, products: Iterable) -> None:
+        """Actualiza las entradas de estos productos (objetos o filas con id, sku, name, price, is_active)"""
+        with self._lock:
+            if self._loaded_at is None:
+                return  # Se cargará completo en el primer lookup
+            for product in products:
+                old_code = self._code_by_id.pop(product.id, None)
+                entry = self._by_code.get(old_code)
+                # El código pudo pasar a otro producto que ya se aplicó
+                if entry is not None and entry.id == product.id:
+                    del self._by_code[old_code]
+                if product.sku and product.is_active:
+                    self._by_code[product.sku] = CodeEntry(product.id, product.sku, product.name, product.price)
+                    self._code_by_id[product.id] = product.sku
+
+    def changed(self, products: List) -> None:
+        """
+        Después del commit: aplica los cambios en este worker y avisa al resto.
+        Si Redis falla, los otros workers los verán al vencer su recarga periódica.
+        """
+        if not products:
+            return
+        self.apply(products)
+        if len(products) > MAX_IDS_PER_MESSAGE:
+            ids = RELOAD_ALL
+        else:
+            ids = ",".join(str(product.id) for product in products)
+        try:
+            session_store.redis_client.publish(CHANGED_CHANNEL, f"{self._sender}:{ids}")
+        except Exception as e:
+            logger.warning("No se pudo publicar el cambio de códigos de producto: %s", e)
+
+    def removed(self, product_ids: List[int]) -> None:
+        """Como `changed`, para productos desactivados (sin recargar la fila)"""
+        self.changed([_Removed(product_id) for product_id in product_ids])
+
+    def refresh(self, product_ids: List[int]) -> None:
+        """Recarga estas filas desde la base (cambios hechos por otro worker)"""
+        db = SessionLocal()
+        try:
+            rows = db.query(Product.id, Product.sku, Product.name, Product.price, Product.is_active).filter(
+                Product.id.in_(product_ids)
+            ).all()
+        finally:
+            db.close()
+        found = {row.id for row in rows}
+        missing = [_Removed(product_id) for product_id in product_ids if product_id not in found]
+        self.apply(list(rows) + missing)
+
+    def start(self) -> None:
+        """Suscribirse a los cambios y cargar el índice desde el arranque del worker"""
+        self._ensure_listener()
+        try:
+            self.reload()
+        except Exception as e:
+            logger.warning("No se pudo cargar el índice de códigos de producto: %s", e)
+
+    def stop(self) -> None:
+        """Detener el listener y vaciar el índice (apagado del worker)"""
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+            self._by_code = {}
+            self._code_by_id = {}
+            self._loaded_at = None
+
+    def _ensure_listener(self) -> None:
+        if self._listener is not None or time.monotonic() < self._listener_retry_at:
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            try:
+                pubsub = session_store.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{CHANGED_CHANNEL: self._on_changed})
+                self._listener = pubsub.run_in_thread(
+                    sleep_time=1.0, daemon=True, exception_handler=self._on_listener_error
+                )
+                # Lo que cambió mientras no había suscripción se recupera recargando
+                self._loaded_at = None
+            except Exception as e:
+                self._listener_retry_at = time.monotonic() + settings.PRODUCT_CODE_REFRESH_SECONDS
+                logger.warning("No se pudo suscribir a cambios de códigos de producto: %s", e)
+
+    def _on_listener_error(self, error, pubsub, thread) -> None:
+        """
+        Se perdió la suscripción (Redis caído o reiniciado): detener el thread
+        y volver a la recarga periódica hasta que el próximo lookup se resuscriba.
+        """
+        thread.stop()
+        with self._lock:
+            if self._listener is thread:
+                self._listener = None
+                self._loaded_at = None
+        logger.warning("Se perdió la suscripción a cambios de códigos de producto: %s", error)
+
+    def _on_changed(self, message) -> None:
+        sender, _, ids = str(message["data"]).partition(":")
+        if sender == self._sender or self._loaded_at is None:
+            return
+        try:
+            if ids == RELOAD_ALL:
+                self.reload()
+            else:
+                self.refresh([int(product_id) for product_id in ids.split(",") if product_id])
+        except Exception as e:
+            # Forzar una recarga completa en el próximo lookup
+            self._loaded_at = None
+            logger.warning("No se pudo aplicar un cambio de códigos de producto: %s", e)
+
+
+@dataclass(frozen=True)
+class _Removed:
+    """Producto que ya no existe: solo se quita su código del índice"""
+    id: int
+    sku: Optional[str] = None
+    name: str = ""
+    price: float = 0.0
+    is_active: bool = False
+
+
+# Instancia global del índice de códigos
+product_code_index = ProductCodeIndex()
@@ -0,0 +1,307 @@
+"""
+Importación y exportación del catálogo de productos en CSV con `COPY`.
+
+Importar un catálogo de proveedor con `POST /products/` son miles de requests,
+cada uno con su consulta de nombre único y su cálculo de precio. Aquí el
+archivo completo entra con un solo `COPY` a una tabla temporal (todo como
+texto, así un valor mal escrito no aborta la carga) y el resto es SQL por
+conjuntos:
+
+1. Convertir tipos y aplicar las mismas reglas de precio/margen que
+   `create_product`; cada fila inválida queda con su mensaje de error.
+2. Emparejar con productos existentes: primero por código (SKU), si no por
+   nombre. Las filas que no emparejan se insertan.
+3. Un `UPDATE ... FROM` y un `INSERT ... SELECT` para las filas válidas; las
+   inválidas se reportan con su número de línea y no se importan.
+
+Columnas (encabezado obligatorio, en cualquier orden): name y cost_price
+obligatorias; price y/o profit_margin como en el alta; sku, description,
+stock e is_active opcionales. Al actualizar, una celda vacía conserva el
+valor actual. La exportación usa el mismo formato, así que su salida se
+puede volver a importar.
+
+Uso:
+    python -m app.core.product_csv import catalogo.csv --dry-run
+    python -m app.core.product_csv export catalogo.csv
+"""
+import argparse
+import csv
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import BinaryIO, List, Optional
+import psycopg2
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from app.core.product_codes import product_code_index
+
+COLUMNS = ("name", "sku", "description", "cost_price", "price", "profit_margin", "stock", "is_active")
+REQUIRED_COLUMNS = ("name", "cost_price")
+MAX_REPORTED_ERRORS = 1000
+
+NUMBER = r"^[0-9]+(\.[0-9]+)?$"
+INTEGER = r"^[0-9]{1,9}$"
+SKU = r"^[A-Za-z0-9._-]{1,64}$"
+TRUE_VALUES = ("1", "true", "t", "si", "sí", "yes")
+FALSE_VALUES = ("0", "false", "f", "no")
+
+_CREATE_STAGING = f"""
+CREATE TEMP TABLE product_import (
+    line bigint GENERATED ALWAYS AS IDENTITY,
+    {", ".join(f"{column} text" for column in COLUMNS)}
+) ON COMMIT DROP
+"""
+
+# Una fila por línea del archivo: valores tipados, precio final, producto destino y error
+_VALIDATE = """
+CREATE TEMP TABLE product_import_rows ON COMMIT DROP AS
+WITH raw AS (
+    SELECT line + 1 AS line,  -- La línea 1 es el encabezado
+           nullif(btrim(name), '') AS name,
+           nullif(btrim(sku), '') AS sku,
+           nullif(description, '') AS description,
+           nullif(btrim(cost_price), '') AS cost_price_text,
+           nullif(btrim(price), '') AS price_text,
+           nullif(btrim(profit_margin), '') AS profit_margin_text,
+           nullif(btrim(stock), '') AS stock_text,
+           lower(nullif(btrim(is_active), '')) AS is_active_text
+    FROM product_import
+), typed AS (
+    SELECT raw.*,
+           CASE WHEN cost_price_text ~ :number THEN cost_price_text::float8 END AS cost_price,
+           CASE WHEN price_text ~ :number THEN price_text::float8 END AS price,
+           CASE WHEN profit_margin_text ~ :number THEN profit_margin_text::float8 END AS profit_margin,
+           CASE WHEN stock_text ~ :integer THEN stock_text::int END AS stock,
+           CASE WHEN is_active_text = ANY(:true_values) THEN true
+                WHEN is_active_text = ANY(:false_values) THEN false END AS is_active
+    FROM raw
+), priced AS (
+    SELECT typed.*,
+           CASE WHEN typed.price IS NULL THEN typed.cost_price * (1 + typed.profit_margin / 100)
+                ELSE typed.price END AS final_price,
+           CASE WHEN typed.profit_margin IS NULL AND typed.cost_price > 0
+                THEN (typed.price - typed.cost_price) / typed.cost_price * 100
+                ELSE typed.profit_margin END AS final_margin,
+           by_sku.id AS sku_product_id,
+           by_name.id AS name_product_id,
+           min(typed.line) OVER (PARTITION BY typed.name) AS first_name_line,
+           min(typed.line) OVER (PARTITION BY typed.sku) AS first_sku_line
+    FROM typed
+    LEFT JOIN products by_sku ON by_sku.sku = typed.sku
+    LEFT JOIN LATERAL (
+        SELECT id FROM products WHERE products.name = typed.name ORDER BY id LIMIT 1
+    ) by_name ON true
+)
+SELECT line, name, sku, description, cost_price, final_price AS price, final_margin AS profit_margin,
+       stock, is_active,
+       coalesce(sku_product_id, name_product_id) AS product_id,
+       CASE
+           WHEN name IS NULL THEN 'Falta el nombre'
+           WHEN sku IS NOT NULL AND sku !~ :sku THEN 'Código inválido (letras, dígitos y . _ -, hasta 64)'
+           WHEN cost_price IS NULL OR cost_price <= 0 THEN 'cost_price debe ser un número mayor a 0'
+           WHEN price_text IS NOT NULL AND (price IS NULL OR price <= 0) THEN 'price debe ser un número mayor a 0'
+           WHEN profit_margin_text IS NOT NULL AND (profit_margin IS NULL OR profit_margin > 1000)
+               THEN 'profit_margin debe ser un número entre 0 y 1000'
+           WHEN price IS NULL AND profit_margin IS NULL THEN 'Falta price o profit_margin'
+           WHEN price IS NOT NULL AND profit_margin IS NOT NULL
+                AND abs(price - cost_price * (1 + profit_margin / 100)) > 0.01
+               THEN 'price no es consistente con profit_margin'
+           WHEN final_price <= cost_price THEN 'El precio de venta debe ser mayor al precio de costo'
+           WHEN final_price > 1000000 THEN 'El precio parece demasiado alto'
+           WHEN stock_text IS NOT NULL AND stock IS NULL THEN 'stock debe ser un entero mayor o igual a 0'
+           WHEN is_active_text IS NOT NULL AND is_active IS NULL THEN 'is_active debe ser true o false'
+           WHEN line <> first_name_line THEN 'Nombre repetido en el archivo (línea ' || first_name_line || ')'
+           WHEN sku IS NOT NULL AND line <> first_sku_line
+               THEN 'Código repetido en el archivo (línea ' || first_sku_line || ')'
+           WHEN sku_product_id <> name_product_id
+               THEN 'El nombre ya es de otro producto (ID ' || name_product_id || ')'
+       END AS error
+FROM priced
+"""
+
+_UPDATE = """
+UPDATE products SET
+    name = r.name,
+    sku = coalesce(r.sku, products.sku),
+    description = coalesce(r.description, products.description),
+    cost_price = r.cost_price,
+    price = r.price,
+    profit_margin = r.profit_margin,
+    stock = coalesce(r.stock, products.stock),
+    is_active = coalesce(r.is_active, products.is_active)
+FROM product_import_rows r
+WHERE r.error IS NULL AND products.id = r.product_id
+RETURNING products.id, products.sku, products.name, products.price, products.is_active
+"""
+
+_INSERT = """
+INSERT INTO products (name, sku, description, cost_price, price, profit_margin, stock, is_active, created_at)
+SELECT name, sku, description, cost_price, price, profit_margin,
+       coalesce(stock, 0), coalesce(is_active, true), now()
+FROM product_import_rows
+WHERE error IS NULL AND product_id IS NULL
+ORDER BY line
+RETURNING id, sku, name, price, is_active
+"""
+
+_EXPORT = f"""
+COPY (SELECT {", ".join(COLUMNS)} FROM products ORDER BY id)
+TO STDOUT WITH (FORMAT csv, HEADER true, ENCODING 'UTF8')
+"""
+
+
+@dataclass
+class RowError:
+    line: int
+    name: Optional[str]
+    sku: Optional[str]
+    error: str
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    error_count: int = 0
+    errors: List[RowError] = field(default_factory=list)  # Las primeras MAX_REPORTED_ERRORS
+    dry_run: bool = False
+
+
+def read_header(stream: BinaryIO) -> List[str]:
+    """Columnas del encabezado; ValueError si faltan obligatorias o hay desconocidas"""
+    line = stream.readline().decode("utf-8-sig", errors="replace")
+    header = [column.strip().lower() for column in next(csv.reader([line]), [])]
+    unknown = [column for column in header if column not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Columnas desconocidas: {', '.join(unknown)}. Columnas válidas: {', '.join(COLUMNS)}")
+    repeated = sorted({column for column in header if header.count(column) > 1})
+    if repeated:
+        raise ValueError(f"Columnas repetidas: {', '.join(repeated)}")
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(missing)}")
+    return header
+
+
+def import_csv(db: Session, stream: BinaryIO, dry_run: bool = False) -> ImportReport:
+    """
+    Importa el CSV de `stream` (binario, con posibilidad de seek) en una transacción.
+    Las filas válidas se insertan o actualizan aunque otras tengan errores;
+    con `dry_run` solo se valida y se reporta. ValueError si el archivo no es
+    un CSV que COPY pueda leer.
+    """
+    start = stream.tell()
+    header = read_header(stream)
+    stream.seek(start)  # COPY salta el encabezado y numera las líneas del archivo completo
+
+    try:
+        # Evita que un alta o edición simultánea duplique un nombre entre la validación y la escritura
+        db.execute(text("LOCK TABLE products IN SHARE ROW EXCLUSIVE MODE"))
+        db.execute(text(_CREATE_STAGING))
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY product_import ({', '.join(header)}) FROM STDIN "
+                "WITH (FORMAT csv, HEADER true, ENCODING 'UTF8')",
+                stream
+            )
+        except psycopg2.DataError as e:
+            raise ValueError(f"CSV inválido: {' '.join(str(e).split())}") from e
+        finally:
+            cursor.close()
+
+        db.execute(text(_VALIDATE), {
+            "number": NUMBER, "integer": INTEGER, "sku": SKU,
+            "true_values": list(TRUE_VALUES), "false_values": list(FALSE_VALUES),
+        })
+        counts = db.execute(text(
+            "SELECT count(*) AS rows, "
+            "count(*) FILTER (WHERE error IS NOT NULL) AS errors, "
+            "count(*) FILTER (WHERE error IS NULL AND product_id IS NOT NULL) AS updates "
+            "FROM product_import_rows"
+        )).one()
+        report = ImportReport(rows=counts.rows, error_count=counts.errors, dry_run=dry_run)
+        if counts.errors:
+            report.errors = [
+                RowError(row.line, row.name, row.sku, row.error)
+                for row in db.execute(text(
+                    "SELECT line, name, sku, error FROM product_import_rows "
+                    "WHERE error IS NOT NULL ORDER BY line LIMIT :limit"
+                ), {"limit": MAX_REPORTED_ERRORS})
+            ]
+
+        if dry_run:
+            db.rollback()
+            report.updated = counts.updates
+            report.inserted = counts.rows - counts.errors - counts.updates
+            return report
+
+        updated = db.execute(text(_UPDATE)).all()
+        inserted = db.execute(text(_INSERT)).all()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    report.updated = len(updated)
+    report.inserted = len(inserted)
+    product_code_index.changed(updated + inserted)
+    return report
+
+
+def export_csv(db: Session, out: BinaryIO) -> None:
+    """Escribe el catálogo completo (activos e inactivos) en `out` con COPY TO"""
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(_EXPORT, out)
+    finally:
+        cursor.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Importa o exporta el catálogo de productos en CSV")
+    parser.add_argument("--database-url", help="Por defecto, DATABASE_URL de la configuración")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Insertar o actualizar productos desde un CSV")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--dry-run", action="store_true", help="Solo validar y reportar")
+    export_parser = commands.add_parser("export", help="Escribir el catálogo completo en CSV")
+    export_parser.add_argument("file", nargs="?", default="-", help="Archivo de salida (- para stdout)")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from app.db.database import get_engine
+        engine = get_engine()
+
+    started = time.perf_counter()
+    with Session(engine) as db:
+        if args.command == "export":
+            if args.file == "-":
+                export_csv(db, sys.stdout.buffer)
+            else:
+                with open(args.file, "wb") as out:
+                    export_csv(db, out)
+            db.rollback()
+            if args.file != "-":
+                print(f"✅ Catálogo exportado a {args.file} en {time.perf_counter() - started:.1f} s")
+        else:
+            with open(args.file, "rb") as stream:
+                try:
+                    report = import_csv(db, stream, dry_run=args.dry_run)
+                except ValueError as e:
+                    parser.exit(1, f"❌ {e}\n")
+            for error in report.errors:
+                print(f"✗ línea {error.line} ({error.name or error.sku or '-'}): {error.error}")
+            if report.error_count > len(report.errors):
+                print(f"✗ ... y {report.error_count - len(report.errors)} errores más")
+            action = "se insertarían" if args.dry_run else "insertados"
+            print(f"\n✅ {report.rows} filas: {report.inserted} {action}, {report.updated} actualizados, "
+                  f"{report.error_count} con errores ({time.perf_counter() - started:.1f} s)")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
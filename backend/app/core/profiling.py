@@ -0,0 +1,328 @@
+"""
+Perfilado bajo demanda de un request (solo administradores).
+
+Un admin agrega el header `X-Profile: 1` (o `?_profile=1`) y ese único request
+se ejecuta con un profiler de muestreo: un thread toma cada pocos ms las pilas
+de los threads que están ejecutando el endpoint o sus dependencias (el loop de
+eventos para endpoints async, el thread pool para los síncronos). Las muestras
+en que ninguno lo hace se cuentan como `<esperando>` (I/O, await, cola del pool).
+
+El resultado se guarda como flame graph SVG y en formato "folded" (compatible
+con flamegraph.pl y speedscope) en PROFILING_DIR, rotando los más viejos, y la
+respuesta incluye el header `X-Profile-URL` para descargarlo.
+
+Sin el flag el middleware solo revisa headers y query string: no hay sampler,
+ni consultas, ni threads extra.
+"""
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import QueryParams
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.security import verify_token
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = "_profile"
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{16}$")
+IDLE_FRAME = "<esperando>"
+
+
+# ---------------------------------------------------------------------------
+# Sampler
+# ---------------------------------------------------------------------------
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    for marker in ("site-packages" + os.sep, "backend" + os.sep):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    """Muestrea las pilas que pasan por alguno de `codes` cada `interval` segundos"""
+
+    def __init__(self, codes: Set, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.codes = codes
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.ticks = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            self.ticks += 1
+            found = False
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = self._relevant_stack(frame)
+                if stack:
+                    self.stacks[stack] += 1
+                    found = True
+            if not found:
+                self.stacks[(IDLE_FRAME,)] += 1
+
+    def _relevant_stack(self, frame) -> Optional[Tuple[str, ...]]:
+        # De la hoja a la raíz; se corta en el frame relevante más externo
+        # para no incluir la plomería de Starlette/AnyIO
+        frames = []
+        outermost = -1
+        while frame is not None:
+            if frame.f_code in self.codes:
+                outermost = len(frames)
+            frames.append(frame.f_code)
+            frame = frame.f_back
+        if outermost < 0:
+            return None
+        return tuple(_frame_label(code) for code in reversed(frames[:outermost + 1]))
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _route_codes(route) -> Set:
+    """Code objects del endpoint y de todas sus dependencias"""
+    codes = set()
+    pending = [getattr(route, "dependant", None)]
+    while pending:
+        dependant = pending.pop()
+        if dependant is None:
+            continue
+        call = dependant.call
+        code = getattr(call, "__code__", None) or getattr(getattr(type(call), "__call__", None), "__code__", None)
+        if code is not None:
+            codes.add(code)
+        pending.extend(dependant.dependencies)
+    return codes
+
+
+# ---------------------------------------------------------------------------
+# Almacenamiento
+# ---------------------------------------------------------------------------
+
+def profiles_dir() -> Path:
+    path = Path(settings.PROFILING_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def profile_path(profile_id: str, fmt: str) -> Optional[Path]:
+    """Ruta del archivo de un perfil, o None si el id no es válido o no existe"""
+    if not PROFILE_ID_PATTERN.match(profile_id) or fmt not in ("svg", "folded", "json"):
+        return None
+    path = profiles_dir() / f"{profile_id}.{fmt}"
+    return path if path.exists() else None
+
+
+def list_profiles() -> List[dict]:
+    """Metadatos de los perfiles guardados, del más reciente al más viejo"""
+    profiles = []
+    for path in profiles_dir().glob("*.json"):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda item: item["created_at"], reverse=True)
+
+
+def save_profile(profile_id: str, stacks: Counter, metadata: dict) -> None:
+    """Escribe SVG, folded y metadatos, y rota los perfiles más viejos"""
+    directory = profiles_dir()
+    folded = "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common())
+    title = f"{metadata['method']} {metadata['path']} - {metadata['duration_ms']:.0f} ms"
+    (directory / f"{profile_id}.folded").write_text(folded)
+    (directory / f"{profile_id}.svg").write_text(render_flamegraph(stacks, title))
+    (directory / f"{profile_id}.json").write_text(json.dumps(metadata))
+    _rotate(directory)
+
+
+def _rotate(directory: Path) -> None:
+    metadata_files = sorted(directory.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for old in metadata_files[settings.PROFILING_MAX_PROFILES:]:
+        for fmt in ("svg", "folded", "json"):
+            try:
+                (directory / f"{old.stem}.{fmt}").unlink()
+            except FileNotFoundError:
+                pass
+
+
+# ---------------------------------------------------------------------------
+# Flame graph
+# ---------------------------------------------------------------------------
+
+def _build_tree(stacks: Counter) -> dict:
+    root = {"name": "request", "value": 0, "children": {}}
+    for stack, count in stacks.items():
+        root["value"] += count
+        node = root
+        for name in stack:
+            node = node["children"].setdefault(name, {"name": name, "value": 0, "children": {}})
+            node["value"] += count
+    return root
+
+
+def render_flamegraph(stacks: Counter, title: str, width: int = 1200, row_height: int = 17) -> str:
+    """Flame graph SVG autocontenido (raíz arriba, ancho proporcional a las muestras)"""
+    root = _build_tree(stacks)
+    total = max(root["value"], 1)
+    rects = []
+    max_depth = 0
+
+    def walk(node: dict, x: float, depth: int) -> None:
+        nonlocal max_depth
+        max_depth = max(max_depth, depth)
+        node_width = node["value"] / total * width
+        if node_width < 0.5:
+            return
+        y = 24 + depth * row_height
+        hue = int(hashlib.md5(node["name"].encode()).hexdigest()[:2], 16) % 55
+        label = html.escape(node["name"])
+        pct = node["value"] / total * 100
+        chars = int(node_width / 7)
+        text = html.escape(node["name"][:chars - 2] + "..") if len(node["name"]) > chars else label
+        rects.append(
+            f'<g><title>{label} ({node["value"]} muestras, {pct:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{node_width:.1f}" height="{row_height - 1}" '
+            f'fill="hsl({hue}, 85%, 60%)" rx="2"/>'
+            + (f'<text x="{x + 3:.1f}" y="{y + row_height - 5}">{text}</text>' if chars > 3 else "")
+            + "</g>"
+        )
+        child_x = x
+        for child in sorted(node["children"].values(), key=lambda item: item["name"]):
+            walk(child, child_x, depth + 1)
+            child_x += child["value"] / total * width
+
+    walk(root, 0.0, 0)
+    height = 24 + (max_depth + 1) * row_height + 4
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<text x="4" y="16" font-size="13">{html.escape(title)}</text>'
+        + "".join(rects)
+        + "</svg>"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+def _profile_requested(scope: Scope) -> bool:
+    # Parámetro exacto: ni `x_profile=1` ni `_profile=10` ni `q=a_profile=1` activan el perfil
+    if QueryParams(scope.get("query_string", b"")).get(PROFILE_QUERY) == "1":
+        return True
+    for name, value in scope.get("headers", ()):
+        if name == PROFILE_HEADER:
+            return value in (b"1", b"true")
+    return False
+
+
+def _bearer_token(scope: Scope) -> Optional[str]:
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token if scheme.lower() == "bearer" and token else None
+    return None
+
+
+def _admin_username(token: str) -> Optional[str]:
+    """Username si el token es de un admin activo (se ejecuta en el thread pool)"""
+    from app.db.database import SessionLocal
+    from app.models.user import User
+
+    username = verify_token(token)
+    if not username:
+        return None
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        return username if user and user.is_active and user.role == "admin" else None
+    finally:
+        db.close()
+
+
+class ProfilingMiddleware:
+    """Perfila el request si lo pide un admin; en cualquier otro caso no hace nada"""
+
+    def __init__(self, app: ASGIApp, root_app: ASGIApp):
+        self.app = app
+        self.root_app = root_app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        token = _bearer_token(scope)
+        username = await run_in_threadpool(_admin_username, token) if token else None
+        route = self._match_route(scope)
+        if username is None or route is None:
+            # Sin permisos el flag se ignora (no se revela que existe)
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = secrets.token_hex(8)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                url = f"{settings.API_V1_STR}/profiles/{profile_id}"
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode()),
+                    (b"x-profile-url", url.encode()),
+                ]
+            await send(message)
+
+        sampler = _Sampler(_route_codes(route), settings.PROFILING_INTERVAL_MS / 1000)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            duration_ms = (time.perf_counter() - started) * 1000
+            metadata = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route.path,
+                "status_code": status_code,
+                "duration_ms": round(duration_ms, 1),
+                "samples": sampler.ticks,
+                "username": username,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }
+            try:
+                await run_in_threadpool(save_profile, profile_id, sampler.stacks, metadata)
+            except OSError as e:
+                logger.warning("No se pudo guardar el perfil %s: %s", profile_id, e)
+
+    def _match_route(self, scope: Scope):
+        for route in self.root_app.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route if hasattr(route, "dependant") else None
+        return None
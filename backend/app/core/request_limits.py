@@ -0,0 +1,72 @@
+"""
+Límite de tamaño del cuerpo de los requests.
+
+FastAPI lee y guarda el multipart completo antes de llamar al endpoint, así
+que una subida de 500 MB se escribía entera a disco antes de poder
+rechazarla. Este middleware corta antes: responde 413 de inmediato si el
+`Content-Length` declarado excede el límite y, si no lo declara (chunked),
+cuenta los bytes a medida que llegan y aborta en cuanto se pasa.
+"""
+import json
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+# Margen para los encabezados y límites del multipart alrededor del archivo
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def max_body_size() -> int:
+    return settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024 + MULTIPART_OVERHEAD
+
+
+class RequestSizeLimitMiddleware:
+    """Rechaza con 413 los cuerpos más grandes que MAX_UPLOAD_SIZE_MB (más el margen del multipart)"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = max_body_size()
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+        rejected = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request" and not rejected:
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Se responde ya y la app ve una desconexión del cliente
+                    rejected = True
+                    await self._reject(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            if not rejected:
+                await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    @staticmethod
+    async def _reject(send: Send) -> None:
+        body = json.dumps({
+            "detail": f"Request muy grande. Tamaño máximo: {settings.MAX_UPLOAD_SIZE_MB} MB"
+        }, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,26 +1,74 @@
 import redis
 import json
+import threading
 import uuid
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import timedelta
 from app.core.config import settings
+from app.core.instrumentation import InstrumentedRedis
 
 
 class SessionStore:
     """Manejo de sesiones con Redis"""
     
     def __init__(self):
-        self.redis_client = redis.Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            db=settings.REDIS_DB,
-            password=settings.REDIS_PASSWORD if settings.REDIS_PASSWORD else None,
-            decode_responses=True
-        )
+        # El pool y el cliente se crean en el primer uso (o en el lifespan de la app)
+        self._redis_client: Optional[redis.Redis] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def redis_client(self) -> redis.Redis:
+        if self._redis_client is None:
+            with self._lock:
+                if self._redis_client is None:
+                    pool = redis.ConnectionPool(
+                        host=settings.REDIS_HOST,
+                        port=settings.REDIS_PORT,
+                        db=settings.REDIS_DB,
+                        password=settings.REDIS_PASSWORD if settings.REDIS_PASSWORD else None,
+                        max_connections=settings.REDIS_MAX_CONNECTIONS,
+                        decode_responses=True
+                    )
+                    self._redis_client = InstrumentedRedis(connection_pool=pool)
+        return self._redis_client
+    
+    @redis_client.setter
+    def redis_client(self, client: redis.Redis) -> None:
+        self._redis_client = client
+    
+    def warm_up(self, connections: int) -> None:
+        """
+        Abre `connections` conexiones del pool y verifica cada una con PING,
+        para que los primeros requests no paguen el handshake.
+        """
+        pool = self.redis_client.connection_pool
+        opened = []
+        try:
+            for _ in range(connections):
+                conn = pool.get_connection("PING")
+                conn.send_command("PING")
+                conn.read_response()
+                opened.append(conn)
+        finally:
+            for conn in opened:
+                pool.release(conn)
+    
+    def close(self) -> None:
+        """Cierra las conexiones del pool (apagado del worker)"""
+        with self._lock:
+            if self._redis_client is not None:
+                self._redis_client.connection_pool.disconnect()
+                self._redis_client = None
+    
+    @staticmethod
+    def _user_index_key(user_id: int) -> str:
+        """Clave del set con los session_id de un usuario"""
+        return f"user_sessions:{user_id}"
     
     def create_session(self, user_id: int, username: str, role: str) -> str:
         """
-        Crear una nueva sesión y retornar el session_id
+        Crear una nueva sesión y retornar el session_id.
+        Registra el session_id en el índice del usuario en la misma transacción.
         """
         session_id = str(uuid.uuid4())
         session_data = {
@@ -28,13 +76,15 @@ class SessionStore:
             "username": username,
             "role": role
         }
+        ttl = timedelta(seconds=settings.SESSION_EXPIRE_SECONDS)
+        index_key = self._user_index_key(user_id)
         
-        # Guardar en Redis con TTL
-        self.redis_client.setex(
-            f"session:{session_id}",
-            timedelta(seconds=settings.SESSION_EXPIRE_SECONDS),
-            json.dumps(session_data)
-        )
+        # Guardar en Redis con TTL junto con el índice por usuario (MULTI/EXEC)
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.setex(f"session:{session_id}", ttl, json.dumps(session_data))
+        pipe.sadd(index_key, session_id)
+        pipe.expire(index_key, ttl)
+        pipe.execute()
         
         return session_id
     
@@ -51,22 +101,82 @@ class SessionStore:
     
     def delete_session(self, session_id: str) -> bool:
         """
-        Eliminar sesión de Redis
+        Eliminar sesión de Redis y quitarla del índice del usuario
         """
         session_key = f"session:{session_id}"
-        result = self.redis_client.delete(session_key)
-        return result > 0
+        session_data = self.get_session(session_id)
+        
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.delete(session_key)
+        if session_data:
+            pipe.srem(self._user_index_key(session_data["user_id"]), session_id)
+        result = pipe.execute()
+        return result[0] > 0
     
     def refresh_session(self, session_id: str) -> bool:
         """
         Refrescar TTL de sesión (extender expiración)
         """
         session_key = f"session:{session_id}"
-        result = self.redis_client.expire(
-            session_key,
-            timedelta(seconds=settings.SESSION_EXPIRE_SECONDS)
-        )
+        ttl = timedelta(seconds=settings.SESSION_EXPIRE_SECONDS)
+        result = self.redis_client.expire(session_key, ttl)
+        
+        # El índice debe vivir al menos tanto como la sesión más reciente
+        session_data = self.get_session(session_id) if result else None
+        if session_data:
+            self.redis_client.expire(self._user_index_key(session_data["user_id"]), ttl)
         return result > 0
+    
+    def list_user_sessions(self, user_id: int) -> List[Dict[str, Any]]:
+        """
+        Listar las sesiones activas de un usuario en O(sesiones del usuario).
+        Las sesiones que ya expiraron se quitan del índice en el mismo paso.
+        """
+        index_key = self._user_index_key(user_id)
+        session_ids = list(self.redis_client.smembers(index_key))
+        if not session_ids:
+            return []
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.get(f"session:{session_id}")
+            pipe.ttl(f"session:{session_id}")
+        results = pipe.execute()
+        
+        sessions = []
+        expired = []
+        for i, session_id in enumerate(session_ids):
+            data, ttl = results[2 * i], results[2 * i + 1]
+            if data is None:
+                expired.append(session_id)
+                continue
+            sessions.append({
+                "session_id": session_id,
+                "expires_in": ttl,
+                **json.loads(data)
+            })
+        
+        if expired:
+            self.redis_client.srem(index_key, *expired)
+        
+        return sessions
+    
+    def delete_user_sessions(self, user_id: int) -> int:
+        """
+        Eliminar todas las sesiones de un usuario ("cerrar sesión en todos lados").
+        Retorna el número de sesiones eliminadas.
+        """
+        index_key = self._user_index_key(user_id)
+        session_ids = list(self.redis_client.smembers(index_key))
+        if not session_ids:
+            return 0
+        
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.delete(*[f"session:{session_id}" for session_id in session_ids])
+        # SREM en lugar de DEL: no perder sesiones creadas mientras tanto
+        pipe.srem(index_key, *session_ids)
+        result = pipe.execute()
+        return result[0]
 
 
 # Instancia global del store de sesión
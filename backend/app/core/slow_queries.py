@@ -0,0 +1,234 @@
+"""
+Log de queries lentas con captura de EXPLAIN.
+
+Cada sentencia que tarda más de SLOW_QUERY_THRESHOLD_MS se agrega en Redis
+por (ruta de origen, fingerprint normalizado): ocurrencias, tiempo total,
+máximo y primera/última vez. Para las primeras SLOW_QUERY_EXPLAIN_SAMPLES
+ocurrencias se guarda además su plan con los parámetros reales: `EXPLAIN
+(ANALYZE, BUFFERS)` para los SELECT y `EXPLAIN` simple para las escrituras y
+los SELECT con cláusula de bloqueo (FOR UPDATE / SHARE): ANALYZE las
+ejecutaría de nuevo y volvería a tomar los locks de fila. Además el EXPLAIN
+corre con un lock_timeout corto, para no quedar esperando detrás de un request.
+
+El hook de SQLAlchemy solo compara la duración y encola; el registro en Redis
+y el EXPLAIN corren en un thread aparte, fuera del request. Si la cola se
+llena (Redis caído, ráfaga de queries lentas) las ocurrencias se descartan.
+"""
+import hashlib
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+from app.core.config import settings
+from app.core.instrumentation import fingerprint_sql, set_slow_query_hook
+from app.core.session import session_store
+
+logger = logging.getLogger(__name__)
+
+ENTRY_KEY = "slow_query:{query_id}"
+PLANS_KEY = "slow_query:{query_id}:plans"
+INDEX_KEY = "slow_queries"  # sorted set query_id -> tiempo total (ms)
+QUEUE_SIZE = 1000
+
+# FOR UPDATE, FOR NO KEY UPDATE, FOR SHARE, FOR KEY SHARE (con o sin OF / NOWAIT / SKIP LOCKED)
+_LOCKING_CLAUSE = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b", re.IGNORECASE)
+
+
+def slow_query_id(route: str, fingerprint: str) -> str:
+    return hashlib.sha1(f"{route}|{fingerprint}".encode()).hexdigest()[:16]
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def _entry(query_id: str, data: dict, plans_captured: int) -> dict:
+    count = int(data.get("count", 0))
+    total_ms = float(data.get("total_ms", 0.0))
+    return {
+        "id": query_id,
+        "route": data["route"],
+        "fingerprint": data["fingerprint"],
+        "count": count,
+        "total_ms": round(total_ms, 1),
+        "avg_ms": round(total_ms / count, 1) if count else 0.0,
+        "max_ms": round(float(data.get("max_ms", 0.0)), 1),
+        "first_seen": data["first_seen"],
+        "last_seen": data["last_seen"],
+        "plans_captured": plans_captured,
+    }
+
+
+def explain(statement: str, parameters) -> str:
+    """
+    Plan de una sentencia con sus parámetros, en una conexión aparte y dentro
+    de una transacción que siempre se revierte.
+    """
+    from app.db.database import get_engine
+
+    is_select = statement.lstrip()[:6].upper() == "SELECT"
+    analyze = is_select and not _LOCKING_CLAUSE.search(statement)
+    options = "ANALYZE, BUFFERS, " if analyze else ""
+    with get_engine().connect() as conn:
+        with conn.begin() as transaction:
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}")
+            conn.exec_driver_sql(f"SET LOCAL lock_timeout = {int(settings.SLOW_QUERY_EXPLAIN_LOCK_TIMEOUT_MS)}")
+            sql = f"EXPLAIN ({options}FORMAT TEXT) {statement}"
+            result = conn.exec_driver_sql(sql, parameters) if parameters else conn.exec_driver_sql(sql)
+            plan = "\n".join(row[0] for row in result)
+            transaction.rollback()
+    return plan
+
+
+class SlowQueryLog:
+    """Recibe las sentencias del hook de instrumentación y las agrega en Redis"""
+
+    def __init__(self):
+        self._queue: "queue.Queue" = queue.Queue(maxsize=QUEUE_SIZE)
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Registra el hook y arranca el thread de registro (arranque del worker)"""
+        if not settings.SLOW_QUERY_LOG_ENABLED:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="slow-query-log", daemon=True)
+                self._worker.start()
+        set_slow_query_hook(self.observe)
+
+    def stop(self) -> None:
+        """Quita el hook y termina el thread tras vaciar la cola (apagado del worker)"""
+        set_slow_query_hook(None)
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put(None)
+            worker.join(timeout=settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS / 1000 + 1)
+
+    def flush(self) -> None:
+        """Espera a que se procesen las ocurrencias encoladas"""
+        self._queue.join()
+
+    def observe(self, statement: str, parameters, elapsed: float, route: Optional[str]) -> None:
+        """Hook de instrumentación: se ejecuta en el thread de la query, debe ser barato"""
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+            return
+        if statement.lstrip()[:7].upper() == "EXPLAIN":
+            return  # Los planes que capturamos nosotros mismos
+        try:
+            self._queue.put_nowait((statement, parameters, elapsed_ms, route or "background", time.time()))
+        except queue.Full:
+            pass
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self.record(*item)
+            except Exception as e:
+                logger.warning("No se pudo registrar la query lenta: %s", e)
+            finally:
+                self._queue.task_done()
+
+    def record(self, statement: str, parameters, elapsed_ms: float, route: str, seen_at: float) -> None:
+        """Suma una ocurrencia y, si es de las primeras, captura su plan"""
+        fingerprint = fingerprint_sql(statement)
+        query_id = slow_query_id(route, fingerprint)
+        key = ENTRY_KEY.format(query_id=query_id)
+        ttl = settings.SLOW_QUERY_RETENTION_HOURS * 3600
+        redis_client = session_store.redis_client
+
+        pipe = redis_client.pipeline()
+        pipe.hsetnx(key, "route", route)
+        pipe.hsetnx(key, "fingerprint", fingerprint)
+        pipe.hsetnx(key, "first_seen", _iso(seen_at))
+        pipe.hset(key, "last_seen", _iso(seen_at))
+        pipe.hincrby(key, "count", 1)
+        pipe.hincrbyfloat(key, "total_ms", elapsed_ms)
+        pipe.hget(key, "max_ms")
+        pipe.zincrby(INDEX_KEY, elapsed_ms, query_id)
+        pipe.expire(key, ttl)
+        results = pipe.execute()
+        count, max_ms = results[4], results[6]
+
+        if max_ms is None or elapsed_ms > float(max_ms):
+            redis_client.hset(key, "max_ms", elapsed_ms)
+        if count > settings.SLOW_QUERY_EXPLAIN_SAMPLES:
+            return
+
+        try:
+            plan = explain(statement, parameters)
+        except Exception as e:
+            plan = f"No se pudo obtener el plan: {e}"
+        plans_key = PLANS_KEY.format(query_id=query_id)
+        sample = {
+            "captured_at": _iso(time.time()),
+            "duration_ms": round(elapsed_ms, 1),
+            "statement": statement,
+            "plan": plan,
+        }
+        pipe = redis_client.pipeline()
+        pipe.rpush(plans_key, json.dumps(sample))
+        pipe.ltrim(plans_key, 0, settings.SLOW_QUERY_EXPLAIN_SAMPLES - 1)
+        pipe.expire(plans_key, ttl)
+        pipe.execute()
+
+    # -----------------------------------------------------------------------
+    # Consulta
+    # -----------------------------------------------------------------------
+
+    def top(self, limit: int = 50) -> List[dict]:
+        """Sentencias lentas ordenadas por tiempo total, de mayor a menor"""
+        redis_client = session_store.redis_client
+        query_ids = redis_client.zrevrange(INDEX_KEY, 0, limit - 1)
+        pipe = redis_client.pipeline()
+        for query_id in query_ids:
+            pipe.hgetall(ENTRY_KEY.format(query_id=query_id))
+            pipe.llen(PLANS_KEY.format(query_id=query_id))
+        results = pipe.execute()
+
+        entries, expired = [], []
+        for index, query_id in enumerate(query_ids):
+            data, plans_captured = results[2 * index], results[2 * index + 1]
+            if not data:
+                expired.append(query_id)
+                continue
+            entries.append(_entry(query_id, data, plans_captured))
+        if expired:
+            redis_client.zrem(INDEX_KEY, *expired)
+        return entries
+
+    def get(self, query_id: str) -> Optional[dict]:
+        """Detalle de una sentencia con los planes capturados, o None si no existe"""
+        redis_client = session_store.redis_client
+        pipe = redis_client.pipeline()
+        pipe.hgetall(ENTRY_KEY.format(query_id=query_id))
+        pipe.lrange(PLANS_KEY.format(query_id=query_id), 0, -1)
+        data, plans = pipe.execute()
+        if not data:
+            return None
+        entry = _entry(query_id, data, len(plans))
+        entry["plans"] = [json.loads(plan) for plan in plans]
+        return entry
+
+    def clear(self) -> int:
+        """Borra todo el log; retorna cuántas sentencias tenía"""
+        redis_client = session_store.redis_client
+        query_ids = redis_client.zrange(INDEX_KEY, 0, -1)
+        keys = [INDEX_KEY]
+        for query_id in query_ids:
+            keys += [ENTRY_KEY.format(query_id=query_id), PLANS_KEY.format(query_id=query_id)]
+        redis_client.delete(*keys)
+        return len(query_ids)
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,110 @@
+"""
+Archivos estáticos de `/uploads` con encabezados de caché.
+
+Las imágenes direccionadas por contenido (`{sha256}.ext` y sus variantes)
+nunca cambian bajo la misma URL: se sirven con `Cache-Control: immutable` de
+un año, así que ni el navegador ni el proxy revalidan. Los archivos con el
+nombre anterior se cachean un día, como hacía nginx.
+
+Con UPLOADS_SERVE_MODE=x-accel el worker no lee ni envía bytes: resuelve la
+ruta (sin salir del directorio, sin temporales ni archivos ocultos), verifica
+que el archivo exista y responde vacío con `X-Accel-Redirect`. nginx entrega
+el archivo desde su location `internal` con sendfile, y resuelve él mismo
+`Range`, `If-None-Match` e `If-Modified-Since`. En modo "app" lo hace
+FileResponse, que también soporta rangos y peticiones condicionales.
+
+Con `?w=&q=&fmt=` se sirve una versión redimensionada desde el cache en disco
+(ver `app.core.image_cache`), con el mismo Cache-Control que el original.
+"""
+import mimetypes
+import os
+import stat
+from typing import Optional
+from urllib.parse import quote
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Scope
+from app.core.config import settings
+from app.core.image_cache import RESIZABLE_EXTENSIONS, parse_resize_request, resize_cache
+from app.core.image_store import IMMUTABLE_CACHE_CONTROL, is_content_addressed
+
+DEFAULT_CACHE_CONTROL = "public, max-age=86400"
+
+
+def is_servable(path: str) -> bool:
+    """Los temporales de subida (`.upload-*.part`, `*.part`) y los ocultos nunca se sirven"""
+    parts = path.replace("\\", "/").split("/")
+    return not any(part.startswith(".") for part in parts) and not path.endswith(".part")
+
+
+def cache_control_for(filename: str) -> str:
+    return IMMUTABLE_CACHE_CONTROL if is_content_addressed(filename) else DEFAULT_CACHE_CONTROL
+
+
+class UploadsStaticFiles(StaticFiles):
+    """StaticFiles con Cache-Control por tipo de nombre y entrega opcional por nginx"""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if not is_servable(path):
+            raise HTTPException(status_code=404)
+        try:
+            resize = parse_resize_request(scope.get("query_string", b"").decode("latin-1"))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if resize is None:
+            return await super().get_response(path, scope)
+
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+        if not stat_result or not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPException(status_code=404)
+        if os.path.splitext(full_path)[1].lower() not in RESIZABLE_EXTENSIONS:
+            raise HTTPException(status_code=400, detail="Solo se pueden redimensionar imágenes")
+        try:
+            resized_path, _ = await resize_cache.get(full_path, resize)
+        except Exception:
+            # Pillow no pudo abrir el original
+            raise HTTPException(status_code=400, detail="El archivo no es una imagen válida")
+        return self.file_response(
+            resized_path, await anyio.to_thread.run_sync(os.stat, resized_path), scope,
+            cache_control=cache_control_for(os.path.basename(full_path))
+        )
+
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+        cache_control: Optional[str] = None,
+    ) -> Response:
+        cache_control = cache_control or cache_control_for(os.path.basename(full_path))
+        if settings.UPLOADS_SERVE_MODE == "x-accel" and self.is_inside(full_path):
+            return self.accel_response(full_path, cache_control)
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["Cache-Control"] = cache_control
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def is_inside(self, full_path: PathLike) -> bool:
+        """nginx solo puede servir lo que está bajo el directorio montado (el cache puede estar afuera)"""
+        directory = os.path.realpath(self.directory)
+        return os.path.commonpath([os.path.realpath(full_path), directory]) == directory
+
+    def accel_response(self, full_path: PathLike, cache_control: str) -> Response:
+        """Respuesta vacía que le pide a nginx servir el archivo (copia Content-Type y Cache-Control)"""
+        relative = os.path.relpath(os.path.realpath(full_path), os.path.realpath(self.directory)).replace(os.sep, "/")
+        media_type = mimetypes.guess_type(str(full_path))[0] or "application/octet-stream"
+        return Response(
+            media_type=media_type,
+            headers={
+                "X-Accel-Redirect": settings.UPLOADS_ACCEL_PREFIX + quote(relative),
+                "Cache-Control": cache_control,
+            },
+        )
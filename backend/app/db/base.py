@@ -1,3 +1,5 @@
 from sqlalchemy.ext.declarative import declarative_base
+from app.db.search import install_trigram
 
 Base = declarative_base()
+install_trigram(Base.metadata)
@@ -1,9 +1,127 @@
+import itertools
+import threading
+import time
+from typing import Dict, Optional, Tuple
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 from app.core.config import settings
+from app.core.instrumentation import instrument_engine
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# El engine se crea en el primer uso (o en el lifespan de la app),
+# no al importar el módulo
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+
+class CheckoutWaits:
+    """
+    Espera de los checkouts del pool: los que siguen esperando y la mayor
+    espera terminada dentro de la ventana de HEALTH_POOL_WAIT_WINDOW_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = itertools.count()
+        self._waiting: Dict[int, float] = {}
+        self._window_max = 0.0
+        self._window_started = 0.0
+
+    def begin(self) -> int:
+        token = next(self._tokens)
+        with self._lock:
+            self._waiting[token] = time.perf_counter()
+        return token
+
+    def end(self, token: int) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            wait = now - self._waiting.pop(token)
+            if now - self._window_started > settings.HEALTH_POOL_WAIT_WINDOW_SECONDS:
+                self._window_max, self._window_started = wait, now
+            else:
+                self._window_max = max(self._window_max, wait)
+
+    def snapshot(self) -> Tuple[int, float]:
+        """(checkouts esperando ahora, mayor espera reciente en ms, contando las que siguen)"""
+        now = time.perf_counter()
+        with self._lock:
+            waiting = len(self._waiting)
+            longest = max((now - started for started in self._waiting.values()), default=0.0)
+            if now - self._window_started <= settings.HEALTH_POOL_WAIT_WINDOW_SECONDS:
+                longest = max(longest, self._window_max)
+        return waiting, round(longest * 1000, 2)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mide cuánto espera cada checkout (lo reporta /health/ready)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_waits = CheckoutWaits()
+
+    def connect(self):
+        token = self.checkout_waits.begin()
+        try:
+            return super().connect()
+        finally:
+            self.checkout_waits.end(token)
+
+
+def get_engine() -> Engine:
+    """Retorna el engine de SQLAlchemy, creándolo la primera vez"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(
+                    settings.DATABASE_URL,
+                    pool_size=settings.DB_POOL_SIZE,
+                    max_overflow=settings.DB_MAX_OVERFLOW,
+                    pool_pre_ping=True,
+                    poolclass=TimedQueuePool
+                )
+                instrument_engine(_engine)
+                _session_factory.configure(bind=_engine)
+    return _engine
+
+
+def configure_engine(engine: Engine) -> None:
+    """Usar un engine ya creado (tests, scripts de benchmark) en lugar del de settings"""
+    global _engine
+    with _engine_lock:
+        instrument_engine(engine)
+        _session_factory.configure(bind=engine)
+        _engine = engine
+
+
+def current_engine() -> Optional[Engine]:
+    """Engine actual sin crearlo (para métricas y chequeos)"""
+    return _engine
+
+
+def dispose_engine() -> None:
+    """Cierra todas las conexiones del pool (apagado del worker)"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+
+def SessionLocal() -> Session:
+    """Crea una sesión de base de datos (mismo uso que el sessionmaker anterior)"""
+    get_engine()
+    return _session_factory()
+
+
+def __getattr__(name):
+    # Compatibilidad: `from app.db.database import engine` sigue funcionando
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_db():
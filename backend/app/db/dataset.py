@@ -0,0 +1,452 @@
+"""
+Generador de datos sintéticos a gran escala para benchmarks.
+
+Produce productos, vendedores, ventas (con sus pagos), earnings e inversiones
+con una distribución realista y los carga con `COPY` de PostgreSQL. Con la
+misma semilla y los mismos parámetros el resultado es idéntico fila por fila,
+así las corridas de benchmark son comparables.
+
+- Estacionalidad anual (pico en diciembre) y semanal (fines de semana)
+- Popularidad de productos y vendedores con cola larga (tipo Zipf)
+- Descuentos en una fracción configurable de las ventas
+- Mezcla de estados PENDING / PARTIAL / COMPLETED / CANCELLED configurable
+
+Los pagos se representan como en la API: `amount_paid`, `amount_remaining` y
+`payment_method` de cada venta (no hay tabla de pagos).
+
+Ejecutar:
+    python -m app.db.dataset --products 2000 --sellers 50 --sales 10000000 --truncate
+"""
+import argparse
+import csv
+import io
+import math
+import random
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+# Tablas que llena el generador, en orden de carga (respetando FKs)
+TABLES = ["products", "sellers", "investments", "sales", "earnings"]
+
+DEFAULT_STATUS_MIX = {"COMPLETED": 0.70, "PARTIAL": 0.10, "PENDING": 0.12, "CANCELLED": 0.08}
+PAYMENT_METHODS = ["CASH", "CARD", "TRANSFER", "MIXED"]
+PAYMENT_METHOD_WEIGHTS = [0.45, 0.35, 0.15, 0.05]
+
+CATEGORIES = [
+    ("Laptop", 450.0, 1800.0), ("Monitor", 120.0, 600.0), ("Mouse", 8.0, 90.0),
+    ("Teclado", 12.0, 160.0), ("Audífonos", 15.0, 350.0), ("Webcam", 20.0, 140.0),
+    ("SSD", 35.0, 220.0), ("Router", 25.0, 250.0), ("Cable", 2.0, 25.0),
+    ("Cargador", 6.0, 60.0), ("Impresora", 80.0, 450.0), ("Tablet", 120.0, 900.0),
+]
+BRANDS = ["Dell", "Logitech", "Keychron", "LG", "Sony", "Samsung", "TP-Link", "HP", "Lenovo", "Kingston"]
+FIRST_NAMES = ["Juan", "María", "Carlos", "Ana", "Luis", "Sofía", "Jorge", "Lucía", "Pedro", "Elena"]
+LAST_NAMES = ["Pérez", "González", "Rodríguez", "López", "Martínez", "Sánchez", "Ramírez", "Torres"]
+
+
+@dataclass
+class DatasetConfig:
+    """Parámetros de generación"""
+    products: int = 1000
+    sellers: int = 50
+    sales: int = 1_000_000
+    investments: int = 200
+    start_date: date = date(2024, 1, 1)
+    end_date: date = date(2025, 12, 31)
+    seed: int = 42
+    seasonality: float = 0.35  # amplitud anual (0 = plano)
+    weekend_boost: float = 0.25  # ventas extra sábado y domingo
+    discount_rate: float = 0.15  # fracción de ventas con descuento
+    max_discount: float = 30.0  # descuento máximo en %
+    status_mix: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_STATUS_MIX))
+
+
+@dataclass
+class _ProductRow:
+    id: int
+    price: float
+    cost_price: float
+
+
+class _CopySource(io.TextIOBase):
+    """Archivo de solo lectura sobre un iterador de líneas CSV (para copy_expert sin cargar todo en memoria)"""
+
+    def __init__(self, lines: Iterable[str]):
+        self._lines = iter(lines)
+        self._buffer = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._lines)
+            except StopIteration:
+                break
+        if size < 0:
+            chunk, self._buffer = self._buffer, ""
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def _csv_lines(rows: Iterable[tuple], batch_size: int = 5000) -> Iterator[str]:
+    """Serializa filas a CSV en bloques de `batch_size`"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def _rng(config: DatasetConfig, stream: str) -> random.Random:
+    # Un generador independiente por tabla: cambiar --investments no altera las ventas
+    return random.Random(f"{config.seed}:{stream}")
+
+
+def _zipf_weights(n: int, exponent: float) -> List[float]:
+    return [1.0 / (rank ** exponent) for rank in range(1, n + 1)]
+
+
+def _day_weights(config: DatasetConfig) -> List[float]:
+    """Peso relativo de cada día del rango (estacionalidad anual + semanal)"""
+    weights = []
+    days = (config.end_date - config.start_date).days + 1
+    for offset in range(days):
+        day = config.start_date + timedelta(days=offset)
+        # Pico a mediados de diciembre, valle a mediados de junio
+        yearly = 1.0 + config.seasonality * math.cos(2 * math.pi * (day.timetuple().tm_yday - 350) / 365.0)
+        weekly = 1.0 + config.weekend_boost if day.weekday() >= 5 else 1.0
+        weights.append(yearly * weekly)
+    return weights
+
+
+def _daily_counts(total: int, weights: List[float]) -> List[int]:
+    """Reparte `total` ventas entre los días según los pesos (mayor residuo, suma exacta)"""
+    weight_sum = sum(weights)
+    exact = [total * weight / weight_sum for weight in weights]
+    counts = [int(value) for value in exact]
+    missing = total - sum(counts)
+    by_remainder = sorted(range(len(exact)), key=lambda i: exact[i] - counts[i], reverse=True)
+    for index in by_remainder[:missing]:
+        counts[index] += 1
+    return counts
+
+
+def _fmt_ts(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# ---------------------------------------------------------------------------
+# Generación de filas
+# ---------------------------------------------------------------------------
+
+def generate_products(config: DatasetConfig) -> Iterator[tuple]:
+    """(id, name, description, price, cost_price, profit_margin, stock, image_url, is_active, created_at)"""
+    rng = _rng(config, "products")
+    catalog_start = datetime.combine(config.start_date, datetime.min.time())
+    for product_id in range(1, config.products + 1):
+        category, low, high = CATEGORIES[rng.randrange(len(CATEGORIES))]
+        brand = BRANDS[rng.randrange(len(BRANDS))]
+        cost_price = round(rng.uniform(low, high), 2)
+        margin = rng.choice([15.0, 20.0, 25.0, 30.0, 35.0, 40.0, 50.0])
+        price = round(cost_price * (1 + margin / 100), 2)
+        created_at = catalog_start - timedelta(days=rng.randint(0, 365), seconds=rng.randint(0, 86399))
+        yield (
+            product_id,
+            f"{category} {brand} {product_id:06d}",
+            f"{category} marca {brand}",
+            price,
+            cost_price,
+            margin,
+            rng.randint(0, 500),
+            "",
+            "t" if rng.random() < 0.95 else "f",
+            _fmt_ts(created_at),
+        )
+
+
+def generate_sellers(config: DatasetConfig) -> Iterator[tuple]:
+    """(id, name, contact_info, is_active, created_at)"""
+    rng = _rng(config, "sellers")
+    start = datetime.combine(config.start_date, datetime.min.time())
+    for seller_id in range(1, config.sellers + 1):
+        first = FIRST_NAMES[rng.randrange(len(FIRST_NAMES))]
+        last = LAST_NAMES[rng.randrange(len(LAST_NAMES))]
+        yield (
+            seller_id,
+            f"{first} {last} {seller_id}",
+            f"vendedor{seller_id}@puntoventa.com | 555-{rng.randint(1000, 9999)}",
+            "t" if rng.random() < 0.9 else "f",
+            _fmt_ts(start - timedelta(days=rng.randint(0, 365))),
+        )
+
+
+def generate_investments(config: DatasetConfig) -> Iterator[tuple]:
+    """(id, amount, description, date, registered_by, created_at)"""
+    rng = _rng(config, "investments")
+    days = (config.end_date - config.start_date).days + 1
+    for investment_id in range(1, config.investments + 1):
+        when = datetime.combine(config.start_date, datetime.min.time(), tzinfo=timezone.utc) + timedelta(
+            days=rng.randrange(days), seconds=rng.randint(0, 86399)
+        )
+        yield (
+            investment_id,
+            round(rng.lognormvariate(8.0, 1.0), 2),
+            rng.choice(["Compra de inventario", "Reabastecimiento", "Mobiliario", "Equipo de cómputo"]),
+            when.isoformat(),
+            "admin",
+            when.isoformat(),
+        )
+
+
+def _load_product_prices(config: DatasetConfig) -> List[_ProductRow]:
+    return [_ProductRow(id=row[0], price=row[3], cost_price=row[4]) for row in generate_products(config)]
+
+
+def generate_sales(config: DatasetConfig, earnings_sink: Optional[csv.writer] = None) -> Iterator[tuple]:
+    """
+    Ventas en orden cronológico (los ids crecen con la fecha, como en producción).
+
+    (id, product_id, seller_id, quantity, status, subtotal, discount, total_price,
+     amount_paid, amount_remaining, payment_method, notes, due_date, created_at)
+
+    Si se pasa `earnings_sink`, escribe ahí el registro de earnings de cada venta
+    COMPLETED, con el mismo cálculo que `_create_earnings_record`.
+    """
+    rng = _rng(config, "sales")
+    products = _load_product_prices(config)
+    product_cum = list(_accumulate(_zipf_weights(len(products), 1.1)))
+    seller_ids = list(range(1, config.sellers + 1))
+    seller_cum = list(_accumulate(_zipf_weights(len(seller_ids), 0.6)))
+    statuses = list(config.status_mix)
+    status_cum = list(_accumulate(config.status_mix[s] for s in statuses))
+    method_cum = list(_accumulate(PAYMENT_METHOD_WEIGHTS))
+    counts = _daily_counts(config.sales, _day_weights(config))
+
+    sale_id = 0
+    earning_id = 0
+    for offset, count in enumerate(counts):
+        if not count:
+            continue
+        day = datetime.combine(config.start_date + timedelta(days=offset), datetime.min.time())
+        # Horario de tienda: 9:00 a 21:00
+        seconds = sorted(rng.randint(9 * 3600, 21 * 3600 - 1) for _ in range(count))
+        day_products = rng.choices(products, cum_weights=product_cum, k=count)
+        day_sellers = rng.choices(seller_ids, cum_weights=seller_cum, k=count)
+        day_statuses = rng.choices(statuses, cum_weights=status_cum, k=count)
+        for second, product, seller_id, sale_status in zip(seconds, day_products, day_sellers, day_statuses):
+            sale_id += 1
+            created_at = day + timedelta(seconds=second)
+            quantity = min(1 + int(rng.expovariate(1.2)), 20)
+            subtotal = round(product.price * quantity, 2)
+            discount = round(rng.uniform(5.0, config.max_discount), 0) if rng.random() < config.discount_rate else 0.0
+            total_price = round(subtotal - subtotal * discount / 100, 2)
+
+            if sale_status == "COMPLETED":
+                amount_paid = total_price
+            elif sale_status == "PARTIAL":
+                amount_paid = round(total_price * rng.uniform(0.1, 0.9), 2)
+            else:
+                # PENDING sin pagos; CANCELLED solo se permite sin pagos
+                amount_paid = 0.0
+            amount_remaining = round(total_price - amount_paid, 2)
+            payment_method = rng.choices(PAYMENT_METHODS, cum_weights=method_cum)[0]
+            due_date = (
+                (created_at + timedelta(days=rng.randint(7, 30))).date().isoformat()
+                if sale_status in ("PENDING", "PARTIAL") else ""
+            )
+
+            yield (
+                sale_id, product.id, seller_id, quantity, sale_status, subtotal, discount,
+                total_price, amount_paid, amount_remaining, payment_method, "", due_date,
+                _fmt_ts(created_at),
+            )
+
+            if earnings_sink is not None and sale_status == "COMPLETED":
+                earning_id += 1
+                total_cost = round(product.cost_price * quantity, 2)
+                total_revenue = round(product.price * quantity, 2)
+                profit = round(total_revenue - total_cost, 2)
+                earnings_sink.writerow((
+                    earning_id, sale_id, product.id, product.cost_price, product.price, quantity,
+                    total_cost, total_revenue, profit,
+                    round(profit / total_revenue * 100, 2) if total_revenue > 0 else 0.0,
+                    "t", _fmt_ts(created_at),
+                ))
+
+
+def _accumulate(values: Iterable[float]) -> Iterator[float]:
+    total = 0.0
+    for value in values:
+        total += value
+        yield total
+
+
+# ---------------------------------------------------------------------------
+# Carga
+# ---------------------------------------------------------------------------
+
+COLUMNS = {
+    "products": "id, name, description, price, cost_price, profit_margin, stock, image_url, is_active, created_at",
+    "sellers": "id, name, contact_info, is_active, created_at",
+    "investments": "id, amount, description, date, registered_by, created_at",
+    "sales": (
+        "id, product_id, seller_id, quantity, status, subtotal, discount, total_price, "
+        "amount_paid, amount_remaining, payment_method, notes, due_date, created_at"
+    ),
+    "earnings": (
+        "id, sale_id, product_id, cost_price, sale_price, quantity, total_cost, "
+        "total_revenue, profit, profit_margin, is_recorded, created_at"
+    ),
+}
+
+
+def _copy(cursor, table: str, source) -> int:
+    cursor.copy_expert(f"COPY {table} ({COLUMNS[table]}) FROM STDIN WITH (FORMAT csv)", source)
+    return cursor.rowcount
+
+
+def load_dataset(engine: Engine, config: DatasetConfig, truncate: bool = False) -> Dict[str, int]:
+    """
+    Genera y carga el dataset en una sola transacción. Retorna filas por tabla.
+
+    Las tablas deben estar vacías (o usar `truncate=True`): los ids se asignan
+    desde 1 para que el dataset sea reproducible, y al final se ajustan las
+    secuencias y se ejecuta ANALYZE.
+    """
+    loaded = {}
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if truncate:
+            cursor.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+        else:
+            for table in TABLES:
+                cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {table})")
+                if cursor.fetchone()[0]:
+                    raise RuntimeError(f"La tabla '{table}' tiene datos; usar --truncate para reemplazarlos")
+
+        loaded["products"] = _copy(cursor, "products", _CopySource(_csv_lines(generate_products(config))))
+        loaded["sellers"] = _copy(cursor, "sellers", _CopySource(_csv_lines(generate_sellers(config))))
+        loaded["investments"] = _copy(cursor, "investments", _CopySource(_csv_lines(generate_investments(config))))
+
+        # Las earnings se generan junto con las ventas y se copian después (requieren los sale_id)
+        with tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as earnings_file:
+            earnings_writer = csv.writer(earnings_file, lineterminator="\n")
+            loaded["sales"] = _copy(
+                cursor, "sales", _CopySource(_csv_lines(generate_sales(config, earnings_writer)))
+            )
+            earnings_file.seek(0)
+            loaded["earnings"] = _copy(cursor, "earnings", earnings_file)
+
+        for table in TABLES:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+            )
+        raw.commit()
+
+        # ANALYZE fuera de la transacción de carga para que el planner vea las estadísticas nuevas
+        for table in TABLES:
+            cursor.execute(f"ANALYZE {table}")
+        raw.commit()
+        cursor.close()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    return loaded
+
+
+def _parse_status_mix(value: str) -> Dict[str, float]:
+    """'COMPLETED=0.7,PARTIAL=0.1,...' -> dict normalizado"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip().upper()
+        if name not in DEFAULT_STATUS_MIX:
+            raise argparse.ArgumentTypeError(f"Estado desconocido: {name}")
+        mix[name] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("La suma de pesos debe ser mayor a 0")
+    return {name: weight / total for name, weight in mix.items()}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    defaults = DatasetConfig()
+    parser = argparse.ArgumentParser(description="Genera un dataset sintético grande y lo carga con COPY")
+    parser.add_argument("--products", type=int, default=defaults.products)
+    parser.add_argument("--sellers", type=int, default=defaults.sellers)
+    parser.add_argument("--sales", type=int, default=defaults.sales)
+    parser.add_argument("--investments", type=int, default=defaults.investments)
+    parser.add_argument("--start-date", type=date.fromisoformat, default=defaults.start_date)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=defaults.end_date)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--seasonality", type=float, default=defaults.seasonality,
+                        help="Amplitud de la estacionalidad anual (0 = plano)")
+    parser.add_argument("--weekend-boost", type=float, default=defaults.weekend_boost)
+    parser.add_argument("--discount-rate", type=float, default=defaults.discount_rate,
+                        help="Fracción de ventas con descuento")
+    parser.add_argument("--max-discount", type=float, default=defaults.max_discount,
+                        help="Descuento máximo en %%")
+    parser.add_argument("--status-mix", type=_parse_status_mix, default=defaults.status_mix,
+                        help="Ej. COMPLETED=0.7,PARTIAL=0.1,PENDING=0.12,CANCELLED=0.08")
+    parser.add_argument("--database-url", help="Por defecto, DATABASE_URL de la configuración")
+    parser.add_argument("--truncate", action="store_true",
+                        help="Vaciar productos, vendedores, ventas, earnings e inversiones antes de cargar")
+    args = parser.parse_args(argv)
+
+    if args.end_date < args.start_date:
+        parser.error("--end-date debe ser posterior a --start-date")
+
+    config = DatasetConfig(
+        products=args.products,
+        sellers=args.sellers,
+        sales=args.sales,
+        investments=args.investments,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        seed=args.seed,
+        seasonality=args.seasonality,
+        weekend_boost=args.weekend_boost,
+        discount_rate=args.discount_rate,
+        max_discount=args.max_discount,
+        status_mix=args.status_mix,
+    )
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from app.db.database import get_engine
+        engine = get_engine()
+
+    print(f"\n🌱 Generando dataset (semilla {config.seed}): {config.products} productos, "
+          f"{config.sellers} vendedores, {config.sales} ventas, {config.investments} inversiones\n")
+    started = time.perf_counter()
+    loaded = load_dataset(engine, config, truncate=args.truncate)
+    elapsed = time.perf_counter() - started
+
+    for table in TABLES:
+        print(f"✓ {table}: {loaded[table]} filas")
+    total_rows = sum(loaded.values())
+    print(f"\n✅ {total_rows} filas en {elapsed:.1f} s ({total_rows / elapsed:,.0f} filas/s)")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Búsqueda de texto en PostgreSQL.
+
+- Texto completo: columnas `tsvector` generadas con el diccionario español
+  (stemming: "zapatos" encuentra "zapato") e índice GIN. Las palabras de la
+  búsqueda se usan como prefijos ("choco" encuentra "chocolate").
+- Errores de tipeo: extensión `pg_trgm` con índices GIN `gin_trgm_ops`, que
+  además hacen indexable `ILIKE '%texto%'`.
+
+La migración instala pg_trgm (viene en la imagen oficial de Postgres). Si una
+base creada con `create_all` no la tiene, los índices de trigramas no se crean
+y las búsquedas funcionan solo con texto completo / ILIKE sin índice.
+"""
+import re
+import weakref
+from typing import Optional
+from sqlalchemy import DDL, event, text
+from sqlalchemy.engine import Connection, Engine
+
+TEXT_SEARCH_CONFIG = "spanish"
+MAX_SEARCH_TERMS = 8  # Palabras de la búsqueda que se usan (las demás se ignoran)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_trigram_by_engine: "weakref.WeakKeyDictionary[Engine, bool]" = weakref.WeakKeyDictionary()
+
+
+def prefix_tsquery(search: str) -> Optional[str]:
+    """`to_tsquery` que exige todas las palabras como prefijo, o None si no hay palabras"""
+    words = _WORD.findall(search.lower())[:MAX_SEARCH_TERMS]
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def like_pattern(search: str) -> str:
+    """Patrón `%texto%` con los comodines del usuario escapados (usar con escape='\\\\')"""
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def has_trigram(bind) -> bool:
+    """Si pg_trgm está instalada en la base (se consulta una vez por engine)"""
+    engine = bind.engine if isinstance(bind, Connection) else bind
+    installed = _trigram_by_engine.get(engine)
+    if installed is None:
+        with engine.connect() as conn:
+            installed = conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+        _trigram_by_engine[engine] = installed
+    return installed
+
+
+def _trigram_available(ddl, target, bind, **kw) -> bool:
+    return bind.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first() is not None
+
+
+def _trigram_installed(ddl, target, bind, **kw) -> bool:
+    return bind.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+
+
+def trigram_index(table, name: str, column: str) -> None:
+    """
+    Índice GIN de trigramas sobre `column`. `create_all` lo crea solo si
+    pg_trgm quedó instalada; en producción lo crea la migración.
+    """
+    event.listen(
+        table, "after_create",
+        DDL(f"CREATE INDEX IF NOT EXISTS {name} ON {table.name} USING gin ({column} gin_trgm_ops)")
+        .execute_if(callable_=_trigram_installed)
+    )
+
+
+def install_trigram(metadata) -> None:
+    """Antes de `create_all`, instala pg_trgm si el servidor la trae"""
+    event.listen(
+        metadata, "before_create",
+        DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(callable_=_trigram_available)
+    )
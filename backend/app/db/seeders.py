@@ -4,7 +4,7 @@ Ejecutar: python -m app.db.seeders
 """
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
-from app.db.database import SessionLocal, engine
+from app.db.database import SessionLocal
 from app.models.user import User
 from app.models.product import Product
 from app.models.sellers import Sellers
@@ -3,3 +3,6 @@ from app.models.product import Product
 from app.models.sales import Sales
 from app.models.earnings import Earnings
 from app.models.sellers import Sellers
+from app.models.device import DeviceKey
+from app.models.product_image import ProductImage
+from app.models.stock_movement import StockMovement
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy.orm import relationship
+from app.db.base import Base
+from sqlalchemy.sql.sqltypes import TIMESTAMP
+
+
+class DeviceKey(Base):
+    """
+    API key de larga duración para una terminal POS (caja registradora).
+
+    Solo se guarda el HMAC-SHA256 de la llave; la llave en texto plano
+    se muestra una única vez al crearla. La terminal actúa en nombre
+    del usuario `user_id`.
+    """
+    __tablename__ = "device_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)
+    key_prefix = Column(String(16), unique=True, index=True, nullable=False)  # Parte pública para buscar la llave
+    key_hash = Column(String(64), nullable=False)  # HMAC-SHA256 hex de la llave completa
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(TIMESTAMP, nullable=False)
+    last_used_at = Column(TIMESTAMP)
+    revoked_at = Column(TIMESTAMP)
+
+    user = relationship("User")
@@ -7,7 +7,7 @@ class Earnings(Base):
     __tablename__ = "earnings"
     
     id = Column(Integer, primary_key=True, index=True)
-    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False)
+    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     cost_price = Column(Float, nullable=False) #precio de costo del producto al momento de venta
     sale_price = Column(Float, nullable=False) #precio de venta del producto
@@ -17,7 +17,7 @@ class Earnings(Base):
     profit = Column(Float, nullable=False) #profit = total_revenue - total_cost
     profit_margin = Column(Float, nullable=False) #profit margin = (profit / total_revenue) * 100
     is_recorded = Column(Boolean, default=False)
-    created_at = Column(TIMESTAMP, nullable=False)
+    created_at = Column(TIMESTAMP, nullable=False, index=True)
     
     sale = relationship("Sales", back_populates="earnings")
     product = relationship("Product", back_populates="earnings")
\ No newline at end of file
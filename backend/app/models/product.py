@@ -1,14 +1,25 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, Index, Integer, String, Float, Boolean, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from app.db.base import Base
+from app.db.search import TEXT_SEARCH_CONFIG, trigram_index
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Listado público (GET /products/): solo activos, paginado por (orden, id)
+        Index("ix_products_active_name_id", "name", "id", postgresql_where=text("is_active")),
+        Index("ix_products_active_price_id", "price", "id", postgresql_where=text("is_active")),
+        Index("ix_products_active_stock_id", "stock", "id", postgresql_where=text("is_active")),
+        # Búsqueda de texto completo (GET /products/search)
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)
+    sku = Column(String(64), unique=True, index=True)  # SKU o código de barras
     description = Column(String)
     price = Column(Float, nullable=False)
     cost_price = Column(Float, nullable=False)
@@ -17,7 +28,17 @@ class Product(Base):
     image_url = Column(String)
     is_active = Column(Boolean, default=True)
     created_at = Column(TIMESTAMP, nullable=False)
+    # Nombre (peso A) y descripción (peso B); la calcula Postgres, no se carga con el producto
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+        persisted=True
+    )))
     
     # Relaciones
     sales = relationship("Sales", back_populates="product")
-    earnings = relationship("Earnings", back_populates="product")
\ No newline at end of file
+    earnings = relationship("Earnings", back_populates="product")
+
+
+# Tolerancia a errores de tipeo en el nombre
+trigram_index(Product.__table__, "ix_products_name_trgm", "name")
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, BigInteger
+from app.db.base import Base
+from sqlalchemy.sql.sqltypes import TIMESTAMP
+
+
+class ProductImage(Base):
+    """
+    Imagen subida, guardada bajo el SHA-256 de su contenido.
+
+    Subir dos veces el mismo archivo (o el mismo para varios productos) reusa
+    el archivo y sus variantes. `ref_count` es el número de productos cuyo
+    `image_url` apunta a ella; solo con 0 se pueden borrar sus archivos.
+    """
+    __tablename__ = "product_images"
+
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 hex del original
+    extension = Column(String(8), nullable=False)  # Detectada por magic bytes: .jpg, .png o .webp
+    size_bytes = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(TIMESTAMP, nullable=False)
+    released_at = Column(TIMESTAMP)  # Cuando ref_count llegó a 0 por última vez
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Enum, Integer, Text, Float, ForeignKey
+from sqlalchemy import Column, Enum, Index, Integer, Text, Float, ForeignKey
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from sqlalchemy.sql.sqltypes import Date, TIMESTAMP
@@ -6,6 +6,12 @@ from sqlalchemy.sql.sqltypes import Date, TIMESTAMP
 
 class Sales(Base):
     __tablename__ = "sales"
+    __table_args__ = (
+        # Listados de ventas: más recientes primero, con o sin filtro de estado/vendedor
+        Index("ix_sales_created_at_id", "created_at", "id"),
+        Index("ix_sales_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_sales_seller_id_created_at_id", "seller_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
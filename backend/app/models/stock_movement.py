@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Index, Integer, String, ForeignKey
+from app.db.base import Base
+from sqlalchemy.sql.sqltypes import TIMESTAMP
+
+
+class StockMovement(Base):
+    """
+    Cambio de stock hecho a mano (conteo de inventario o ajuste de un admin).
+
+    Las ventas y cancelaciones no se registran aquí: la venta misma es su
+    registro. `change` es `new_stock - previous_stock`.
+    """
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        # Historial de un producto, del más reciente al más viejo
+        Index("ix_stock_movements_product_id_created_at", "product_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"))  # Quién hizo el ajuste
+    previous_stock = Column(Integer, nullable=False)
+    new_stock = Column(Integer, nullable=False)
+    change = Column(Integer, nullable=False)
+    reason = Column(String(200))  # Ej. "Conteo físico marzo", "Merma"
+    created_at = Column(TIMESTAMP, nullable=False)
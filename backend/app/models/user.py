@@ -1,5 +1,6 @@
 from sqlalchemy import Column, Integer, String, Boolean
 from app.db.base import Base
+from app.db.search import trigram_index
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 
 
@@ -13,4 +14,9 @@ class User(Base):
     full_name = Column(String)
     is_active = Column(Boolean, default=True)
     created_at = Column(TIMESTAMP, nullable=False)
-    role = Column(String, default="user")
\ No newline at end of file
+    role = Column(String, default="user")
+
+
+# Búsqueda de usuarios por fragmento (ILIKE '%texto%') y similitud
+trigram_index(User.__table__, "ix_users_username_trgm", "username")
+trigram_index(User.__table__, "ix_users_email_trgm", "email")
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class DeviceKeyCreate(BaseModel):
+    """Schema para registrar una terminal POS"""
+    name: str = Field(..., min_length=1, max_length=100, description="Nombre de la terminal (ej. 'Caja 1')")
+    user_id: int = Field(..., gt=0, description="ID del usuario en cuyo nombre opera la terminal")
+
+
+class DeviceKey(BaseModel):
+    """Schema de respuesta - nunca incluye la llave ni su hash"""
+    id: int
+    name: str
+    key_prefix: str
+    user_id: int
+    is_active: bool
+    created_at: datetime
+    last_used_at: Optional[datetime] = None
+    revoked_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class DeviceKeyCreated(DeviceKey):
+    """Respuesta al crear la terminal: incluye la llave en texto plano (solo esta vez)"""
+    api_key: str = Field(..., description="Llave completa. Guárdala, no se vuelve a mostrar")
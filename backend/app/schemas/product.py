@@ -1,11 +1,19 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import Optional
+from pydantic import BaseModel, Field, computed_field, field_validator, model_validator
+from typing import Dict, List, Optional
 from datetime import datetime
+from app.core.images import variant_urls
+
+# Letras, dígitos y . _ - (lo que emiten los lectores de códigos de barras y los SKU habituales)
+SKU_PATTERN = r"^[A-Za-z0-9._-]+$"
+
+# products.stock es INTEGER en PostgreSQL
+MAX_STOCK = 2_147_483_647
 
 
 class ProductBase(BaseModel):
     """Schema base con los campos comunes de Product"""
     name: str = Field(..., description="Nombre del producto")
+    sku: Optional[str] = Field(None, min_length=1, max_length=64, pattern=SKU_PATTERN, description="SKU o código de barras (único)")
     description: Optional[str] = Field(None, description="Descripción del producto")
     cost_price: float = Field(..., gt=0, description="Precio de costo/inversión")
     price: Optional[float] = Field(None, gt=0, description="Precio de venta (se calcula automáticamente si no se proporciona)")
@@ -40,6 +48,7 @@ class ProductUpdate(BaseModel):
     """Schema para actualizar un producto (PUT/PATCH request)
     Todos los campos son opcionales"""
     name: Optional[str] = Field(None, description="Nombre del producto")
+    sku: Optional[str] = Field(None, min_length=1, max_length=64, pattern=SKU_PATTERN, description="SKU o código de barras (único)")
     description: Optional[str] = Field(None, description="Descripción del producto")
     cost_price: Optional[float] = Field(None, gt=0, description="Precio de costo/inversión")
     price: Optional[float] = Field(None, gt=0, description="Precio de venta")
@@ -60,7 +69,84 @@ class ProductInDB(ProductBase):
         from_attributes = True  # Permite crear desde ORM models
 
 
+class ImageVariant(BaseModel):
+    """Una variante redimensionada de la imagen del producto"""
+    size: int = Field(..., description="Lado mayor máximo en píxeles")
+    webp: str = Field(..., description="URL en WebP")
+    jpeg: str = Field(..., description="URL en JPEG (navegadores sin WebP)")
+
+
 class Product(ProductInDB):
     """Schema de respuesta (GET request)
-    Es el mismo que ProductInDB en este caso"""
-    pass
+    Agrega las URLs de las variantes de la imagen"""
+    
+    @computed_field(description="Variantes thumb, card y detail (None sin imagen subida)")
+    @property
+    def image_variants(self) -> Optional[Dict[str, ImageVariant]]:
+        variants = variant_urls(self.image_url)
+        if variants is None:
+            return None
+        return {name: ImageVariant(**variant) for name, variant in variants.items()}
+
+
+class ProductCodeMatch(BaseModel):
+    """Producto encontrado por código (lo que la caja necesita para agregarlo a la venta)"""
+    id: int
+    sku: str
+    name: str
+    price: float
+    
+    class Config:
+        from_attributes = True
+
+
+class ProductCodeAssignment(BaseModel):
+    """Asignación de código a un producto (null lo quita)"""
+    product_id: int
+    sku: Optional[str] = Field(None, min_length=1, max_length=64, pattern=SKU_PATTERN)
+
+
+class ProductCodeAssignmentResult(BaseModel):
+    updated: int = Field(..., description="Productos cuyo código se asignó o quitó")
+
+
+class ProductImportError(BaseModel):
+    line: int = Field(..., description="Línea del archivo (el encabezado es la 1)")
+    name: Optional[str] = None
+    sku: Optional[str] = None
+    error: str
+
+
+class ProductImportReport(BaseModel):
+    """Resultado de POST /products/import"""
+    rows: int
+    inserted: int
+    updated: int
+    error_count: int
+    errors: List[ProductImportError] = Field(..., description="Las primeras 1000 filas con errores (no se importaron)")
+    dry_run: bool
+
+
+class StockAdjustment(BaseModel):
+    """Ajuste de stock de un producto: cantidad absoluta (`stock`) o relativa (`delta`)"""
+    product_id: int
+    stock: Optional[int] = Field(None, ge=0, le=MAX_STOCK, description="Nueva cantidad (conteo físico)")
+    delta: Optional[int] = Field(None, ge=-MAX_STOCK, le=MAX_STOCK, description="Cantidad a sumar (negativa para restar)")
+    
+    @model_validator(mode='after')
+    def validate_one_value(self):
+        if (self.stock is None) == (self.delta is None):
+            raise ValueError('Indica exactamente uno de stock o delta')
+        return self
+
+
+class StockAdjustmentBatch(BaseModel):
+    """Cuerpo de PATCH /products/stock"""
+    adjustments: List[StockAdjustment] = Field(..., min_length=1, max_length=5000)
+    reason: Optional[str] = Field(None, max_length=200, description="Motivo, queda en el historial")
+
+
+class StockLevel(BaseModel):
+    product_id: int
+    previous_stock: int
+    stock: int
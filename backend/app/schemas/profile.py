@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+
+class ProfileInfo(BaseModel):
+    """Metadatos de un perfil guardado"""
+    id: str
+    method: str
+    path: str
+    route: str = Field(..., description="Plantilla de la ruta perfilada")
+    status_code: int
+    duration_ms: float
+    samples: int = Field(..., description="Muestras tomadas por el profiler")
+    username: str = Field(..., description="Admin que pidió el perfil")
+    created_at: datetime
@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List
+
+
+class SlowQuery(BaseModel):
+    """Sentencia lenta agregada por ruta de origen y fingerprint"""
+    id: str
+    route: str = Field(..., description="Plantilla de la ruta que la ejecutó ('background' fuera de un request)")
+    fingerprint: str = Field(..., description="SQL normalizado (literales y parámetros como ?)")
+    count: int = Field(..., description="Ocurrencias sobre el umbral")
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+    first_seen: datetime
+    last_seen: datetime
+    plans_captured: int
+
+
+class SlowQueryPlan(BaseModel):
+    """Plan capturado para una ocurrencia"""
+    captured_at: datetime
+    duration_ms: float = Field(..., description="Duración de la ocurrencia original")
+    statement: str = Field(..., description="Sentencia tal como se envió al driver")
+    plan: str = Field(..., description="Salida de EXPLAIN (ANALYZE, BUFFERS) o EXPLAIN")
+
+
+class SlowQueryDetail(SlowQuery):
+    """Sentencia lenta con sus planes"""
+    plans: List[SlowQueryPlan]
@@ -54,6 +54,15 @@ class User(UserBase):
         from_attributes = True
 
 
+class UserSession(BaseModel):
+    """Sesión activa de un usuario en Redis"""
+    session_id: str
+    user_id: int
+    username: str
+    role: str
+    expires_in: int = Field(..., description="Segundos restantes antes de expirar")
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
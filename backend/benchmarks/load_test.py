@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+"""
+Prueba de carga de extremo a extremo con escenarios del punto de venta.
+
+Usuarios virtuales (asyncio + httpx) ejecutan escenarios ponderados contra la
+app corriendo en local (PostgreSQL y Redis locales, sin servicios externos):
+
+- checkout: cobro en caja -> catálogo, venta con pago parcial y pago del resto
+- storefront: navegación pública -> listado paginado, detalle e imagen del producto
+- dashboard: panel de admin -> todos los /earnings/* y /sales/ con filtros
+
+Reporta por endpoint (plantilla de ruta): requests, throughput, p50/p95/p99,
+errores y tasa de error, en un JSON estable (llaves ordenadas) para poder
+hacer diff entre commits.
+
+Datos: cargar antes un dataset (python -m app.db.dataset) y los usuarios de
+seed.py; los escenarios usan admin/Admin123 por defecto.
+
+Uso:
+    python benchmarks/load_test.py --users 20 --duration 60 --output load.json
+    python benchmarks/load_test.py --spawn --workers 4 --mix checkout=6,storefront=3,dashboard=1
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+API = "/api/v1"
+SALE_STATUSES = ["PENDING", "PARTIAL", "COMPLETED", "CANCELLED"]
+PERIODS = ["day", "week", "month", "year"]
+
+
+class Recorder:
+    """Latencias y errores por endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.status_codes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.sample_errors: Dict[str, str] = {}
+
+    def record(self, name: str, elapsed: float, status_code: Optional[int], detail: str = "") -> None:
+        self.latencies[name].append(elapsed)
+        self.status_codes[name][str(status_code) if status_code else "exception"] += 1
+        if status_code is None or status_code >= 400:
+            self.errors[name] += 1
+            # El primer error de cada endpoint, para diagnosticar sin re-ejecutar
+            self.sample_errors.setdefault(name, detail[:300])
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+class VirtualUser:
+    """Un cliente que repite escenarios hasta que se acaba el tiempo"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, token: str):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    async def call(self, method: str, name: str, url: str, auth: bool = True, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers if auth else None, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(f"{method} {name}", time.perf_counter() - started, None, repr(e))
+            return None
+        self.recorder.record(
+            f"{method} {name}", time.perf_counter() - started, response.status_code,
+            response.text if response.status_code >= 400 else ""
+        )
+        return response
+
+    async def checkout(self) -> None:
+        """Caja: elegir producto con stock y vendedor, cobrar en dos pagos"""
+        products = await self.call("GET", f"{API}/products/", f"{API}/products/", auth=False,
+                                   params={"skip": self.rng.randrange(0, 200), "limit": 50})
+        sellers = await self.call("GET", f"{API}/sellers/", f"{API}/sellers/", auth=False, params={"limit": 50})
+        if products is None or sellers is None or products.status_code != 200 or sellers.status_code != 200:
+            return
+        candidates = [p for p in products.json() if p["is_active"] and p["stock"] > 0]
+        active_sellers = [s for s in sellers.json() if s["is_active"]]
+        if not candidates or not active_sellers:
+            return
+
+        product = self.rng.choice(candidates)
+        quantity = min(product["stock"], self.rng.randint(1, 3))
+        subtotal = round(product["price"] * quantity, 2)
+        pay_now = round(subtotal * self.rng.choice([1.0, 1.0, 1.0, 0.5]), 2)
+        sale = await self.call("POST", f"{API}/sales/", f"{API}/sales/", json={
+            "product_id": product["id"],
+            "seller_id": self.rng.choice(active_sellers)["id"],
+            "quantity": quantity,
+            "subtotal": subtotal,
+            "payment_method": self.rng.choice(["CASH", "CARD", "TRANSFER"]),
+            "amount_paid": pay_now,
+        })
+        if sale is None or sale.status_code != 201:
+            return
+        body = sale.json()
+        if body["status"] == "PARTIAL":
+            await self.call("PATCH", f"{API}/sales/{{sale_id}}/payment", f"{API}/sales/{body['id']}/payment",
+                            json={"amount": body["amount_remaining"]})
+
+    async def storefront(self) -> None:
+        """Tienda pública: listado paginado, detalle e imagen"""
+        listing = await self.call("GET", f"{API}/products/", f"{API}/products/", auth=False,
+                                  params={"skip": self.rng.randrange(0, 500), "limit": 24})
+        if listing is None or listing.status_code != 200 or not listing.json():
+            return
+        for product in self.rng.sample(listing.json(), min(3, len(listing.json()))):
+            detail = await self.call("GET", f"{API}/products/{{product_id}}",
+                                     f"{API}/products/{product['id']}", auth=False)
+            if detail is not None and detail.status_code == 200 and detail.json().get("image_url"):
+                await self.call("GET", "/uploads/products/{file}", detail.json()["image_url"], auth=False)
+
+    async def dashboard(self) -> None:
+        """Panel de admin: resumen de ganancias y ventas filtradas"""
+        start = datetime(2024, 1, 1) + timedelta(days=self.rng.randrange(0, 600))
+        end = start + timedelta(days=self.rng.choice([7, 30, 90]))
+        await self.call("GET", f"{API}/earnings/summary", f"{API}/earnings/summary")
+        await self.call("GET", f"{API}/earnings/by-product", f"{API}/earnings/by-product",
+                        params={"order_by": self.rng.choice(["profit", "quantity", "margin"])})
+        await self.call("GET", f"{API}/earnings/by-period", f"{API}/earnings/by-period",
+                        params={"period": self.rng.choice(PERIODS),
+                                "start_date": start.isoformat(), "end_date": end.isoformat()})
+        await self.call("GET", f"{API}/earnings/by-seller", f"{API}/earnings/by-seller")
+        await self.call("GET", f"{API}/earnings/investments", f"{API}/earnings/investments")
+        await self.call("GET", f"{API}/sales/", f"{API}/sales/", params={
+            "status": self.rng.choice(SALE_STATUSES),
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "limit": 50,
+        })
+        await self.call("GET", f"{API}/sales/", f"{API}/sales/", params={
+            "seller_id": self.rng.randint(1, 50), "limit": 50
+        })
+
+
+async def login(client: httpx.AsyncClient, recorder: Recorder, username: str, password: str) -> str:
+    started = time.perf_counter()
+    response = await client.post(f"{API}/auth/login", data={"username": username, "password": password})
+    recorder.record(f"POST {API}/auth/login", time.perf_counter() - started, response.status_code)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_user(index: int, args, recorder: Recorder, mix: Dict[str, float], deadline: float) -> None:
+    rng = random.Random(f"{args.seed}:{index}")
+    # Arranque escalonado durante --ramp-up
+    await asyncio.sleep(args.ramp_up * index / max(args.users, 1))
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        user = VirtualUser(client, recorder, rng, await login(client, recorder, args.username, args.password))
+        scenarios = list(mix)
+        weights = [mix[name] for name in scenarios]
+        while time.perf_counter() < deadline:
+            await getattr(user, rng.choices(scenarios, weights=weights)[0])()
+            if args.think_time:
+                await asyncio.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+def build_report(recorder: Recorder, elapsed: float, args, mix: Dict[str, float]) -> dict:
+    endpoints = {}
+    for name, samples in recorder.latencies.items():
+        ordered = sorted(samples)
+        endpoints[name] = {
+            "requests": len(ordered),
+            "throughput_rps": round(len(ordered) / elapsed, 2),
+            "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 1),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+            "errors": recorder.errors.get(name, 0),
+            "error_rate": round(recorder.errors.get(name, 0) / len(ordered), 4),
+            "status_codes": dict(recorder.status_codes[name]),
+            "sample_error": recorder.sample_errors.get(name),
+        }
+    total_requests = sum(e["requests"] for e in endpoints.values())
+    total_errors = sum(e["errors"] for e in endpoints.values())
+    all_samples = sorted(s for samples in recorder.latencies.values() for s in samples)
+    return {
+        "config": {
+            "base_url": args.base_url,
+            "users": args.users,
+            "duration_s": args.duration,
+            "think_time_s": args.think_time,
+            "mix": mix,
+            "seed": args.seed,
+            "commit": _git_commit(),
+        },
+        "totals": {
+            "requests": total_requests,
+            "throughput_rps": round(total_requests / elapsed, 2),
+            "p50_ms": round(percentile(all_samples, 50) * 1000, 1),
+            "p95_ms": round(percentile(all_samples, 95) * 1000, 1),
+            "p99_ms": round(percentile(all_samples, 99) * 1000, 1),
+            "errors": total_errors,
+            "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+        },
+        "endpoints": endpoints,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(report: dict) -> None:
+    print(f"\n{'endpoint':<48} {'reqs':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err%':>6}")
+    for name, stats in sorted(report["endpoints"].items()):
+        print(f"{name:<48} {stats['requests']:>7} {stats['throughput_rps']:>8.1f} {stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['error_rate'] * 100:>6.2f}")
+    totals = report["totals"]
+    print(f"{'TOTAL':<48} {totals['requests']:>7} {totals['throughput_rps']:>8.1f} {totals['p50_ms']:>8.1f} "
+          f"{totals['p95_ms']:>8.1f} {totals['p99_ms']:>8.1f} {totals['error_rate'] * 100:>6.2f}")
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("checkout", "storefront", "dashboard"):
+            raise argparse.ArgumentTypeError(f"Escenario desconocido: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def spawn_server(port: int, workers: int) -> subprocess.Popen:
+    """Levanta uvicorn y espera a /health/ready"""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR
+    )
+    started = time.perf_counter()
+    while time.perf_counter() - started < 60:
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn terminó antes de estar listo")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health/ready", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise TimeoutError("La app no respondió /health/ready en 60 s")
+
+
+async def run(args, mix: Dict[str, float]) -> dict:
+    recorder = Recorder()
+    started = time.perf_counter()
+    deadline = started + args.ramp_up + args.duration
+    await asyncio.gather(*(run_user(i, args, recorder, mix, deadline) for i in range(args.users)))
+    return build_report(recorder, time.perf_counter() - started, args, mix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga con escenarios de caja, tienda y panel")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=20, help="Usuarios virtuales concurrentes")
+    parser.add_argument("--duration", type=float, default=60, help="Segundos de carga (sin contar ramp-up)")
+    parser.add_argument("--ramp-up", type=float, default=5)
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pausa media entre escenarios (s)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("checkout=5,storefront=3,dashboard=2"))
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="Admin123")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--spawn", action="store_true", help="Levantar uvicorn local en --port")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", help="Guardar el reporte en un archivo JSON")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        args.base_url = f"http://127.0.0.1:{args.port}"
+        server = spawn_server(args.port, args.workers)
+    try:
+        report = asyncio.run(run(args, args.mix))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print_table(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark en proceso de los endpoints de lectura.
+
+Ejecuta la app FastAPI a través de `httpx.ASGITransport` (sin red ni uvicorn)
+contra una base ya poblada, y mide por endpoint la latencia (p50/p95/media) y
+las queries SQL por request. Cada endpoint corre hasta `--iterations`
+iteraciones o `--time-per-endpoint` segundos, lo que ocurra primero, para que
+la corrida completa tome menos de un minuto.
+
+Con `--baseline` compara contra un JSON guardado y termina con código 1 si el
+p50 de algún endpoint empeora más de `--threshold` % o si sube su número de
+queries.
+
+Uso:
+    python benchmarks/micro.py --load-dataset --save-baseline baseline.json   # en main
+    python benchmarks/micro.py --baseline baseline.json --threshold 15        # en la rama
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("PREWARM_CONNECTIONS", "false")
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.db.database import SessionLocal, configure_engine, get_engine  # noqa: E402
+from app.db.seeders import create_admin_user  # noqa: E402
+
+API = settings.API_V1_STR
+
+# (nombre, url) - solo endpoints idempotentes, se repiten miles de veces
+ENDPOINTS = [
+    ("GET /products/", f"{API}/products/?limit=50"),
+    ("GET /products/{product_id}", f"{API}/products/1"),
+    ("GET /products/search", f"{API}/products/search?q=monitor%20lg"),
+    ("GET /sellers/", f"{API}/sellers/?limit=50"),
+    ("GET /sellers/{seller_id}", f"{API}/sellers/1"),
+    ("GET /sellers/{seller_id}/sales", f"{API}/sellers/1/sales"),
+    ("GET /sales/", f"{API}/sales/?limit=50"),
+    ("GET /sales/?status", f"{API}/sales/?status=PENDING&limit=50"),
+    ("GET /sales/{sale_id}", f"{API}/sales/1"),
+    ("GET /users/me", f"{API}/users/me"),
+    ("GET /earnings/{sale_id}", f"{API}/earnings/1"),
+    ("GET /earnings/investments", f"{API}/earnings/investments"),
+    ("GET /earnings/summary", f"{API}/earnings/summary"),
+    ("GET /earnings/by-product", f"{API}/earnings/by-product"),
+    ("GET /earnings/by-period", f"{API}/earnings/by-period?period=month"),
+    ("GET /earnings/by-seller", f"{API}/earnings/by-seller"),
+]
+
+# Dataset pequeño y fijo para --load-dataset (mismo resultado en cada máquina)
+DATASET = {"products": 500, "sellers": 20, "sales": 50_000, "investments": 100}
+
+
+class QueryCounter:
+    """Cuenta sentencias SQL ejecutadas por el engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+async def bench_endpoint(client: httpx.AsyncClient, counter: QueryCounter, url: str,
+                         headers: dict, iterations: int, time_budget: float, warmup: int) -> dict:
+    for _ in range(warmup):
+        await client.get(url, headers=headers)
+
+    samples = []
+    queries = []
+    errors = 0
+    deadline = time.perf_counter() + time_budget
+    while len(samples) < iterations and time.perf_counter() < deadline:
+        before = counter.count
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        samples.append(time.perf_counter() - started)
+        queries.append(counter.count - before)
+        if response.status_code >= 400:
+            errors += 1
+
+    samples.sort()
+    return {
+        "iterations": len(samples),
+        "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "queries": max(queries),
+        "errors": errors,
+    }
+
+
+async def run(args, counter: QueryCounter) -> Dict[str, dict]:
+    from main import app
+
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': args.username})}"}
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, url in ENDPOINTS:
+            if args.only and args.only not in name:
+                continue
+            results[name] = await bench_endpoint(
+                client, counter, url, headers, args.iterations, args.time_per_endpoint, args.warmup
+            )
+            stats = results[name]
+            print(f"{name:<34} {stats['iterations']:>6} it  p50 {stats['p50_ms']:>8.2f} ms  "
+                  f"p95 {stats['p95_ms']:>8.2f} ms  {stats['queries']:>3} queries"
+                  + (f"  {stats['errors']} errores" if stats["errors"] else ""))
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Lista de regresiones respecto al baseline"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        limit = previous["p50_ms"] * (1 + threshold / 100)
+        if current["p50_ms"] > limit:
+            change = (current["p50_ms"] / previous["p50_ms"] - 1) * 100
+            regressions.append(
+                f"{name}: p50 {previous['p50_ms']:.2f} -> {current['p50_ms']:.2f} ms (+{change:.0f}%, límite {threshold:.0f}%)"
+            )
+        if current["queries"] > previous["queries"]:
+            regressions.append(f"{name}: queries {previous['queries']} -> {current['queries']}")
+        if current["errors"] and not previous.get("errors"):
+            regressions.append(f"{name}: {current['errors']} respuestas con error")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark en proceso con umbral de regresión")
+    parser.add_argument("--database-url", help="Por defecto, DATABASE_URL de la configuración")
+    parser.add_argument("--load-dataset", action="store_true",
+                        help=f"Vaciar y cargar el dataset fijo de benchmark {DATASET}")
+    parser.add_argument("--iterations", type=int, default=2000, help="Máximo de iteraciones por endpoint")
+    parser.add_argument("--time-per-endpoint", type=float, default=2.5, help="Segundos máximos por endpoint")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--only", help="Solo endpoints cuyo nombre contenga este texto")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Regresión máxima de p50 en %%")
+    parser.add_argument("--save-baseline", help="Guardar los resultados como nuevo baseline")
+    parser.add_argument("--output", help="Guardar los resultados en un archivo JSON")
+    args = parser.parse_args(argv)
+
+    # El log de requests sobre presupuesto saldría miles de veces
+    logging.getLogger("app.core.middleware").setLevel(logging.ERROR)
+
+    if args.database_url:
+        configure_engine(create_engine(args.database_url))
+    engine = get_engine()
+
+    if args.load_dataset:
+        from app.db.dataset import DatasetConfig, load_dataset
+        print(f"Cargando dataset de benchmark {DATASET}...")
+        load_dataset(engine, DatasetConfig(**DATASET), truncate=True)
+
+    db = SessionLocal()
+    try:
+        create_admin_user(db)
+    finally:
+        db.close()
+
+    counter = QueryCounter(engine)
+    started = time.perf_counter()
+    results = asyncio.run(run(args, counter))
+    print(f"\nTotal: {time.perf_counter() - started:.1f} s")
+
+    report = json.dumps(results, indent=2, sort_keys=True) + "\n"
+    if args.output:
+        Path(args.output).write_text(report)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(report)
+        print(f"Baseline guardado en {args.save_baseline}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        if regressions:
+            print("\n❌ Regresiones respecto al baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\n✅ Sin regresiones (umbral {args.threshold:.0f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
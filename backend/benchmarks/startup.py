@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Benchmark de arranque del backend.
+
+Mide, en procesos nuevos (en frío):
+- import_ms: tiempo de `import main` (sin servir nada)
+- first_response_ms: desde lanzar uvicorn hasta la primera respuesta 200 de /health
+  (incluye el lifespan: creación y pre-calentado de pools)
+
+Uso:
+    python benchmarks/startup.py [--runs 5] [--port 8765] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import main; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def measure_import() -> float:
+    """Tiempo de importar `main` en un intérprete nuevo, en ms"""
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure_first_response(port: int, timeout: float = 30.0) -> float:
+    """Tiempo desde lanzar uvicorn hasta el primer 200 en /health, en ms"""
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError("uvicorn terminó antes de responder")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"Sin respuesta de {url} en {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def summarize(samples):
+    return {
+        "runs": len(samples),
+        "min_ms": round(min(samples), 1),
+        "median_ms": round(statistics.median(samples), 1),
+        "max_ms": round(max(samples), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Guardar resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    import_samples = [measure_import() for _ in range(args.runs)]
+    response_samples = [measure_first_response(args.port) for _ in range(args.runs)]
+
+    results = {
+        "import": summarize(import_samples),
+        "cold_start_to_first_response": summarize(response_samples),
+        "prewarm": os.environ.get("PREWARM_CONNECTIONS", "true")
+    }
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""
+Latencia de la API con descargas concurrentes de imágenes, por modo de servir /uploads.
+
+Crea imágenes de prueba en uploads/products/, levanta uvicorn una vez por
+modo (UPLOADS_SERVE_MODE=app y x-accel) y, durante --duration segundos:
+
+- --image-clients clientes descargan imágenes al azar sin pausa,
+- --api-clients clientes llaman /api/v1/products/ y /health y miden latencia.
+
+Reporta por modo p50/p95/p99 de la API, requests de imágenes por segundo y
+MB entregados. Sin nginx delante, en modo x-accel los workers solo responden
+la redirección (0 bytes): la comparación mide cuánto trabajo le quita al
+worker servir los archivos, que es lo que compite con la API. Para medir la
+entrega completa, correr contra el nginx del frontend con --base-url.
+
+Uso:
+    python benchmarks/static_offload.py --duration 20 --output offload.json
+    python benchmarks/static_offload.py --base-url http://localhost:8080 --modes x-accel
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PRODUCTS_DIR = BACKEND_DIR / "uploads" / "products"
+API_PATHS = ["/api/v1/products/?limit=20", "/health"]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def create_images(count: int, size_kb: int) -> List[Path]:
+    """Archivos JPEG de prueba (magic bytes y datos al azar) con nombre por contenido"""
+    PRODUCTS_DIR.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for _ in range(count):
+        content = b"\xff\xd8\xff\xe0" + os.urandom(size_kb * 1024 - 4)
+        path = PRODUCTS_DIR / f"{hashlib.sha256(content).hexdigest()}.jpg"
+        path.write_bytes(content)
+        paths.append(path)
+    return paths
+
+
+def spawn_server(port: int, workers: int, mode: str) -> subprocess.Popen:
+    """Levanta uvicorn con el modo pedido y espera a /health/ready"""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, "UPLOADS_SERVE_MODE": mode}
+    )
+    started = time.perf_counter()
+    while time.perf_counter() - started < 60:
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn terminó antes de estar listo")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health/ready", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise TimeoutError("La app no respondió /health/ready en 60 s")
+
+
+async def image_client(client: httpx.AsyncClient, urls: List[str], deadline: float, rng: random.Random,
+                       totals: Dict[str, int]) -> None:
+    while time.perf_counter() < deadline:
+        try:
+            async with client.stream("GET", rng.choice(urls)) as response:
+                async for chunk in response.aiter_bytes():
+                    totals["bytes"] += len(chunk)
+                totals["requests"] += 1
+                if response.status_code != 200:
+                    totals["errors"] += 1
+        except httpx.HTTPError:
+            totals["errors"] += 1
+
+
+async def api_client(client: httpx.AsyncClient, deadline: float, rng: random.Random,
+                     latencies: List[float], errors: List[int]) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get(rng.choice(API_PATHS))
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError:
+            errors.append(0)
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+
+
+async def measure(base_url: str, image_urls: List[str], args) -> dict:
+    rng = random.Random(args.seed)
+    totals = {"requests": 0, "bytes": 0, "errors": 0}
+    latencies: List[float] = []
+    errors: List[int] = []
+    limits = httpx.Limits(max_connections=args.image_clients + args.api_clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        # Calentar conexiones y caches antes de medir
+        await asyncio.gather(*(client.get(url) for url in image_urls[:args.image_clients]))
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(
+            *(image_client(client, image_urls, deadline, rng, totals) for _ in range(args.image_clients)),
+            *(api_client(client, deadline, rng, latencies, errors) for _ in range(args.api_clients)),
+        )
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "api": {
+            "requests": len(latencies),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "errors": len(errors),
+        },
+        "images": {
+            "requests": totals["requests"],
+            "throughput_rps": round(totals["requests"] / elapsed, 1),
+            "mb_delivered": round(totals["bytes"] / (1024 * 1024), 1),
+            "errors": totals["errors"],
+        },
+    }
+
+
+def print_table(results: Dict[str, dict]) -> None:
+    print(f"\n{'modo':<10} {'api p50':>9} {'api p95':>9} {'api p99':>9} {'api reqs':>9} {'img rps':>9} {'img MB':>9}")
+    for mode, result in results.items():
+        api, images = result["api"], result["images"]
+        print(f"{mode:<10} {api['p50_ms']:>9.1f} {api['p95_ms']:>9.1f} {api['p99_ms']:>9.1f} "
+              f"{api['requests']:>9} {images['throughput_rps']:>9.1f} {images['mb_delivered']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de la API con carga de imágenes por modo de /uploads")
+    parser.add_argument("--modes", default="app,x-accel", help="Modos a comparar (UPLOADS_SERVE_MODE)")
+    parser.add_argument("--base-url", help="Medir una app ya corriendo (p. ej. detrás de nginx) en vez de levantarla")
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--image-size-kb", type=int, default=512)
+    parser.add_argument("--image-clients", type=int, default=32, help="Descargas de imágenes concurrentes")
+    parser.add_argument("--api-clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", help="Guardar el reporte en un archivo JSON")
+    args = parser.parse_args()
+
+    images = create_images(args.images, args.image_size_kb)
+    image_urls = [f"/uploads/products/{path.name}" for path in images]
+    results: Dict[str, dict] = {}
+    try:
+        for mode in args.modes.split(","):
+            server: Optional[subprocess.Popen] = None
+            base_url = args.base_url
+            if base_url is None:
+                base_url = f"http://127.0.0.1:{args.port}"
+                server = spawn_server(args.port, args.workers, mode)
+            try:
+                results[mode] = asyncio.run(measure(base_url, image_urls, args))
+            finally:
+                if server is not None:
+                    server.terminate()
+                    server.wait()
+    finally:
+        for path in images:
+            path.unlink(missing_ok=True)
+
+    print_table(results)
+    if args.output:
+        report = {
+            "config": {key: getattr(args, key) for key in
+                       ("images", "image_size_kb", "image_clients", "api_clients", "duration", "workers")},
+            "modes": results,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+
+
+if __name__ == "__main__":
+    main()
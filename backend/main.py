@@ -1,19 +1,41 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from app.api.v1.api import api_router
 from app.core.config import settings
-from app.db.database import engine
-from app.db.base import Base
+from app.core import lifecycle
+from app.core.health import check_readiness
+from app.core.loop_monitor import loop_monitor
+from app.core.metrics import render_metrics
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.middleware import MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.request_limits import RequestSizeLimitMiddleware
+from app.core.static_files import UploadsStaticFiles
 import os
 
 # NO crear tablas aquí - usar Alembic en producción
-# Base.metadata.create_all(bind=engine)
+# Base.metadata.create_all(bind=get_engine())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tamaño del thread pool y monitor de saturación (deben correr dentro del loop)
+    loop_monitor.start()
+    # Crear y pre-calentar pools antes de que el worker acepte requests
+    await run_in_threadpool(lifecycle.startup)
+    yield
+    await loop_monitor.stop()
+    await run_in_threadpool(lifecycle.shutdown)
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
-    redirect_slashes=False
+    redirect_slashes=False,
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -23,15 +45,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Cortar cuerpos más grandes que MAX_UPLOAD_SIZE_MB antes de leerlos completos
+app.add_middleware(RequestSizeLimitMiddleware)
+
+# Perfilado bajo demanda (X-Profile: 1 de un admin); sin el flag no agrega trabajo
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, root_app=app)
+
+# Métricas Prometheus por ruta (latencia, conteo, en curso, DB y Redis)
+app.add_middleware(MetricsMiddleware, root_app=app)
+
 # Crear directorio de uploads si no existe
 UPLOADS_DIR = "uploads"
 PRODUCTS_UPLOAD_DIR = os.path.join(UPLOADS_DIR, "products")
 os.makedirs(PRODUCTS_UPLOAD_DIR, exist_ok=True)
 
-# Montar archivos estáticos para servir imágenes
-app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
+# Montar archivos estáticos para servir imágenes (inmutables si su nombre es el hash del contenido)
+app.mount("/uploads", UploadsStaticFiles(directory=UPLOADS_DIR), name="uploads")
 
 # Incluir routers
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -45,3 +78,22 @@ def read_root():
 @app.api_route("/health", methods=["GET", "HEAD"])
 def health_check():
     return {"status": "healthy"}
+
+
+@app.api_route("/health/ready", methods=["GET", "HEAD"])
+async def readiness_check():
+    """
+    Readiness: ejecuta SELECT 1 y PING a Redis con timeouts cortos y reporta
+    latencias, espera y uso del pool y cola del thread pool. 503 si algo falla
+    o si los checkouts del pool esperan más de HEALTH_POOL_CHECKOUT_WAIT_MS.
+    """
+    result = await check_readiness()
+    status_code = 200 if result["status"] == "ready" else 503
+    return JSONResponse(content=result, status_code=status_code)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Métricas Prometheus agregadas de todos los workers"""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
@@ -0,0 +1,174 @@
+"""
+Fixtures compartidas: PostgreSQL efímero, app real y datos de prueba.
+
+La base de datos se toma de TEST_DATABASE_URL si está definida; si no, se
+levanta un PostgreSQL temporal con `pgserver` (pip install -r requirements-dev.txt).
+Sin ninguno de los dos, los tests que necesitan base de datos se saltan.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import create_engine, text
+
+# Variables mínimas para poder importar la app sin un .env
+os.environ.setdefault("PROJECT_NAME", "Punto de Venta (tests)")
+os.environ.setdefault("API_V1_STR", "/api/v1")
+os.environ.setdefault("POSTGRES_SERVER", "localhost")
+os.environ.setdefault("POSTGRES_USER", "postgres")
+os.environ.setdefault("POSTGRES_PASSWORD", "postgres-tests")
+os.environ.setdefault("POSTGRES_DB", "punto_venta_test")
+os.environ.setdefault("SECRET_KEY", "tests-secret-key-0123456789-abcdefghijklmnop")
+os.environ.setdefault("PREWARM_CONNECTIONS", "false")
+
+from app.core.product_codes import product_code_index  # noqa: E402
+from app.core.device_keys import device_key_cache  # noqa: E402
+from app.core.security import create_access_token, get_password_hash  # noqa: E402
+from app.core.session import session_store  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.database import configure_engine, SessionLocal, TimedQueuePool  # noqa: E402
+import app.models  # noqa: E402,F401
+from app.models.investment import Investment  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.sellers import Sellers  # noqa: E402
+from app.models.sales import Sales  # noqa: E402
+from app.models.earnings import Earnings  # noqa: E402
+
+pytest_plugins = ["tests.query_budget"]
+
+
+@pytest.fixture(scope="session")
+def database_url(tmp_path_factory):
+    url = os.environ.get("TEST_DATABASE_URL")
+    if url:
+        yield url
+        return
+    try:
+        import pgserver
+    except ImportError:
+        pytest.skip("Se necesita TEST_DATABASE_URL o pgserver para los tests con PostgreSQL")
+    server = pgserver.get_server(tmp_path_factory.mktemp("pgdata"), cleanup_mode="stop")
+    yield server.get_uri()
+    server.cleanup()
+
+
+@pytest.fixture(scope="session")
+def engine(database_url):
+    engine = create_engine(database_url, poolclass=TimedQueuePool)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    configure_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_redis():
+    """Redis en memoria si fakeredis está instalado (los tests no requieren un Redis real)"""
+    try:
+        import fakeredis
+    except ImportError:
+        yield None
+        return
+    session_store.redis_client = fakeredis.FakeRedis(decode_responses=True)
+    yield session_store.redis_client
+
+
+@pytest.fixture(scope="session")
+def app(engine):
+    from main import app as fastapi_app
+    return fastapi_app
+
+
+@pytest.fixture
+def db(engine):
+    session = SessionLocal()
+    yield session
+    session.close()
+    table_names = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {table_names} RESTART IDENTITY CASCADE"))
+    # El índice de códigos y el cache de terminales reflejan la base que se acaba de vaciar
+    product_code_index.stop()
+    device_key_cache.stop()
+
+
+@pytest.fixture
+def seed(db):
+    """
+    Datos representativos: varios productos, vendedores y ventas en todos los
+    estados, con sus earnings. Suficientes filas para que un N+1 se note.
+    """
+    now = datetime.now(timezone.utc)
+    admin = User(
+        username="admin", email="admin@test.com", full_name="Admin",
+        hashed_password=get_password_hash("Admin123"), role="admin",
+        is_active=True, created_at=now
+    )
+    user = User(
+        username="usuario", email="usuario@test.com", full_name="Usuario",
+        hashed_password=get_password_hash("Usuario123"), role="user",
+        is_active=True, created_at=now
+    )
+    db.add_all([admin, user])
+
+    sellers = [
+        Sellers(name=f"Vendedor {i}", contact_info=f"v{i}@test.com", is_active=True, created_at=now)
+        for i in range(3)
+    ]
+    products = [
+        Product(
+            name=f"Producto {i}", sku=f"750100000000{i}", description=f"Descripción {i}", cost_price=10.0 + i,
+            price=15.0 + i, profit_margin=50.0, stock=100, is_active=True, created_at=now
+        )
+        for i in range(5)
+    ]
+    db.add_all(sellers + products)
+    db.flush()
+
+    statuses = ["COMPLETED", "COMPLETED", "PENDING", "PARTIAL", "CANCELLED"]
+    sales = []
+    for i in range(10):
+        product = products[i % len(products)]
+        status = statuses[i % len(statuses)]
+        total = product.price * 2
+        paid = total if status == "COMPLETED" else (total / 2 if status == "PARTIAL" else 0.0)
+        sale = Sales(
+            product_id=product.id, seller_id=sellers[i % len(sellers)].id, quantity=2,
+            status=status, subtotal=total, discount=0.0, total_price=total,
+            amount_paid=paid, amount_remaining=total - paid, payment_method="CASH",
+            due_date=(now + timedelta(days=7)).date(), created_at=now - timedelta(days=i)
+        )
+        db.add(sale)
+        sales.append(sale)
+    db.flush()
+
+    for sale in sales:
+        if sale.status != "COMPLETED":
+            continue
+        product = next(p for p in products if p.id == sale.product_id)
+        db.add(Earnings(
+            sale_id=sale.id, product_id=product.id, cost_price=product.cost_price,
+            sale_price=product.price, quantity=sale.quantity,
+            total_cost=product.cost_price * sale.quantity,
+            total_revenue=product.price * sale.quantity,
+            profit=(product.price - product.cost_price) * sale.quantity,
+            profit_margin=50.0, is_recorded=True, created_at=sale.created_at
+        ))
+
+    db.add(Investment(amount=1000.0, description="Inversión inicial", date=now, registered_by="admin"))
+    db.commit()
+
+    return {
+        "admin": admin,
+        "user": user,
+        "sellers": sellers,
+        "products": products,
+        "sales": sales,
+    }
+
+
+@pytest.fixture
+def admin_headers(seed):
+    token = create_access_token(data={"sub": seed["admin"].username})
+    return {"Authorization": f"Bearer {token}"}
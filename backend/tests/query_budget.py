@@ -0,0 +1,141 @@
+"""
+Plugin de pytest: presupuesto de queries y detector de N+1.
+
+`BudgetClient` es un TestClient que, en cada request, cuenta las sentencias
+SQL emitidas y las cargas lazy de relaciones. Al terminar el request busca
+el presupuesto declarado para la ruta en `tests/query_budgets.py` y falla el
+test si se excede o si hubo cargas lazy.
+
+Un test puede sobrescribir el presupuesto con
+`@pytest.mark.query_budget(max_queries=N, allow_lazy_loads=False)`.
+"""
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.routing import Match
+from tests.query_budgets import QUERY_BUDGETS
+
+
+@dataclass
+class RecordedRequest:
+    statements: List[str] = field(default_factory=list)
+    lazy_loads: List[str] = field(default_factory=list)
+
+
+class QueryRecorder:
+    """Cuenta sentencias y cargas lazy mientras está armado"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current: Optional[RecordedRequest] = None
+
+    def attach(self, engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._on_cursor_execute)
+        event.listen(Session, "do_orm_execute", self._on_orm_execute)
+
+    def detach(self, engine) -> None:
+        event.remove(engine, "before_cursor_execute", self._on_cursor_execute)
+        event.remove(Session, "do_orm_execute", self._on_orm_execute)
+
+    def arm(self) -> RecordedRequest:
+        with self._lock:
+            self._current = RecordedRequest()
+            return self._current
+
+    def disarm(self) -> None:
+        with self._lock:
+            self._current = None
+
+    def _on_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            if self._current is not None:
+                self._current.statements.append(statement)
+
+    def _on_orm_execute(self, orm_execute_state):
+        # Solo un SELECT puede ser una carga lazy (en un UPDATE/INSERT lazy_loaded_from falla)
+        if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+            return
+        with self._lock:
+            if self._current is not None:
+                mapper = orm_execute_state.lazy_loaded_from.mapper
+                self._current.lazy_loads.append(f"{mapper.class_.__name__} -> {orm_execute_state.statement}")
+
+
+def route_template(app, method: str, path: str) -> Optional[str]:
+    scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return None
+
+
+class BudgetClient(TestClient):
+    """TestClient que aplica el presupuesto de queries a cada request"""
+
+    def __init__(self, app, recorder: QueryRecorder, override=None, **kwargs):
+        super().__init__(app, **kwargs)
+        self.recorder = recorder
+        self.override = override
+        self.last_request: Optional[RecordedRequest] = None
+
+    def request(self, method, url, *args, **kwargs):
+        recorded = self.recorder.arm()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        finally:
+            self.recorder.disarm()
+        self.last_request = recorded
+        self._check(method.upper(), str(url).split("?")[0], recorded)
+        return response
+
+    def _check(self, method: str, path: str, recorded: RecordedRequest) -> None:
+        route = route_template(self.app, method, path)
+        if self.override is not None:
+            max_queries = self.override.kwargs.get("max_queries", self.override.args[0] if self.override.args else None)
+            allow_lazy = self.override.kwargs.get("allow_lazy_loads", False)
+        else:
+            if (method, route) not in QUERY_BUDGETS:
+                pytest.fail(f"La ruta {method} {route} no tiene presupuesto declarado en tests/query_budgets.py")
+            max_queries = QUERY_BUDGETS[(method, route)]
+            allow_lazy = False
+
+        if recorded.lazy_loads and not allow_lazy:
+            pytest.fail(
+                f"{method} {route} disparó {len(recorded.lazy_loads)} carga(s) lazy (posible N+1):\n"
+                + "\n".join(recorded.lazy_loads)
+            )
+        if max_queries is not None and len(recorded.statements) > max_queries:
+            pytest.fail(
+                f"{method} {route} ejecutó {len(recorded.statements)} queries (presupuesto: {max_queries}):\n"
+                + "\n".join(recorded.statements)
+            )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(max_queries, allow_lazy_loads=False): presupuesto de queries por request para este test"
+    )
+
+
+@pytest.fixture
+def query_recorder(engine):
+    recorder = QueryRecorder()
+    recorder.attach(engine)
+    yield recorder
+    recorder.detach(engine)
+
+
+@pytest.fixture
+def budget_client(app, query_recorder, request):
+    """Cliente HTTP contra la app real con presupuesto de queries por request"""
+    # Sin `with`: no se ejecuta el lifespan, que cerraría el engine de tests al terminar
+    override = request.node.get_closest_marker("query_budget")
+    client = BudgetClient(app, query_recorder, override=override)
+    yield client
+    client.close()
@@ -0,0 +1,88 @@
+"""
+Presupuesto máximo de sentencias SQL por request, por ruta.
+
+Incluye las queries de autenticación (usuario del token). Un endpoint nuevo
+sin entrada aquí hace fallar los tests: al agregar una ruta, declarar su
+presupuesto. Si un cambio necesita subir un número, revisar primero que el
+conteo no crezca con la cantidad de filas (N+1).
+"""
+
+QUERY_BUDGETS = {
+    # auth
+    ("POST", "/api/v1/auth/login"): 1,
+    ("POST", "/api/v1/auth/register"): 4,
+    ("POST", "/api/v1/auth/logout"): 0,
+    ("POST", "/api/v1/auth/refresh"): 1,
+    ("POST", "/api/v1/auth/forgot-password"): 1,
+    ("POST", "/api/v1/auth/reset-password"): 2,
+
+    # users
+    ("GET", "/api/v1/users/me"): 1,
+    ("DELETE", "/api/v1/users/me/sessions"): 1,
+    ("GET", "/api/v1/users/"): 2,
+    ("GET", "/api/v1/users/{user_id}"): 2,
+    ("PATCH", "/api/v1/users/{user_id}"): 4,
+    ("PATCH", "/api/v1/users/me/update"): 4,
+    ("DELETE", "/api/v1/users/{user_id}"): 3,
+    ("GET", "/api/v1/users/{user_id}/sessions"): 1,
+    ("DELETE", "/api/v1/users/{user_id}/sessions"): 1,
+    ("PUT", "/api/v1/users/{user_id}/role"): 4,
+    ("PUT", "/api/v1/users/{user_id}/password"): 4,
+
+    # products
+    ("POST", "/api/v1/products/"): 4,
+    ("GET", "/api/v1/products/"): 2,  # + usuario del token (opcional)
+    ("GET", "/api/v1/products/search"): 2,  # + detección de pg_trgm, una vez por engine
+    ("GET", "/api/v1/products/by-code/{code}"): 1,  # Solo la carga del índice, una vez por worker
+    ("PUT", "/api/v1/products/codes"): 5,
+    ("POST", "/api/v1/products/import"): 8,  # Cantidad fija, no depende de las filas
+    ("GET", "/api/v1/products/export"): 1,  # COPY TO va por el cursor de psycopg2
+    ("PATCH", "/api/v1/products/stock"): 4,  # Cantidad fija, no depende del tamaño del lote
+    ("GET", "/api/v1/products/{product_id}"): 1,
+    ("PUT", "/api/v1/products/{product_id}"): 4,
+    ("DELETE", "/api/v1/products/{product_id}"): 4,
+    ("PATCH", "/api/v1/products/{product_id}/stock"): 5,  # + registro en stock_movements
+    ("POST", "/api/v1/products/{product_id}/image"): 5,
+    ("DELETE", "/api/v1/products/{product_id}/image"): 4,
+
+    # sales
+    ("POST", "/api/v1/sales/"): 11,
+    ("GET", "/api/v1/sales/"): 2,
+    ("GET", "/api/v1/sales/{sale_id}"): 2,
+    ("PUT", "/api/v1/sales/{sale_id}"): 4,
+    ("PATCH", "/api/v1/sales/{sale_id}/status"): 4,
+    ("PATCH", "/api/v1/sales/{sale_id}/payment"): 4,
+    ("DELETE", "/api/v1/sales/{sale_id}"): 6,
+
+    # earnings
+    ("POST", "/api/v1/earnings/investment"): 3,
+    ("GET", "/api/v1/earnings/investments"): 2,
+    ("GET", "/api/v1/earnings/summary"): 6,
+    ("GET", "/api/v1/earnings/by-product"): 2,
+    ("GET", "/api/v1/earnings/by-period"): 2,
+    ("GET", "/api/v1/earnings/by-seller"): 2,
+    ("GET", "/api/v1/earnings/{sale_id}"): 2,
+    ("PUT", "/api/v1/earnings/earning/{earning_id}"): 4,
+
+    # sellers
+    ("POST", "/api/v1/sellers/"): 4,
+    ("GET", "/api/v1/sellers/"): 1,
+    ("GET", "/api/v1/sellers/{seller_id}"): 2,
+    ("PUT", "/api/v1/sellers/{seller_id}"): 4,
+    ("DELETE", "/api/v1/sellers/{seller_id}"): 3,
+    ("GET", "/api/v1/sellers/{seller_id}/sales"): 2,
+
+    # devices
+    ("POST", "/api/v1/devices/"): 4,
+    ("GET", "/api/v1/devices/"): 2,
+    ("DELETE", "/api/v1/devices/{device_id}"): 4,
+
+    # profiles
+    ("GET", "/api/v1/profiles/"): 1,
+    ("GET", "/api/v1/profiles/{profile_id}"): 1,
+
+    # slow-queries
+    ("GET", "/api/v1/slow-queries/"): 1,
+    ("GET", "/api/v1/slow-queries/{query_id}"): 1,
+    ("DELETE", "/api/v1/slow-queries/"): 1,
+}
@@ -0,0 +1,143 @@
+"""API keys de terminal: autenticación con X-API-Key, revocación y cambios del usuario dueño"""
+import time
+import redis
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.core.config import settings
+from app.core.device_keys import REVOKED_CHANNEL, device_key_cache
+from app.core.security import create_access_token
+from app.core.session import session_store
+from app.models.device import DeviceKey
+
+API = settings.API_V1_STR
+
+
+def _register(client, headers, user_id, name="Caja 1"):
+    response = client.post(f"{API}/devices/", json={"name": name, "user_id": user_id}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _me(client, api_key):
+    return client.get(f"{API}/users/me", headers={"X-API-Key": api_key})
+
+
+def test_api_key_authenticates_from_cache(app, engine, db, seed, admin_headers):
+    client = TestClient(app)
+    device = _register(client, admin_headers, seed["user"].id)
+
+    response = _me(client, device["api_key"])
+    assert response.status_code == 200, response.text
+    assert response.json()["username"] == seed["user"].username
+    db.expire_all()
+    assert db.get(DeviceKey, device["id"]).last_used_at is not None
+
+    # Ya en cache: la llave se verifica sin ir a la base
+    statements = []
+    record = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert _me(client, device["api_key"]).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert not any("device_keys" in statement for statement in statements)
+
+    for bad_key in ("pvk_no_existe", device["api_key"][:-1] + "x", "sin-formato"):
+        assert _me(client, bad_key).status_code == 401
+
+
+def test_revoked_device_is_rejected(app, seed, admin_headers):
+    client = TestClient(app)
+    device = _register(client, admin_headers, seed["user"].id)
+    other = _register(client, admin_headers, seed["user"].id, name="Caja 2")
+    assert _me(client, device["api_key"]).status_code == 200
+
+    assert client.delete(f"{API}/devices/{device['id']}", headers=admin_headers).status_code == 200
+    assert _me(client, device["api_key"]).status_code == 401
+    assert _me(client, other["api_key"]).status_code == 200
+
+
+def test_api_key_cannot_manage_devices_or_users(app, seed, admin_headers):
+    client = TestClient(app)
+    admin, user = seed["admin"], seed["user"]
+    device = _register(client, admin_headers, admin.id)
+    key_headers = {"X-API-Key": device["api_key"]}
+    assert _me(client, device["api_key"]).json()["role"] == "admin"
+
+    # Una llave de admin filtrada no puede crear llaves ni tomar cuentas
+    for method, path, kwargs in [
+        ("post", "/devices/", {"json": {"name": "Otra", "user_id": admin.id}}),
+        ("get", "/devices/", {}),
+        ("delete", f"/devices/{device['id']}", {}),
+        ("get", "/users/", {}),
+        ("patch", f"/users/{user.id}", {"json": {"full_name": "X"}}),
+        ("put", f"/users/{user.id}/password", {"json": {"new_password": "Nueva1234"}}),
+        ("put", f"/users/{user.id}/role", {"json": {"role": "admin"}}),
+        ("delete", f"/users/{user.id}", {}),
+        ("delete", f"/users/{user.id}/sessions", {}),
+        ("patch", "/users/me/update", {"json": {"password": "Nueva1234"}}),
+        ("delete", "/users/me/sessions", {}),
+    ]:
+        response = getattr(client, method)(f"{API}{path}", headers=key_headers, **kwargs)
+        assert response.status_code == 403, (method, path, response.text)
+
+    # La terminal sigue operando y el admin con sesión sí puede
+    assert _me(client, device["api_key"]).status_code == 200
+    assert client.get(f"{API}/devices/", headers=admin_headers).status_code == 200
+
+
+def test_user_changes_reach_cached_keys(app, seed, admin_headers):
+    client = TestClient(app)
+    user = seed["user"]
+    device = _register(client, admin_headers, user.id)
+    assert _me(client, device["api_key"]).json()["full_name"] == user.full_name
+
+    # Perfil propio editado con sesión y rol cambiado por el admin
+    user_headers = {"Authorization": f"Bearer {create_access_token(data={'sub': user.username})}"}
+    response = client.patch(f"{API}/users/me/update", json={"full_name": "Nombre Nuevo"}, headers=user_headers)
+    assert response.status_code == 200, response.text
+    assert _me(client, device["api_key"]).json()["full_name"] == "Nombre Nuevo"
+    assert client.put(f"{API}/users/{user.id}/role", json={"role": "admin"}, headers=admin_headers).status_code == 200
+    assert _me(client, device["api_key"]).json()["role"] == "admin"
+
+    # Usuario desactivado: sus terminales dejan de autenticar de inmediato
+    assert client.delete(f"{API}/users/{user.id}", headers=admin_headers).status_code == 204
+    assert _me(client, device["api_key"]).status_code == 401
+
+
+def test_user_changes_published_by_other_workers_are_applied(app, db, seed, admin_headers):
+    client = TestClient(app)
+    user = seed["user"]
+    device = _register(client, admin_headers, user.id)
+    assert _me(client, device["api_key"]).status_code == 200
+
+    # Otro worker desactivó al usuario y lo avisó por Redis
+    user.is_active = False
+    db.commit()
+    session_store.redis_client.publish(REVOKED_CHANNEL, f"user:{user.id}")
+
+    deadline = time.monotonic() + 5
+    while any(e.principal.id == user.id for e in list(device_key_cache._entries.values())) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _me(client, device["api_key"]).status_code == 401
+
+
+def test_lost_subscription_clears_the_cache(app, db, seed, admin_headers):
+    client = TestClient(app)
+    device = _register(client, admin_headers, seed["user"].id)
+    assert _me(client, device["api_key"]).status_code == 200
+    listener = device_key_cache._listener
+    assert listener is not None
+
+    # Redis corta la conexión de la suscripción
+    def drop(*args, **kwargs):
+        raise redis.ConnectionError("Connection closed by server.")
+    listener.pubsub.get_message = drop
+    listener.join(timeout=5)
+    assert not listener.is_alive()
+
+    # Una revocación que no llegó: el cache se vació y la llave se valida de nuevo
+    db.query(DeviceKey).filter(DeviceKey.id == device["id"]).update({"is_active": False})
+    db.commit()
+    assert _me(client, device["api_key"]).status_code == 401
+    assert device_key_cache._listener is not None and device_key_cache._listener is not listener
@@ -0,0 +1,123 @@
+"""Recolector de imágenes huérfanas: merge contra products.image_url, gracia, cuarentena y reporte"""
+import hashlib
+import io
+import os
+import time
+from datetime import timedelta
+from fastapi.testclient import TestClient
+from PIL import Image
+from app.api.v1.endpoints import products as products_endpoint
+from app.core.config import settings
+from app.core.image_gc import collect_orphans, sorted_directory
+from app.models.product import Product
+from app.models.product_image import ProductImage
+
+API = settings.API_V1_STR
+GRACE = timedelta(hours=1)
+
+
+def _png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (400, 300), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _write(directory, name, size=100, age_hours=48):
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    old = time.time() - age_hours * 3600
+    os.utime(path, (old, old))
+    return path
+
+
+def _upload(client, product_id, headers, content):
+    response = client.post(
+        f"{API}/products/{product_id}/image",
+        files={"file": ("foto.png", content, "image/png")},
+        headers=headers
+    )
+    assert response.status_code == 200
+    return response.json()["image_url"]
+
+
+def _age_all(directory, hours=48):
+    old = time.time() - hours * 3600
+    for path in directory.iterdir():
+        os.utime(path, (old, old))
+
+
+def test_sorted_directory_groups_variants_with_their_original(tmp_path):
+    for name in ["b.png", "b_card.webp", "a_thumb.jpg", "a.jpg", ".upload-x.part", "c.png.part"]:
+        _write(tmp_path, name)
+    (tmp_path / ".resized").mkdir()
+
+    listed = list(sorted_directory(str(tmp_path), run_size=2))
+
+    assert listed == sorted(listed)
+    assert [base for base, _ in listed] == [".upload-x.part", "a", "a", "b", "b", "c.png.part"]
+
+
+def test_orphans_are_removed_and_referenced_files_kept(engine, app, db, seed, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(products_endpoint, "UPLOADS_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "IMAGE_RESIZE_CACHE_DIR", str(tmp_path / ".resized"))
+    client = TestClient(app)
+    kept_url = _upload(client, seed["products"][0].id, admin_headers, _png((10, 20, 30)))
+    _age_all(tmp_path)
+
+    orphan_hash = hashlib.sha256(b"huerfana").hexdigest()
+    _write(tmp_path, f"{orphan_hash}.png", size=1000)
+    _write(tmp_path, f"{orphan_hash}_card.webp", size=200)
+    _write(tmp_path, "product_9_abc.jpg", size=300)
+    _write(tmp_path, ".upload-123.part", size=50)
+    young = _write(tmp_path, "product_8_nueva.jpg", size=400, age_hours=0)
+
+    report = collect_orphans(engine, str(tmp_path), GRACE, run_size=3)
+
+    assert report.orphan_files == 4
+    assert report.removed_files == 4
+    assert report.reclaimed_bytes == 1550
+    assert report.recent_files == 1
+    assert report.referenced_files == 7
+    assert young.exists()
+    assert (tmp_path / kept_url.rsplit("/", 1)[1]).exists()
+    assert len([p for p in tmp_path.iterdir() if p.is_file()]) == 8
+
+    # Solo queda la fila de la imagen referenciada
+    assert [image.content_hash for image in db.query(ProductImage)] == [kept_url.rsplit("/", 1)[1][:64]]
+
+
+def test_dry_run_and_quarantine(engine, seed, tmp_path):
+    uploads = tmp_path / "products"
+    uploads.mkdir()
+    quarantine = tmp_path / "cuarentena"
+    _write(uploads, "product_9_abc.jpg", size=300)
+    _write(uploads, "product_9_abc_thumb.webp", size=30)
+
+    report = collect_orphans(engine, str(uploads), GRACE, quarantine_dir=str(quarantine), dry_run=True)
+    assert report.orphan_files == 2 and report.reclaimed_bytes == 330
+    assert report.removed_files == 0 and not quarantine.exists()
+
+    report = collect_orphans(engine, str(uploads), GRACE, quarantine_dir=str(quarantine))
+    assert report.removed_files == 2 and report.reclaimed_bytes == 330
+    assert not list(uploads.iterdir())
+    assert sorted(p.name for p in quarantine.iterdir()) == ["product_9_abc.jpg", "product_9_abc_thumb.webp"]
+
+
+def test_release_inactive_frees_images_of_disabled_products(engine, app, db, seed, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(products_endpoint, "UPLOADS_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "IMAGE_RESIZE_CACHE_DIR", str(tmp_path / ".resized"))
+    client = TestClient(app)
+    product_id = seed["products"][1].id
+    _upload(client, product_id, admin_headers, _png((200, 0, 0)))
+    assert client.delete(f"{API}/products/{product_id}", headers=admin_headers).status_code == 200
+    _age_all(tmp_path)
+
+    assert collect_orphans(engine, str(tmp_path), GRACE).removed_files == 0
+
+    report = collect_orphans(engine, str(tmp_path), GRACE, release_inactive=True)
+    assert report.released_products == 1
+    assert report.removed_files == 7
+    assert not [p for p in tmp_path.iterdir() if p.is_file()]
+    db.expire_all()
+    assert db.get(Product, product_id).image_url is None
+    assert db.query(ProductImage).count() == 0
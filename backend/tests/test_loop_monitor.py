@@ -0,0 +1,53 @@
+"""Monitor de saturación: lag del event loop y cola del thread pool"""
+import asyncio
+import logging
+import time
+from anyio import to_thread
+from app.core.config import settings
+from app.core.loop_monitor import LoopMonitor
+
+
+def _saturation_records(caplog):
+    return [record for record in caplog.records if getattr(record, "event", None) == "worker_saturated"]
+
+
+def test_sustained_threadpool_queue_is_logged_with_in_flight_routes(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "THREADPOOL_SIZE", 1)
+    monkeypatch.setattr(settings, "LOOP_MONITOR_INTERVAL_MS", 10)
+    monkeypatch.setattr(settings, "SATURATION_WARN_SECONDS", 0.1)
+    monitor = LoopMonitor()
+
+    async def scenario():
+        monitor.start()
+        request_id = monitor.request_started("GET", "/api/v1/earnings/summary")
+        await asyncio.gather(*(to_thread.run_sync(time.sleep, 0.3) for _ in range(3)))
+        monitor.request_finished(request_id)
+        await monitor.stop()
+
+    with caplog.at_level(logging.WARNING, logger="app.core.loop_monitor"):
+        asyncio.run(scenario())
+
+    record = _saturation_records(caplog)[0]
+    assert record.threadpool_size == 1
+    assert record.threadpool_waiting >= 1
+    assert record.top_in_flight[0]["route"] == "GET /api/v1/earnings/summary"
+    assert not monitor.top_in_flight()
+
+
+def test_blocked_event_loop_is_reported_as_lag(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "LOOP_MONITOR_INTERVAL_MS", 10)
+    monkeypatch.setattr(settings, "LOOP_LAG_WARN_MS", 50.0)
+    monkeypatch.setattr(settings, "SATURATION_WARN_SECONDS", 0.0)
+    monitor = LoopMonitor()
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.3)  # Bloquea el loop, como un endpoint async con I/O síncrono
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    with caplog.at_level(logging.WARNING, logger="app.core.loop_monitor"):
+        asyncio.run(scenario())
+
+    assert max(record.loop_lag_ms for record in _saturation_records(caplog)) >= 200
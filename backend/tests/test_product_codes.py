@@ -0,0 +1,137 @@
+"""Búsqueda por SKU / código de barras desde el índice en memoria y asignación en lote"""
+import time
+import redis
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.core.config import settings
+from app.core.product_codes import CHANGED_CHANNEL, product_code_index
+from app.core.security import create_access_token
+from app.core.session import session_store
+
+API = settings.API_V1_STR
+
+
+def _by_code(client, code):
+    return client.get(f"{API}/products/by-code/{code}")
+
+
+def test_lookup_follows_create_update_and_deactivate(app, seed, admin_headers):
+    client = TestClient(app)
+    product = seed["products"][0]
+
+    response = _by_code(client, product.sku)
+    assert response.status_code == 200, response.text
+    assert response.json() == {"id": product.id, "sku": product.sku, "name": product.name, "price": product.price}
+    assert _by_code(client, "NO-EXISTE").status_code == 404
+
+    response = client.put(f"{API}/products/{product.id}", json={"sku": "CAMBIADO-1", "price": 99.0}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert _by_code(client, product.sku).status_code == 404
+    assert _by_code(client, "CAMBIADO-1").json()["price"] == 99.0
+
+    # Un código repetido se rechaza al crear y al editar
+    other = seed["products"][1]
+    response = client.post(f"{API}/products/", json={
+        "name": "Repetido", "sku": other.sku, "cost_price": 1.0, "price": 2.0
+    }, headers=admin_headers)
+    assert response.status_code == 400
+    response = client.put(f"{API}/products/{product.id}", json={"sku": other.sku}, headers=admin_headers)
+    assert response.status_code == 400
+
+    response = client.post(f"{API}/products/", json={
+        "name": "Nuevo", "sku": "NUEVO-1", "cost_price": 1.0, "price": 2.0
+    }, headers=admin_headers)
+    assert response.status_code == 201, response.text
+    assert _by_code(client, "NUEVO-1").json()["id"] == response.json()["id"]
+
+    # Desactivado = fuera del índice
+    assert client.delete(f"{API}/products/{other.id}", headers=admin_headers).status_code == 200
+    assert _by_code(client, other.sku).status_code == 404
+
+
+def test_lookup_does_not_query_the_database(app, engine, seed):
+    client = TestClient(app)
+    codes = [product.sku for product in seed["products"]]
+    assert _by_code(client, codes[0]).status_code == 200  # Carga el índice
+
+    statements = []
+    record = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for code in codes * 20:
+            assert _by_code(client, code).status_code == 200
+        assert _by_code(client, "NO-EXISTE").status_code == 404
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert statements == []
+
+
+def test_bulk_assignment_swaps_and_clears_codes(app, seed, admin_headers):
+    client = TestClient(app)
+    p0, p1, p2, p3 = seed["products"][:4]
+    old = {p.id: p.sku for p in (p0, p1, p2, p3)}
+    assert _by_code(client, old[p0.id]).status_code == 200  # Índice cargado antes del cambio
+
+    response = client.put(f"{API}/products/codes", json=[
+        {"product_id": p0.id, "sku": old[p1.id]},
+        {"product_id": p1.id, "sku": old[p0.id]},
+        {"product_id": p2.id, "sku": None},
+    ], headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == {"updated": 3}
+    assert _by_code(client, old[p1.id]).json()["id"] == p0.id
+    assert _by_code(client, old[p0.id]).json()["id"] == p1.id
+    assert _by_code(client, old[p2.id]).status_code == 404
+
+    # Todo o nada: código de otro producto fuera del lote, repetido o producto inexistente
+    for batch, expected in [
+        ([{"product_id": p0.id, "sku": "LIBRE-1"}, {"product_id": p2.id, "sku": old[p3.id]}], 400),
+        ([{"product_id": p0.id, "sku": "LIBRE-1"}, {"product_id": p2.id, "sku": "LIBRE-1"}], 400),
+        ([{"product_id": p0.id, "sku": "LIBRE-1"}, {"product_id": 9999, "sku": "LIBRE-2"}], 404),
+    ]:
+        assert client.put(f"{API}/products/codes", json=batch, headers=admin_headers).status_code == expected
+    assert _by_code(client, "LIBRE-1").status_code == 404
+    assert _by_code(client, old[p1.id]).json()["id"] == p0.id
+
+    user_headers = {"Authorization": f"Bearer {create_access_token(data={'sub': seed['user'].username})}"}
+    response = client.put(f"{API}/products/codes", json=[{"product_id": p0.id, "sku": "X"}], headers=user_headers)
+    assert response.status_code == 403
+
+
+def test_changes_published_by_other_workers_are_applied(app, db, seed):
+    client = TestClient(app)
+    product = seed["products"][0]
+    old_code = product.sku
+    assert _by_code(client, old_code).status_code == 200
+
+    # Otro worker cambió el código y lo avisó por Redis
+    product.sku = "DE-OTRO-WORKER"
+    db.commit()
+    session_store.redis_client.publish(CHANGED_CHANNEL, f"otro-worker:{product.id}")
+
+    deadline = time.monotonic() + 5
+    while product_code_index.lookup("DE-OTRO-WORKER") is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _by_code(client, "DE-OTRO-WORKER").json()["id"] == product.id
+    assert _by_code(client, old_code).status_code == 404
+
+
+def test_lost_subscription_falls_back_to_reloading(app, db, seed):
+    client = TestClient(app)
+    product = seed["products"][0]
+    assert _by_code(client, product.sku).status_code == 200
+    listener = product_code_index._listener
+    assert listener is not None
+
+    # Redis corta la conexión de la suscripción
+    def drop(*args, **kwargs):
+        raise redis.ConnectionError("Connection closed by server.")
+    listener.pubsub.get_message = drop
+    listener.join(timeout=5)
+    assert not listener.is_alive()
+
+    # Un cambio que nadie avisó: el índice se recarga y vuelve a suscribirse
+    product.sku = "SIN-AVISO"
+    db.commit()
+    assert _by_code(client, "SIN-AVISO").json()["id"] == product.id
+    assert product_code_index._listener is not None and product_code_index._listener is not listener
@@ -0,0 +1,108 @@
+"""Importación y exportación CSV del catálogo: reglas de precio en SQL, upsert por código o nombre y reporte"""
+import csv
+import io
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.product_csv import import_csv
+from app.models.product import Product
+
+API = settings.API_V1_STR
+
+CATALOG = (
+    "name,sku,cost_price,price,profit_margin,stock,is_active\n"
+    "Producto 0,,20,,50,,\n"                       # 2: actualiza por nombre, conserva stock
+    "Otro nombre,7501000000001,12,18,,3,false\n"   # 3: actualiza por código (renombra Producto 1)
+    "Nuevo A,NEW-A,10,,30,5,\n"                    # 4: alta con precio por margen
+    "Nuevo B,,10,15,,,\n"                          # 5: alta con margen por precio
+    ",,10,15,,,\n"                                 # 6: sin nombre
+    "Malo C,,10,9,,,\n"                            # 7: precio menor al costo
+    "Malo D,,abc,15,,,\n"                          # 8: costo no numérico
+    "Malo E,,10,,,,\n"                             # 9: sin precio ni margen
+    "Malo F,,10,20,50,,\n"                         # 10: precio inconsistente con el margen
+    "Nuevo A,,10,,30,,\n"                          # 11: nombre repetido en el archivo
+    "Producto 2,7501000000003,10,20,,,\n"          # 12: código de Producto 3, nombre de Producto 2
+    "Malo G,a b,10,20,,,\n"                        # 13: código inválido
+)
+
+
+def _upload(client, headers, content, **params):
+    return client.post(
+        f"{API}/products/import", params=params, headers=headers,
+        files={"file": ("catalogo.csv", content.encode(), "text/csv")}
+    )
+
+
+def test_import_upserts_valid_rows_and_reports_the_rest(app, db, seed, admin_headers):
+    client = TestClient(app)
+    products = seed["products"]
+    assert client.get(f"{API}/products/by-code/{products[1].sku}").status_code == 200  # Índice cargado
+
+    response = _upload(client, admin_headers, CATALOG)
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["rows"], report["inserted"], report["updated"], report["error_count"]) == (12, 2, 2, 8)
+    assert [(e["line"], e["error"]) for e in report["errors"]] == [
+        (6, "Falta el nombre"),
+        (7, "El precio de venta debe ser mayor al precio de costo"),
+        (8, "cost_price debe ser un número mayor a 0"),
+        (9, "Falta price o profit_margin"),
+        (10, "price no es consistente con profit_margin"),
+        (11, "Nombre repetido en el archivo (línea 4)"),
+        (12, f"El nombre ya es de otro producto (ID {products[2].id})"),
+        (13, "Código inválido (letras, dígitos y . _ -, hasta 64)"),
+    ]
+
+    db.expire_all()
+    p0, p1 = db.get(Product, products[0].id), db.get(Product, products[1].id)
+    assert (p0.cost_price, p0.price, p0.profit_margin, p0.stock, p0.sku) == (20.0, 30.0, 50.0, 100, products[0].sku)
+    assert (p1.name, p1.price, p1.profit_margin, p1.stock, p1.is_active) == ("Otro nombre", 18.0, 50.0, 3, False)
+    new_a = db.query(Product).filter(Product.name == "Nuevo A").one()
+    new_b = db.query(Product).filter(Product.name == "Nuevo B").one()
+    assert (new_a.sku, round(new_a.price, 2), new_a.stock, new_a.is_active) == ("NEW-A", 13.0, 5, True)
+    assert (new_b.profit_margin, new_b.stock) == (50.0, 0)
+    assert db.query(Product).count() == 7
+
+    # El índice de códigos se entera de las altas y desactivaciones
+    assert client.get(f"{API}/products/by-code/NEW-A").json()["id"] == new_a.id
+    assert client.get(f"{API}/products/by-code/{products[1].sku}").status_code == 404
+
+
+def test_dry_run_and_invalid_files_change_nothing(app, db, seed, admin_headers):
+    client = TestClient(app)
+
+    response = _upload(client, admin_headers, CATALOG, dry_run=True)
+    assert response.status_code == 200, response.text
+    assert (response.json()["inserted"], response.json()["updated"], response.json()["error_count"]) == (2, 2, 8)
+
+    assert _upload(client, admin_headers, "nombre,costo\nA,1\n").status_code == 400
+    assert _upload(client, admin_headers, "name,price\nA,1\n").status_code == 400
+    response = _upload(client, admin_headers, "name,cost_price,price\nA,1,2\nB,1,2,3\n")
+    assert response.status_code == 400
+    assert "line 3" in response.json()["detail"]
+
+    user_client = TestClient(app)
+    assert user_client.post(f"{API}/products/import", files={"file": ("c.csv", b"name,cost_price\n")}).status_code == 401
+
+    db.expire_all()
+    assert db.query(Product).count() == 5
+    assert [p.name for p in db.query(Product).order_by(Product.id)] == [p.name for p in seed["products"]]
+
+
+def test_export_round_trips_through_import(app, db, seed, admin_headers):
+    client = TestClient(app)
+    seed["products"][0].description = 'Con "comillas", comas\ny saltos de línea'
+    for product in seed["products"]:
+        # Precio y margen consistentes, como los deja la API
+        product.profit_margin = (product.price - product.cost_price) / product.cost_price * 100
+    db.commit()
+
+    response = client.get(f"{API}/products/export", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["name"] for row in rows] == [p.name for p in seed["products"]]
+    assert rows[0]["description"] == seed["products"][0].description
+
+    # Reimportar la exportación solo actualiza, sin errores ni altas
+    report = import_csv(db, io.BytesIO(response.content))
+    assert (report.rows, report.inserted, report.updated, report.error_count) == (5, 0, 5, 0)
@@ -0,0 +1,337 @@
+"""Imágenes de productos: subida, variantes WebP/JPEG, almacenamiento por contenido y redimensionado"""
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import time
+import warnings
+import httpx
+from fastapi.testclient import TestClient
+from PIL import Image
+from prometheus_client import REGISTRY
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from app.api.v1.endpoints import products as products_endpoint
+from app.core import images
+from app.core.config import settings
+from app.core.image_cache import ResizeCache
+from app.core.static_files import UploadsStaticFiles
+from app.schemas.product import Product as ProductSchema
+
+API = settings.API_V1_STR
+
+
+def _png(width, height, mode="RGB"):
+    buffer = io.BytesIO()
+    Image.new(mode, (width, height), (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _upload(client, product_id, headers, content, name="foto.png"):
+    return client.post(
+        f"{API}/products/{product_id}/image",
+        files={"file": (name, content, "image/png")},
+        headers=headers
+    )
+
+
+def test_upload_generates_resized_variants(app, seed, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(products_endpoint, "UPLOADS_DIR", str(tmp_path))
+    client = TestClient(app)
+    product_id = seed["products"][0].id
+
+    response = _upload(client, product_id, admin_headers, _png(2400, 1600, "RGBA"))
+    assert response.status_code == 200
+    variants = response.json()["image_variants"]
+    assert set(variants) == {"thumb", "card", "detail"}
+
+    for name, variant in variants.items():
+        webp = Image.open(tmp_path / variant["webp"].rsplit("/", 1)[1])
+        jpeg = Image.open(tmp_path / variant["jpeg"].rsplit("/", 1)[1])
+        assert webp.format == "WEBP" and jpeg.format == "JPEG"
+        assert max(webp.size) == variant["size"]
+        assert jpeg.size == webp.size
+
+    listed = client.get(f"{API}/products/{product_id}").json()
+    assert listed["image_variants"] == variants
+
+
+def test_small_images_are_not_upscaled(app, seed, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(products_endpoint, "UPLOADS_DIR", str(tmp_path))
+    client = TestClient(app)
+
+    variants = _upload(client, seed["products"][0].id, admin_headers, _png(300, 200)).json()["image_variants"]
+
+    assert Image.open(tmp_path / variants["detail"]["webp"].rsplit("/", 1)[1]).size == (300, 200)
+    assert Image.open(tmp_path / variants["thumb"]["webp"].rsplit("/", 1)[1]).size == (160, 107)
+
+
+def test_replacing_or_deleting_image_removes_variants(app, seed, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(products_endpoint, "UPLOADS_DIR", str(tmp_path))
+    client = TestClient(app)
+    product_id = seed["products"][0].id
+
+    _upload(client, product_id, admin_headers, _png(800, 600), name="a.png")
+    assert len(list(tmp_path.iterdir())) == 7
+    _upload(client, product_id, admin_headers, _png(800, 600), name="b.jpeg")
+    assert len(list(tmp_path.iterdir())) == 7
+
+    assert client.delete(f"{API}/products/{product_id}/image", headers=admin_headers).status_code == 200
+    assert not list(tmp_path.iterdir())
+
+
+def test_invalid_image_is_rejected_without_leftovers(app, seed, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(products_endpoint, "UPLOADS_DIR", str(tmp_path))
+    client = TestClient(app)
+
+    response = _upload(client, seed["products"][0].id, admin_headers, b"no soy una imagen")
+
+    assert response.status_code == 400
+    assert not list(tmp_path.iterdir())
+    assert client.get(f"{API}/products/{seed['products'][0].id}").json()["image_variants"] is None
+
+
+def test_content_is_validated_by_magic_bytes(app, seed, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(products_endpoint, "UPLOADS_DIR", str(tmp_path))
+    client = TestClient(app)
+
+    response = _upload(client, seed["products"][0].id, admin_headers, b"GIF89a" + b"\x00" * 64)
+
+    assert response.status_code == 400
+    assert not list(tmp_path.iterdir())
+
+
+def test_extension_comes_from_content(app, seed, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(products_endpoint, "UPLOADS_DIR", str(tmp_path))
+    client = TestClient(app)
+
+    response = _upload(client, seed["products"][0].id, admin_headers, _png(50, 50), name="foto.jpg")
+
+    assert response.json()["image_url"].endswith(".png")
+
+
+def test_upload_over_limit_is_aborted_without_leftovers(app, seed, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(products_endpoint, "UPLOADS_DIR", str(tmp_path))
+    monkeypatch.setattr(products_endpoint, "MAX_FILE_SIZE", 4096)
+    client = TestClient(app)
+
+    response = _upload(client, seed["products"][0].id, admin_headers, _png(50, 50) + b"\x00" * 8192)
+
+    assert response.status_code == 413
+    assert not list(tmp_path.iterdir())
+
+
+def test_request_body_over_limit_is_rejected_before_reading(app, seed, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(products_endpoint, "UPLOADS_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE_MB", 1)
+    client = TestClient(app)
+
+    response = _upload(client, seed["products"][0].id, admin_headers, _png(50, 50) + b"\x00" * (2 * 1024 * 1024))
+
+    assert response.status_code == 413
+    assert "1 MB" in response.json()["detail"]
+    assert not list(tmp_path.iterdir())
+
+
+def test_identical_uploads_share_one_file_until_unreferenced(app, seed, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(products_endpoint, "UPLOADS_DIR", str(tmp_path))
+    client = TestClient(app)
+    first, second = seed["products"][0].id, seed["products"][1].id
+    content = _png(640, 480)
+
+    url = _upload(client, first, admin_headers, content).json()["image_url"]
+    assert _upload(client, second, admin_headers, content, name="copia.png").json()["image_url"] == url
+    assert url == f"/uploads/products/{hashlib.sha256(content).hexdigest()}.png"
+    assert len(list(tmp_path.iterdir())) == 7
+
+    # Un producto suelta la imagen: el otro la sigue usando
+    assert client.delete(f"{API}/products/{first}/image", headers=admin_headers).status_code == 200
+    assert len(list(tmp_path.iterdir())) == 7
+
+    # Otro producto pasa a usarla por URL y el último dueño la reemplaza
+    response = client.put(f"{API}/products/{first}", json={"image_url": url}, headers=admin_headers)
+    assert response.status_code == 200
+    _upload(client, second, admin_headers, _png(320, 240), name="otra.png")
+    assert len(list(tmp_path.iterdir())) == 14
+
+    assert client.delete(f"{API}/products/{first}/image", headers=admin_headers).status_code == 200
+    assert not (tmp_path / url.rsplit("/", 1)[1]).exists()
+    assert len(list(tmp_path.iterdir())) == 7
+
+
+def test_concurrent_uploads_of_the_same_content_do_not_block_the_loop(app, seed, admin_headers, monkeypatch, tmp_path):
+    # La segunda subida espera el bloqueo de la fila de la primera; si esa espera
+    # ocurre en el event loop, la primera nunca llega a su commit
+    monkeypatch.setattr(products_endpoint, "UPLOADS_DIR", str(tmp_path))
+    content = _png(1600, 1200)
+    product_ids = [seed["products"][0].id, seed["products"][1].id]
+    responses = []
+
+    async def upload_both():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses.extend(await asyncio.gather(*[
+                client.post(
+                    f"{API}/products/{product_id}/image",
+                    files={"file": ("foto.png", content, "image/png")},
+                    headers=admin_headers
+                )
+                for product_id in product_ids
+            ]))
+
+    worker = threading.Thread(target=asyncio.run, args=(upload_both(),), daemon=True)
+    worker.start()
+    worker.join(timeout=60)
+    assert not worker.is_alive(), "Las subidas simultáneas del mismo contenido quedaron bloqueadas"
+    assert [r.status_code for r in responses] == [200, 200]
+    assert responses[0].json()["image_url"] == responses[1].json()["image_url"]
+    assert len(list(tmp_path.iterdir())) == 7
+
+
+def test_unknown_content_addressed_url_is_rejected(app, seed, admin_headers):
+    client = TestClient(app)
+
+    response = client.put(
+        f"{API}/products/{seed['products'][0].id}",
+        json={"image_url": f"/uploads/products/{'0' * 64}.png"},
+        headers=admin_headers
+    )
+
+    assert response.status_code == 400
+
+
+def test_content_addressed_files_are_served_immutable(tmp_path):
+    (tmp_path / f"{'a' * 64}_card.webp").write_bytes(b"webp")
+    (tmp_path / "product_1_1700000000.png").write_bytes(b"png")
+    client = TestClient(Starlette(routes=[Mount("/uploads", UploadsStaticFiles(directory=tmp_path))]))
+
+    response = client.get(f"/uploads/{'a' * 64}_card.webp")
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    revalidated = client.get(f"/uploads/{'a' * 64}_card.webp", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+    assert client.get("/uploads/product_1_1700000000.png").headers["cache-control"] == "public, max-age=86400"
+
+
+def test_range_requests_and_temp_files(tmp_path):
+    (tmp_path / f"{'b' * 64}.png").write_bytes(b"0123456789")
+    (tmp_path / ".upload-abc.part").write_bytes(b"a medio subir")
+    client = TestClient(Starlette(routes=[Mount("/uploads", UploadsStaticFiles(directory=tmp_path))]))
+
+    response = client.get(f"/uploads/{'b' * 64}.png", headers={"Range": "bytes=2-5"})
+    assert response.status_code == 206
+    assert response.content == b"2345"
+
+    assert client.get("/uploads/.upload-abc.part").status_code == 404
+
+
+def test_x_accel_mode_only_resolves_the_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOADS_SERVE_MODE", "x-accel")
+    (tmp_path / "products").mkdir()
+    (tmp_path / "products" / f"{'c' * 64}_card.webp").write_bytes(b"webp")
+    client = TestClient(Starlette(routes=[Mount("/uploads", UploadsStaticFiles(directory=tmp_path))]))
+
+    response = client.get(f"/uploads/products/{'c' * 64}_card.webp")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == f"/_uploads/products/{'c' * 64}_card.webp"
+    assert response.headers["content-type"] == "image/webp"
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+    assert client.get("/uploads/products/no-existe.png").status_code == 404
+    assert client.get("/uploads/../secreto.txt").status_code == 404
+
+
+def _resize_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_RESIZE_CACHE_DIR", str(tmp_path / ".resized"))
+    return TestClient(Starlette(routes=[Mount("/uploads", UploadsStaticFiles(directory=tmp_path))]))
+
+
+def _resize_count(result):
+    return REGISTRY.get_sample_value("image_resize_requests_total", {"result": result}) or 0.0
+
+
+def test_resize_on_demand_is_cached(tmp_path, monkeypatch):
+    client = _resize_client(tmp_path, monkeypatch)
+    name = f"{'d' * 64}.png"
+    (tmp_path / name).write_bytes(_png(1000, 500, "RGBA"))
+    hits, misses = _resize_count("hit"), _resize_count("miss")
+
+    response = client.get(f"/uploads/{name}?w=480&fmt=webp")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert Image.open(io.BytesIO(response.content)).size == (480, 240)
+
+    again = client.get(f"/uploads/{name}?w=480&fmt=webp")
+    assert again.content == response.content
+    assert (_resize_count("miss") - misses, _resize_count("hit") - hits) == (1, 1)
+
+    jpeg = client.get(f"/uploads/{name}?w=160&q=50")
+    assert Image.open(io.BytesIO(jpeg.content)).format == "JPEG"
+    assert sorted(path.name for path in (tmp_path / ".resized").iterdir()) == [
+        f"{'d' * 64}_w160_q50.jpg", f"{'d' * 64}_w480_q80.webp"
+    ]
+    # El cache no se puede pedir directo
+    assert client.get(f"/uploads/.resized/{'d' * 64}_w160_q50.jpg").status_code == 404
+
+
+def test_resize_parameters_are_whitelisted(tmp_path, monkeypatch):
+    client = _resize_client(tmp_path, monkeypatch)
+    (tmp_path / "foto.png").write_bytes(_png(100, 100))
+    (tmp_path / "notas.txt").write_bytes(b"texto")
+
+    for query in ("w=481", "w=480&q=33", "w=480&fmt=gif", "w=480&v=2", "q=80", "w=480&w=640"):
+        assert client.get(f"/uploads/foto.png?{query}").status_code == 400, query
+    assert client.get("/uploads/notas.txt?w=480").status_code == 400
+    assert client.get("/uploads/no-existe.png?w=480").status_code == 404
+    assert not (tmp_path / ".resized").exists()
+
+
+def test_resize_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_RESIZE_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "IMAGE_RESIZE_CACHE_MAX_MB", 1)
+    for age, name in enumerate(["nuevo", "medio", "viejo"]):
+        path = tmp_path / f"{name}_w480_q80.webp"
+        path.write_bytes(b"\x00" * 400 * 1024)
+        os.utime(path, (time.time() - age * 60, time.time() - age * 60))
+
+    assert ResizeCache().evict() == 1
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["medio_w480_q80.webp", "nuevo_w480_q80.webp"]
+
+
+def test_variants_serialize_without_warnings(seed):
+    product = ProductSchema.model_validate(seed["products"][0])
+    content_hash = "ab" * 32
+    product.image_url = f"/uploads/products/{content_hash}.png"
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")  # Pydantic avisa si el computed field no coincide con su tipo
+        dumped = product.model_dump(mode="json")
+    assert dumped["image_variants"]["card"] == {
+        "size": 480,
+        "webp": f"/uploads/products/{content_hash}_card.webp",
+        "jpeg": f"/uploads/products/{content_hash}_card.jpg"
+    }
+
+
+def test_legacy_uploads_get_variants_only_after_backfill(app, db, seed, monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(images, "UPLOADS_DIR", str(tmp_path))
+    legacy_url = "/uploads/products/product_1_1700000000.png"
+    (tmp_path / "product_1_1700000000.png").write_bytes(_png(800, 600))
+    (tmp_path / "no_es_imagen.png").write_bytes(b"texto")
+    product = seed["products"][0]
+    product.image_url = legacy_url
+    db.commit()
+
+    # Subida anterior a las variantes: el frontend debe usar el original
+    response = TestClient(app).get(f"{API}/products/{product.id}").json()
+    assert response["image_url"] == legacy_url
+    assert response["image_variants"] is None
+
+    images.main(["backfill", "--directory", str(tmp_path)])
+    assert "✓ generated: 1" in capsys.readouterr().out
+    assert (tmp_path / "product_1_1700000000_card.webp").exists()
+    assert images.variant_urls(legacy_url)["card"]["jpeg"] == "/uploads/products/product_1_1700000000_card.jpg"
+    assert images.originals_without_variants(str(tmp_path)) == ["no_es_imagen.png"]
@@ -0,0 +1,82 @@
+"""Listado de productos: visibilidad por defecto, filtros, orden y paginación por cursor"""
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor
+from app.core.security import create_access_token
+
+API = settings.API_V1_STR
+
+
+def _ids(response):
+    assert response.status_code == 200, response.text
+    return [product["id"] for product in response.json()]
+
+
+def test_public_listing_hides_inactive_and_out_of_stock(app, db, seed, admin_headers):
+    client = TestClient(app)
+    products = seed["products"]
+    products[0].is_active = False
+    products[1].stock = 0
+    db.commit()
+    visible = {p.id for p in products[2:]}
+
+    assert set(_ids(client.get(f"{API}/products/"))) == visible
+    assert set(_ids(client.get(f"{API}/products/", params={"include_out_of_stock": True}))) == visible | {products[1].id}
+
+    # Los desactivados solo para admins
+    assert client.get(f"{API}/products/", params={"include_inactive": True}).status_code == 401
+    user_headers = {"Authorization": f"Bearer {create_access_token(data={'sub': seed['user'].username})}"}
+    assert client.get(f"{API}/products/", params={"include_inactive": True}, headers=user_headers).status_code == 403
+    response = client.get(
+        f"{API}/products/", params={"include_inactive": True, "include_out_of_stock": True}, headers=admin_headers
+    )
+    assert set(_ids(response)) == {p.id for p in products}
+
+
+def test_keyset_pages_follow_the_sort_order(app, db, seed):
+    client = TestClient(app)
+    # Precios con empate para verificar el desempate por id
+    for product, price in zip(seed["products"], [30.0, 10.0, 30.0, 20.0, 10.0]):
+        product.price = price
+    db.commit()
+    expected = [p.id for p in sorted(seed["products"], key=lambda p: (-p.price, -p.id))]
+
+    pages, cursor = [], None
+    while True:
+        params = {"sort": "price", "order": "desc", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(f"{API}/products/", params=params)
+        pages.append(_ids(response))
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sum(pages, []) == expected
+
+
+def test_name_filter_and_invalid_cursor(app, seed):
+    client = TestClient(app)
+
+    assert _ids(client.get(f"{API}/products/", params={"name": "ducto 3"})) == [seed["products"][3].id]
+    assert _ids(client.get(f"{API}/products/", params={"name": "%"})) == []
+    # Un cursor de otro orden, o basura, se rechaza en lugar de dar una página equivocada
+    cursor = encode_cursor("name", "asc", ["Producto 1", seed["products"][1].id])
+    assert client.get(f"{API}/products/", params={"sort": "price", "cursor": cursor}).status_code == 400
+    assert client.get(f"{API}/products/", params={"cursor": "no-es-un-cursor"}).status_code == 400
+    assert client.get(f"{API}/products/", params={"sort": "cost_price"}).status_code == 422
+
+
+def test_skip_cannot_be_combined_with_cursor(app, seed):
+    client = TestClient(app)
+    first = client.get(f"{API}/products/", params={"limit": 2})
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+
+    response = client.get(f"{API}/products/", params={"limit": 2, "cursor": cursor, "skip": 1})
+    assert response.status_code == 400
+    assert "skip" in response.json()["detail"]
+    # skip=0 explícito y skip sin cursor siguen funcionando
+    expected = _ids(client.get(f"{API}/products/", params={"limit": 2, "cursor": cursor}))
+    assert _ids(client.get(f"{API}/products/", params={"limit": 2, "cursor": cursor, "skip": 0})) == expected
+    assert _ids(client.get(f"{API}/products/", params={"limit": 2, "skip": 2})) == expected
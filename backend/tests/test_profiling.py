@@ -0,0 +1,47 @@
+"""Perfilado bajo demanda: solo para admins y con enlace en la respuesta"""
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.security import create_access_token
+
+API = settings.API_V1_STR
+
+
+def test_admin_profile_is_saved_and_downloadable(app, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    client = TestClient(app)
+
+    response = client.get(f"{API}/earnings/by-product", headers={**admin_headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    profile_url = response.headers["x-profile-url"]
+
+    listing = client.get(f"{API}/profiles/", headers=admin_headers).json()
+    assert listing[0]["id"] == response.headers["x-profile-id"]
+    assert listing[0]["route"] == f"{API}/earnings/by-product"
+
+    svg = client.get(profile_url, headers=admin_headers)
+    assert svg.status_code == 200
+    assert svg.headers["content-type"].startswith("image/svg+xml")
+
+
+def test_profile_flag_ignored_for_non_admin(app, seed, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    client = TestClient(app)
+    user_headers = {"Authorization": f"Bearer {create_access_token(data={'sub': seed['user'].username})}"}
+
+    response = client.get(f"{API}/users/me?_profile=1", headers=user_headers)
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_profile_query_parameter_must_match_exactly(app, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    client = TestClient(app)
+
+    for query in ("x_profile=1", "_profile=10", "name=a_profile%3D1", "name=a&q=_profile=1"):
+        response = client.get(f"{API}/products/?{query}", headers=admin_headers)
+        assert response.status_code == 200, query
+        assert "x-profile-id" not in response.headers, query
+
+    response = client.get(f"{API}/products/?name=Producto&_profile=1", headers=admin_headers)
+    assert "x-profile-id" in response.headers
@@ -0,0 +1,193 @@
+"""
+Presupuesto de queries por endpoint.
+
+Cada caso ejecuta el camino feliz de un endpoint contra PostgreSQL con datos
+de varias filas; `budget_client` falla si se excede el presupuesto declarado
+en `tests/query_budgets.py` o si se dispara alguna carga lazy.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+import pytest
+from fastapi.routing import APIRoute
+from app.api.v1.endpoints import products as products_endpoint
+from app.core.config import settings
+from app.core.profiling import save_profile
+from app.core.security import create_password_reset_token, create_refresh_token
+from app.core.slow_queries import slow_query_log
+from tests.query_budgets import QUERY_BUDGETS
+
+API = settings.API_V1_STR
+
+# 1x1 PNG
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360606060000000050001a5f645400000000049454e44ae426082"
+)
+
+
+def _sale(seed, status):
+    return next(sale for sale in seed["sales"] if sale.status == status)
+
+
+# (método, ruta, función seed -> kwargs del request)
+ENDPOINT_CASES = [
+    # auth
+    ("POST", "/auth/login", lambda s: {"data": {"username": "admin", "password": "Admin123"}}),
+    ("POST", "/auth/register", lambda s: {"json": {
+        "username": "nuevo", "email": "nuevo@test.com", "full_name": "Nuevo", "password": "Nuevo12345"
+    }}),
+    ("POST", "/auth/logout", lambda s: {}),
+    ("POST", "/auth/refresh", lambda s: {"json": {
+        "refresh_token": create_refresh_token(data={"sub": s["admin"].username})
+    }}),
+    ("POST", "/auth/forgot-password", lambda s: {"json": {"email": s["user"].email}}),
+    ("POST", "/auth/reset-password", lambda s: {"json": {
+        "token": create_password_reset_token(s["user"].email), "new_password": "Nueva12345"
+    }}),
+    # users
+    ("GET", "/users/me", lambda s: {}),
+    ("DELETE", "/users/me/sessions", lambda s: {}),
+    ("GET", "/users/", lambda s: {}),
+    ("GET", "/users/{user_id}", lambda s: {}),
+    ("PATCH", "/users/{user_id}", lambda s: {"json": {"full_name": "Usuario Editado"}}),
+    ("PATCH", "/users/me/update", lambda s: {"json": {"full_name": "Admin Editado"}}),
+    ("DELETE", "/users/{user_id}", lambda s: {}),
+    ("GET", "/users/{user_id}/sessions", lambda s: {}),
+    ("DELETE", "/users/{user_id}/sessions", lambda s: {}),
+    ("PUT", "/users/{user_id}/role", lambda s: {"json": {"role": "admin"}}),
+    ("PUT", "/users/{user_id}/password", lambda s: {"json": {"new_password": "Cambiada123"}}),
+    # products
+    ("POST", "/products/", lambda s: {"json": {"name": "Nuevo producto", "cost_price": 20.0, "profit_margin": 30.0, "stock": 5}}),
+    ("GET", "/products/", lambda s: {}),
+    ("GET", "/products/search", lambda s: {"params": {"q": "producto"}}),
+    ("GET", "/products/by-code/{code}", lambda s: {}),
+    ("PUT", "/products/codes", lambda s: {"json": [
+        {"product_id": s["products"][0].id, "sku": s["products"][1].sku},
+        {"product_id": s["products"][1].id, "sku": "SKU-NUEVO"},
+    ]}),
+    ("POST", "/products/import", lambda s: {"files": {"file": ("catalogo.csv", (
+        "name,sku,cost_price,profit_margin,stock\n"
+        "Producto 0,,11.0,40,7\n"
+        "Importado 1,IMP-1,5.0,50,10\n"
+        "Importado 2,,5.0,,1\n"
+    ).encode(), "text/csv")}}),
+    ("GET", "/products/export", lambda s: {}),
+    ("PATCH", "/products/stock", lambda s: {"json": {"reason": "Conteo", "adjustments": [
+        {"product_id": product.id, "stock": 7} if i % 2 else {"product_id": product.id, "delta": -3}
+        for i, product in enumerate(s["products"])
+    ]}}),
+    ("GET", "/products/{product_id}", lambda s: {}),
+    ("PUT", "/products/{product_id}", lambda s: {"json": {"description": "Editado", "cost_price": 12.0}}),
+    ("DELETE", "/products/{product_id}", lambda s: {}),
+    ("PATCH", "/products/{product_id}/stock", lambda s: {"params": {"stock": 42}}),
+    ("POST", "/products/{product_id}/image", lambda s: {"files": {"file": ("foto.png", PNG_BYTES, "image/png")}}),
+    ("DELETE", "/products/{product_id}/image", lambda s: {}),
+    # sales
+    ("POST", "/sales/", lambda s: {"json": {
+        "product_id": s["products"][0].id, "seller_id": s["sellers"][0].id, "quantity": 1,
+        "subtotal": s["products"][0].price, "payment_method": "CASH", "amount_paid": s["products"][0].price
+    }}),
+    ("GET", "/sales/", lambda s: {"params": {"limit": 100}}),
+    ("GET", "/sales/{sale_id}", lambda s: {}),
+    ("PUT", "/sales/{sale_id}", lambda s: {"json": {"notes": "Editada"}}),
+    ("PATCH", "/sales/{sale_id}/status", lambda s: {"json": {"status": "COMPLETED"}}),
+    ("PATCH", "/sales/{sale_id}/payment", lambda s: {"json": {"amount": 1.0}}),
+    ("DELETE", "/sales/{sale_id}", lambda s: {}),
+    # earnings
+    ("POST", "/earnings/investment", lambda s: {"json": {
+        "amount": 500.0, "description": "Reinversión", "date": datetime.now(timezone.utc).isoformat()
+    }}),
+    ("GET", "/earnings/investments", lambda s: {}),
+    ("GET", "/earnings/summary", lambda s: {}),
+    ("GET", "/earnings/by-product", lambda s: {}),
+    ("GET", "/earnings/by-period", lambda s: {"params": {"period": "day"}}),
+    ("GET", "/earnings/by-seller", lambda s: {}),
+    ("GET", "/earnings/{sale_id}", lambda s: {}),
+    ("PUT", "/earnings/earning/{earning_id}", lambda s: {"params": {"sale_price": 30.0}}),
+    # sellers
+    ("POST", "/sellers/", lambda s: {"json": {"name": "Nuevo vendedor", "contact_info": "nuevo@test.com"}}),
+    ("GET", "/sellers/", lambda s: {}),
+    ("GET", "/sellers/{seller_id}", lambda s: {}),
+    ("PUT", "/sellers/{seller_id}", lambda s: {"json": {"contact_info": "editado@test.com"}}),
+    ("DELETE", "/sellers/{seller_id}", lambda s: {}),
+    ("GET", "/sellers/{seller_id}/sales", lambda s: {}),
+    # devices
+    ("POST", "/devices/", lambda s: {"json": {"name": "Caja 1", "user_id": s["user"].id}}),
+    ("GET", "/devices/", lambda s: {}),
+    ("DELETE", "/devices/{device_id}", lambda s: {}),
+    # profiles
+    ("GET", "/profiles/", lambda s: {}),
+    ("GET", "/profiles/{profile_id}", lambda s: {"params": {"format": "folded"}}),
+    # slow-queries
+    ("GET", "/slow-queries/", lambda s: {}),
+    ("GET", "/slow-queries/{query_id}", lambda s: {}),
+    ("DELETE", "/slow-queries/", lambda s: {}),
+]
+
+
+def _path_params(method, path, seed, client, headers):
+    """Ids de los datos sembrados que cada ruta necesita"""
+    params = {
+        "user_id": seed["user"].id,
+        "product_id": seed["products"][0].id,
+        "seller_id": seed["sellers"][0].id,
+        "sale_id": _sale(seed, "COMPLETED").id,
+        "code": seed["products"][0].sku,
+    }
+    if path.startswith("/sales/{sale_id}") and method in ("PUT", "PATCH"):
+        params["sale_id"] = _sale(seed, "PARTIAL").id
+    if path == "/sales/{sale_id}" and method == "DELETE":
+        params["sale_id"] = _sale(seed, "PENDING").id
+    if "{earning_id}" in path:
+        params["earning_id"] = 1
+    if "{profile_id}" in path:
+        params["profile_id"] = "0123456789abcdef"
+        save_profile(params["profile_id"], Counter({("read_user_me",): 3}), {
+            "id": params["profile_id"], "method": "GET", "path": f"{API}/users/me", "route": f"{API}/users/me",
+            "status_code": 200, "duration_ms": 6.0, "samples": 3, "username": "admin",
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+    if "{query_id}" in path:
+        slow_query_log.record("UPDATE products SET stock = %(stock)s WHERE products.id = %(id)s",
+                              {"stock": 1, "id": 1}, 350.0, f"{API}/products/{{product_id}}/stock", 0.0)
+        params["query_id"] = slow_query_log.top(1)[0]["id"]
+    if "{device_id}" in path:
+        params["device_id"] = client.post(
+            f"{API}/devices/", json={"name": "Caja", "user_id": seed["user"].id}, headers=headers
+        ).json()["id"]
+    return params
+
+
+def test_every_route_has_a_budget(app):
+    routes = {
+        (method, route.path)
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.path.startswith(API)
+        for method in route.methods
+    }
+    missing = sorted(routes - set(QUERY_BUDGETS))
+    assert not missing, f"Rutas sin presupuesto en tests/query_budgets.py: {missing}"
+
+
+def test_every_route_has_a_case(app):
+    cases = {(method, API + path) for method, path, _ in ENDPOINT_CASES}
+    assert cases == set(QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize(
+    "method,path,build",
+    ENDPOINT_CASES,
+    ids=[f"{method} {path}" for method, path, _ in ENDPOINT_CASES]
+)
+def test_endpoint_within_query_budget(budget_client, db, seed, admin_headers, method, path, build, monkeypatch, tmp_path):
+    monkeypatch.setattr(products_endpoint, "UPLOADS_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path / "profiles"))
+    if path == "/products/{product_id}/image" and method == "DELETE":
+        seed["products"][0].image_url = "/uploads/products/foto.png"
+        db.commit()
+        (tmp_path / "foto.png").write_bytes(PNG_BYTES)
+
+    url = API + path.format(**_path_params(method, path, seed, budget_client, admin_headers))
+    response = budget_client.request(method, url, headers=admin_headers, **build(seed))
+
+    assert response.status_code < 400, f"{method} {url} -> {response.status_code}: {response.text}"
@@ -0,0 +1,193 @@
+"""
+Regresiones de planes de ejecución sobre el dataset sintético.
+
+Carga un dataset grande con `app.db.dataset`, ejecuta los endpoints que leen
+`sales` y `earnings`, captura cada SELECT que envían y lo pasa por
+`EXPLAIN (FORMAT JSON)` con sus parámetros reales. Falla si algún plan recorre
+completa una de esas tablas (Seq Scan) cuando tiene más de
+SEQ_SCAN_ROW_THRESHOLD filas: un cambio descuidado en un modelo, un índice o
+un query no puede volver a introducir full scans sin que se note.
+
+El listado y la búsqueda de productos se verifican igual sobre un catálogo de
+PLAN_TEST_PRODUCTS productos (100 000 por defecto): deben usar los índices
+parciales y GIN.
+
+El tamaño del dataset se ajusta con PLAN_TEST_SALES (200 000 ventas por defecto).
+"""
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timezone
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from app.core.config import settings
+from app.core.pagination import encode_cursor
+from app.core.security import create_access_token, get_password_hash
+from app.db.base import Base
+from app.db.dataset import DatasetConfig, load_dataset
+from app.db.database import SessionLocal
+from app.models.user import User
+
+API = settings.API_V1_STR
+PLAN_TEST_SALES = int(os.environ.get("PLAN_TEST_SALES", 200_000))
+SEQ_SCAN_ROW_THRESHOLD = 10_000
+WATCHED_TABLES = ("sales", "earnings")
+_WATCHED_SQL = re.compile(r"\b(?:FROM|JOIN)\s+(sales|earnings)\b", re.IGNORECASE)
+
+# (método, url, tablas que el endpoint agrega completas por diseño)
+# Los agregados globales (resumen, por producto, por vendedor) leen todas las
+# earnings por definición; ahí un Seq Scan es el plan correcto.
+PLAN_CASES = [
+    ("GET", "/sales/?limit=50", ()),
+    ("GET", "/sales/?status=PENDING&limit=50", ()),
+    ("GET", "/sales/?status=CANCELLED&skip=100&limit=50", ()),
+    ("GET", "/sales/?seller_id=1&limit=50", ()),
+    ("GET", "/sales/?seller_id=40&limit=50", ()),
+    ("GET", "/sales/?start_date=2025-06-01T00:00:00&end_date=2025-06-07T23:59:59&limit=100", ()),
+    ("GET", "/sales/?status=PARTIAL&seller_id=3&start_date=2025-01-01T00:00:00&end_date=2025-03-31T23:59:59", ()),
+    ("GET", "/sales/12345", ()),
+    ("GET", "/sellers/2/sales?limit=50", ()),
+    ("GET", "/earnings/12345", ()),
+    ("GET", "/earnings/by-period?period=day&start_date=2025-11-01T00:00:00&end_date=2025-11-30T23:59:59", ()),
+    ("GET", "/earnings/by-period?period=week&start_date=2025-10-01T00:00:00&end_date=2025-12-31T23:59:59", ()),
+    ("GET", "/earnings/summary", ("earnings",)),
+    ("GET", "/earnings/by-product", ("earnings",)),
+    ("GET", "/earnings/by-seller", ("sales", "earnings")),
+]
+
+
+@pytest.fixture(scope="module")
+def large_dataset(engine):
+    load_dataset(engine, DatasetConfig(products=500, sellers=50, sales=PLAN_TEST_SALES, investments=50), truncate=True)
+    db = SessionLocal()
+    admin = User(
+        username="admin", email="admin@test.com", full_name="Admin",
+        hashed_password=get_password_hash("Admin123"), role="admin",
+        is_active=True, created_at=datetime.now(timezone.utc)
+    )
+    db.add(admin)
+    db.commit()
+    db.close()
+    with engine.connect() as conn:
+        table_rows = dict(conn.execute(text(
+            "SELECT relname, reltuples::bigint FROM pg_class WHERE relname IN ('sales', 'earnings')"
+        )).all())
+
+    yield {"table_rows": table_rows, "headers": {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin'})}"}}
+
+    table_names = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {table_names} RESTART IDENTITY CASCADE"))
+
+
+def _seq_scans(node):
+    """Tablas recorridas con Seq Scan en un nodo del plan y sus hijos"""
+    if node.get("Node Type") == "Seq Scan":
+        yield node["Relation Name"]
+    for child in node.get("Plans", ()):
+        yield from _seq_scans(child)
+
+
+def _capture_selects(engine, client, method, url, headers):
+    """SELECTs sobre sales/earnings que ejecuta el endpoint, con sus parámetros"""
+    captured = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and _WATCHED_SQL.search(statement):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        response = client.request(method, API + url, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    assert response.status_code == 200, f"{method} {url} -> {response.status_code}: {response.text}"
+    return captured
+
+
+def test_dataset_is_large_enough(large_dataset):
+    for table in WATCHED_TABLES:
+        assert large_dataset["table_rows"][table] > SEQ_SCAN_ROW_THRESHOLD
+
+
+@pytest.mark.parametrize("method,url,full_scan_tables", PLAN_CASES, ids=[f"{m} {u}" for m, u, _ in PLAN_CASES])
+def test_no_sequential_scans_on_large_tables(app, engine, large_dataset, method, url, full_scan_tables):
+    client = TestClient(app)
+    statements = _capture_selects(engine, client, method, url, large_dataset["headers"])
+    assert statements, f"{method} {url} no consultó sales ni earnings"
+
+    offenders = defaultdict(list)
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            sql = f"EXPLAIN (FORMAT JSON) {statement}"
+            result = conn.exec_driver_sql(sql, parameters) if parameters else conn.exec_driver_sql(sql)
+            plan = result.scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            for table in _seq_scans(plan[0]["Plan"]):
+                too_big = large_dataset["table_rows"].get(table, 0) > SEQ_SCAN_ROW_THRESHOLD
+                if table in WATCHED_TABLES and too_big and table not in full_scan_tables:
+                    offenders[table].append(" ".join(statement.split()))
+
+    assert not offenders, (
+        f"{method} {url} hace Seq Scan sobre tablas de más de {SEQ_SCAN_ROW_THRESHOLD} filas:\n"
+        + "\n".join(f"  {table}: {sql}" for table, sqls in offenders.items() for sql in sqls)
+    )
+
+
+# Listado y búsqueda de productos sobre un catálogo de SEARCH_CATALOG_PRODUCTS
+# (índices parciales de los activos y GIN de búsqueda)
+SEARCH_CATALOG_PRODUCTS = int(os.environ.get("PLAN_TEST_PRODUCTS", 100_000))
+SEARCH_CASES = [
+    "/products/?limit=50",
+    "/products/?sort=price&order=desc&limit=50",
+    "/products/?sort=stock&limit=50&cursor=" + encode_cursor("stock", "asc", [250, 1]),
+    "/products/?sort=name&limit=50&cursor=" + encode_cursor("name", "asc", ["Monitor", 1]),
+    "/products/search?q=monitor%20lg",
+    "/products/search?q=teclados",
+    "/products/search?q=audifonos%20sony%20000123",
+    "/products/search?q=cargador&skip=40&limit=20",
+]
+_PRODUCTS_SQL = re.compile(r"\bFROM\s+products\b", re.IGNORECASE)
+
+
+@pytest.fixture(scope="module")
+def large_catalog(engine, large_dataset):
+    """Multiplica los productos del dataset hasta SEARCH_CATALOG_PRODUCTS (variando el nombre)"""
+    with engine.begin() as conn:
+        copies = SEARCH_CATALOG_PRODUCTS // conn.execute(text("SELECT count(*) FROM products")).scalar()
+        conn.execute(text(
+            "INSERT INTO products (name, description, price, cost_price, profit_margin, stock, image_url, is_active, created_at) "
+            "SELECT p.name || '-' || g, p.description, p.price, p.cost_price, p.profit_margin, p.stock, p.image_url, "
+            "p.is_active, p.created_at FROM products p CROSS JOIN generate_series(1, :copies) g"
+        ), {"copies": copies - 1})
+    # VACUUM vuelca la lista pendiente de los índices GIN, como en una base en régimen
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE products"))
+        return conn.execute(text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'products'")).scalar()
+
+
+@pytest.mark.parametrize("url", SEARCH_CASES)
+def test_product_listing_and_search_use_indexes(app, engine, large_catalog, url):
+    assert large_catalog > SEQ_SCAN_ROW_THRESHOLD
+    client = TestClient(app)
+    captured = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and _PRODUCTS_SQL.search(statement):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        response = client.get(API + url)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    assert response.status_code == 200, response.text
+    assert captured
+
+    with engine.connect() as conn:
+        for statement, parameters in captured:
+            plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            assert "products" not in set(_seq_scans(plan[0]["Plan"])), f"{url} hace Seq Scan sobre products: {statement}"
@@ -0,0 +1,46 @@
+"""Totales de venta en centavos: el total mostrado en caja liquida la venta sin residuos de float"""
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.models.sales import Sales
+
+API = settings.API_V1_STR
+
+
+def _sell(client, headers, seed, **fields):
+    product, seller = seed["products"][0], seed["sellers"][0]
+    return client.post(f"{API}/sales/", json={
+        "product_id": product.id, "seller_id": seller.id, "subtotal": product.price,
+        "payment_method": "CASH", **fields
+    }, headers=headers)
+
+
+def test_paying_the_displayed_total_of_a_discounted_sale_completes_it(app, db, seed, admin_headers):
+    client = TestClient(app)
+    price = seed["products"][0].price
+    exact_total = price * 3 - price * 3 * 0.033
+    displayed_total = round(exact_total, 2)
+    assert displayed_total != exact_total  # 43.515 -> 43.52
+
+    response = _sell(client, admin_headers, seed, quantity=3, discount=3.3, amount_paid=displayed_total)
+    assert response.status_code == 201, response.text
+    sale = db.get(Sales, response.json()["id"])
+    assert (sale.total_price, sale.amount_paid, sale.amount_remaining, sale.status) == (
+        displayed_total, displayed_total, 0, "COMPLETED"
+    )
+
+    # Un centavo de más sigue rechazándose
+    response = _sell(client, admin_headers, seed, quantity=3, discount=3.3, amount_paid=displayed_total + 0.01)
+    assert response.status_code == 400
+
+
+def test_partial_payment_leaves_the_rest_in_cents(app, db, seed, admin_headers):
+    client = TestClient(app)
+    response = _sell(client, admin_headers, seed, quantity=3, discount=3.3, amount_paid=20.1)
+    assert response.status_code == 201, response.text
+    sale = db.get(Sales, response.json()["id"])
+    assert (sale.amount_remaining, sale.status) == (23.42, "PARTIAL")
+
+    response = client.patch(f"{API}/sales/{sale.id}/payment", json={"amount": 23.42}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    db.expire_all()
+    assert (sale.amount_remaining, sale.status) == (0, "COMPLETED")
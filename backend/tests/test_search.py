@@ -0,0 +1,71 @@
+"""Búsqueda de productos (texto completo en español + trigramas) y de usuarios"""
+from datetime import datetime, timezone
+import pytest
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.db.search import has_trigram
+from app.models.product import Product
+
+API = settings.API_V1_STR
+
+
+@pytest.fixture
+def catalog(db, seed):
+    now = datetime.now(timezone.utc)
+    products = [
+        Product(name="Zapato de cuero", description="Calzado formal negro", cost_price=10, price=20, stock=5,
+                is_active=True, created_at=now),
+        Product(name="Bolsa ecológica", description="Ideal para llevar zapatos", cost_price=5, price=8, stock=5,
+                is_active=True, created_at=now),
+        Product(name="Chocolate amargo", description="Tableta de cacao 70%", cost_price=3, price=5, stock=5,
+                is_active=True, created_at=now),
+        Product(name="Zapatos viejos", description="Descontinuado", cost_price=3, price=5, stock=0,
+                is_active=False, created_at=now),
+    ]
+    db.add_all(products)
+    db.commit()
+    return products
+
+
+def _names(response):
+    assert response.status_code == 200, response.text
+    return [product["name"] for product in response.json()]
+
+
+def test_search_uses_spanish_stems_and_ranks_name_first(app, catalog):
+    client = TestClient(app)
+
+    # "zapatos" encuentra "zapato" (raíz); el nombre pesa más que la descripción; los inactivos no salen
+    assert _names(client.get(f"{API}/products/search", params={"q": "zapatos"})) == ["Zapato de cuero", "Bolsa ecológica"]
+    # Cada palabra es un prefijo, y todas deben aparecer
+    assert _names(client.get(f"{API}/products/search", params={"q": "choco amar"})) == ["Chocolate amargo"]
+    assert _names(client.get(f"{API}/products/search", params={"q": "choco cuero"})) == []
+
+
+def test_search_pagination_and_validation(app, catalog):
+    client = TestClient(app)
+
+    assert _names(client.get(f"{API}/products/search", params={"q": "zapato", "limit": 1})) == ["Zapato de cuero"]
+    assert _names(client.get(f"{API}/products/search", params={"q": "zapato", "skip": 1})) == ["Bolsa ecológica"]
+    assert _names(client.get(f"{API}/products/search", params={"q": "%&!"})) == []
+    assert client.get(f"{API}/products/search", params={"q": "z"}).status_code == 422
+    assert client.get(f"{API}/products/search", params={"q": "zapato", "limit": 500}).status_code == 422
+
+
+def test_search_tolerates_typos_with_pg_trgm(app, engine, catalog):
+    if not has_trigram(engine):
+        pytest.skip("El servidor de PostgreSQL de los tests no tiene pg_trgm")
+    client = TestClient(app)
+
+    assert _names(client.get(f"{API}/products/search", params={"q": "chocolte"})) == ["Chocolate amargo"]
+
+
+def test_user_search_escapes_wildcards(app, seed, admin_headers):
+    client = TestClient(app)
+
+    response = client.get(f"{API}/users/", params={"search": "usu"}, headers=admin_headers)
+    assert [user["username"] for user in response.json()] == ["usuario"]
+    response = client.get(f"{API}/users/", params={"search": "TEST.COM"}, headers=admin_headers)
+    assert len(response.json()) == 2
+    response = client.get(f"{API}/users/", params={"search": "_"}, headers=admin_headers)
+    assert response.json() == []
@@ -0,0 +1,14 @@
+"""Header Server-Timing: apagado por defecto, solo para desarrollo"""
+from fastapi.testclient import TestClient
+from app.core.config import settings
+
+API = settings.API_V1_STR
+
+
+def test_server_timing_is_opt_in(app, seed, admin_headers, monkeypatch):
+    client = TestClient(app)
+    assert "server-timing" not in client.get(f"{API}/products/", headers=admin_headers).headers
+
+    monkeypatch.setattr(settings, "SERVER_TIMING_ENABLED", True)
+    timing = client.get(f"{API}/products/", headers=admin_headers).headers["server-timing"]
+    assert timing.startswith("db;dur=") and "handler;dur=" in timing
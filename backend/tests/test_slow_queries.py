@@ -0,0 +1,74 @@
+"""Log de queries lentas: agregación por ruta y fingerprint con planes capturados"""
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.slow_queries import slow_query_log
+
+API = settings.API_V1_STR
+
+
+@pytest.fixture
+def slow_log(monkeypatch):
+    # Umbral 0: todas las sentencias cuentan como lentas
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0.0)
+    monkeypatch.setattr(settings, "SLOW_QUERY_EXPLAIN_SAMPLES", 2)
+    slow_query_log.clear()
+    slow_query_log.start()
+    yield slow_query_log
+    slow_query_log.stop()
+    slow_query_log.clear()
+
+
+def test_slow_statements_are_grouped_with_plans(app, seed, admin_headers, slow_log):
+    client = TestClient(app)
+    for product in seed["products"][:3]:
+        assert client.get(f"{API}/products/{product.id}", headers=admin_headers).status_code == 200
+    slow_log.flush()
+    slow_log.stop()
+
+    entries = client.get(f"{API}/slow-queries/", headers=admin_headers).json()
+    product_queries = [
+        entry for entry in entries
+        if entry["route"] == f"{API}/products/{{product_id}}" and "FROM products" in entry["fingerprint"]
+    ]
+    assert len(product_queries) == 1
+    assert product_queries[0]["count"] == 3
+    assert product_queries[0]["plans_captured"] == 2
+
+    detail = client.get(f"{API}/slow-queries/{product_queries[0]['id']}", headers=admin_headers).json()
+    assert "Buffers" in detail["plans"][0]["plan"] or "actual time" in detail["plans"][0]["plan"]
+
+    assert client.delete(f"{API}/slow-queries/", headers=admin_headers).json()["deleted"] == len(entries)
+    assert client.get(f"{API}/slow-queries/", headers=admin_headers).json() == []
+
+
+def test_write_statements_are_explained_without_analyze(db, seed, slow_log):
+    product = seed["products"][0]
+    slow_log.record(
+        "UPDATE products SET stock=%(stock)s WHERE products.id = %(products_id)s",
+        {"stock": 0, "products_id": product.id}, 500.0, "background", 0.0
+    )
+    entry = slow_log.get(slow_log.top(1)[0]["id"])
+
+    assert "actual time" not in entry["plans"][0]["plan"]
+    db.refresh(product)
+    assert product.stock != 0
+
+
+def test_locking_selects_are_explained_without_taking_the_locks(engine, seed, slow_log):
+    product = seed["products"][0]
+    with engine.connect() as conn, conn.begin():
+        # Un request tiene la fila bloqueada mientras se captura el plan
+        conn.exec_driver_sql("SELECT id FROM products WHERE id = %(id)s FOR UPDATE", {"id": product.id})
+        started = time.monotonic()
+        slow_log.record(
+            "SELECT products.id, products.stock FROM products WHERE products.id IN (%(id)s) ORDER BY products.id FOR UPDATE",
+            {"id": product.id}, 500.0, "background", 0.0
+        )
+        elapsed = time.monotonic() - started
+
+    plan = slow_log.get(slow_log.top(1)[0]["id"])["plans"][0]["plan"]
+    assert "LockRows" in plan
+    assert "actual time" not in plan
+    assert elapsed < 2
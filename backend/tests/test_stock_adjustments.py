@@ -0,0 +1,70 @@
+"""Ajuste de stock en lote: conteo absoluto y deltas, todo o nada, e historial en stock_movements"""
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.product import Product
+from app.models.stock_movement import StockMovement
+from app.schemas.product import MAX_STOCK
+
+API = settings.API_V1_STR
+
+
+def _adjust(client, headers, adjustments, reason=None):
+    return client.patch(f"{API}/products/stock", json={"adjustments": adjustments, "reason": reason}, headers=headers)
+
+
+def test_batch_applies_counts_and_deltas_and_records_changes(app, db, seed, admin_headers):
+    client = TestClient(app)
+    p0, p1, p2 = seed["products"][:3]
+
+    response = _adjust(client, admin_headers, [
+        {"product_id": p2.id, "stock": 40},
+        {"product_id": p0.id, "delta": -30},
+        {"product_id": p1.id, "stock": 100},  # Sin cambio: no se registra
+    ], reason="Conteo físico")
+    assert response.status_code == 200, response.text
+    assert response.json() == [
+        {"product_id": p2.id, "previous_stock": 100, "stock": 40},
+        {"product_id": p0.id, "previous_stock": 100, "stock": 70},
+        {"product_id": p1.id, "previous_stock": 100, "stock": 100},
+    ]
+
+    db.expire_all()
+    assert [db.get(Product, p.id).stock for p in (p0, p1, p2)] == [70, 100, 40]
+    movements = db.query(StockMovement).order_by(StockMovement.product_id).all()
+    assert [(m.product_id, m.previous_stock, m.new_stock, m.change, m.reason, m.user_id) for m in movements] == [
+        (p0.id, 100, 70, -30, "Conteo físico", seed["admin"].id),
+        (p2.id, 100, 40, -60, "Conteo físico", seed["admin"].id),
+    ]
+
+    # El ajuste de un solo producto también queda en el historial
+    assert client.patch(f"{API}/products/{p1.id}/stock", params={"stock": 90}, headers=admin_headers).status_code == 202
+    assert db.query(StockMovement).filter(StockMovement.product_id == p1.id).one().change == -10
+
+
+def test_invalid_batches_change_nothing(app, db, seed, admin_headers):
+    client = TestClient(app)
+    p0, p1 = seed["products"][:2]
+
+    assert _adjust(client, admin_headers, [{"product_id": p0.id, "delta": 5}, {"product_id": 9999, "stock": 1}]).status_code == 404
+    response = _adjust(client, admin_headers, [{"product_id": p0.id, "delta": 5}, {"product_id": p1.id, "delta": -101}])
+    assert response.status_code == 400
+    assert str(p1.id) in response.json()["detail"]
+    assert _adjust(client, admin_headers, [{"product_id": p0.id, "delta": 1}, {"product_id": p0.id, "delta": 1}]).status_code == 400
+    assert _adjust(client, admin_headers, [{"product_id": p0.id, "stock": 1, "delta": 1}]).status_code == 422
+    assert _adjust(client, admin_headers, [{"product_id": p0.id}]).status_code == 422
+    assert _adjust(client, admin_headers, [{"product_id": p0.id, "stock": -1}]).status_code == 422
+    # products.stock es INTEGER: un valor fuera de rango se rechaza antes de llegar a la base
+    assert _adjust(client, admin_headers, [{"product_id": p0.id, "stock": MAX_STOCK + 1}]).status_code == 422
+    assert _adjust(client, admin_headers, [{"product_id": p0.id, "delta": MAX_STOCK + 1}]).status_code == 422
+    response = _adjust(client, admin_headers, [{"product_id": p1.id, "delta": 1}, {"product_id": p0.id, "delta": MAX_STOCK}])
+    assert response.status_code == 400
+    assert str(p0.id) in response.json()["detail"]
+    assert client.patch(f"{API}/products/{p0.id}/stock", params={"stock": MAX_STOCK + 1}, headers=admin_headers).status_code == 422
+
+    user_headers = {"Authorization": f"Bearer {create_access_token(data={'sub': seed['user'].username})}"}
+    assert _adjust(client, user_headers, [{"product_id": p0.id, "stock": 1}]).status_code == 403
+
+    db.expire_all()
+    assert [db.get(Product, p.id).stock for p in (p0, p1)] == [100, 100]
+    assert db.query(StockMovement).count() == 0
@@ -1,11 +1,17 @@
-import { BASE_URL } from '../services/productService';
+import { BASE_URL, resizedSrcSet } from '../services/productService';
 import '../styles/components/ProductCard.css';
 
+// Ancho de la tarjeta según la grilla de ProductsSection (3, 2 o 1 columnas)
+const CARD_SIZES = '(max-width: 640px) 100vw, (max-width: 968px) 50vw, 400px';
+
 const ProductCard = ({ product, onClick }) => {
-  // Construir URL completa de la imagen
-  const imageUrl = product.image_url 
-    ? `${BASE_URL}${product.image_url}`
-    : 'https://images.unsplash.com/photo-1518895949257-7621c3c786d7?w=400&h=600&fit=crop';
+  // Construir URL completa de la imagen (variante "card" si existe, no el original)
+  const cardVariant = product.image_variants?.card;
+  const imageUrl = cardVariant
+    ? `${BASE_URL}${cardVariant.jpeg}`
+    : product.image_url
+      ? `${BASE_URL}${product.image_url}`
+      : 'https://images.unsplash.com/photo-1518895949257-7621c3c786d7?w=400&h=600&fit=crop';
 
   const handleClick = () => {
     if (onClick) {
@@ -16,14 +22,22 @@ const ProductCard = ({ product, onClick }) => {
   return (
     <article className="product-card" onClick={handleClick}>
       <div className="product-image-wrapper">
-        <img 
-          src={imageUrl} 
-          alt={product.name} 
-          className="product-image"
-          onError={(e) => {
-            e.target.src = 'https://images.unsplash.com/photo-1518895949257-7621c3c786d7?w=400&h=600&fit=crop';
-          }}
-        />
+        <picture>
+          {cardVariant && (
+            <source srcSet={resizedSrcSet(product.image_url, 'webp')} sizes={CARD_SIZES} type="image/webp" />
+          )}
+          <img 
+            src={imageUrl} 
+            srcSet={cardVariant ? resizedSrcSet(product.image_url, 'jpeg') : undefined}
+            sizes={cardVariant ? CARD_SIZES : undefined}
+            alt={product.name} 
+            className="product-image"
+            loading="lazy"
+            onError={(e) => {
+              e.target.src = 'https://images.unsplash.com/photo-1518895949257-7621c3c786d7?w=400&h=600&fit=crop';
+            }}
+          />
+        </picture>
       </div>
       <div className="product-info">
         <h3 className="product-name">{product.name}</h3>
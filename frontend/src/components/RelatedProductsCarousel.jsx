@@ -55,11 +55,19 @@ const RelatedProductsCarousel = ({ currentProductId }) => {
               onClick={() => handleProductClick(product.id)}
             >
               <div className="carousel-image-container">
-                <img
-                  src={product.image_url ? `${BASE_URL}${product.image_url}` : 'https://images.unsplash.com/photo-1490750967868-88aa4486c946?w=400'}
-                  alt={product.name}
-                  className="carousel-image"
-                />
+                <picture>
+                  {product.image_variants && (
+                    <source srcSet={`${BASE_URL}${product.image_variants.card.webp}`} type="image/webp" />
+                  )}
+                  <img
+                    src={product.image_variants
+                      ? `${BASE_URL}${product.image_variants.card.jpeg}`
+                      : product.image_url ? `${BASE_URL}${product.image_url}` : 'https://images.unsplash.com/photo-1490750967868-88aa4486c946?w=400'}
+                    alt={product.name}
+                    className="carousel-image"
+                    loading="lazy"
+                  />
+                </picture>
               </div>
               <div className="carousel-info">
                 <h3 className="carousel-product-name">{product.name}</h3>
@@ -3,6 +3,17 @@ import axios from 'axios';
 const API_URL = import.meta.env.VITE_API_URL || '/api/v1';
 export const BASE_URL = import.meta.env.VITE_API_URL?.replace('/api/v1', '') || '';
 
+// Anchos que el backend acepta en /uploads/products/{archivo}?w= (IMAGE_RESIZE_WIDTHS)
+const SRCSET_WIDTHS = [240, 480, 960];
+
+// srcSet con versiones redimensionadas de una imagen subida (null si es externa)
+export const resizedSrcSet = (imageUrl, fmt) => {
+  if (!imageUrl?.startsWith('/uploads/')) {
+    return null;
+  }
+  return SRCSET_WIDTHS.map((width) => `${BASE_URL}${imageUrl}?w=${width}&fmt=${fmt} ${width}w`).join(', ');
+};
+
 const api = axios.create({
   baseURL: API_URL,
 });